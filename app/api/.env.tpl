@@ -14,6 +14,10 @@ AI_HUB_PROJECT_NAME="${AI_HUB_PROJECT_NAME}"
 AI_HUB_REGION="${AI_HUB_REGION}"
 AML_ENDPOINT_NAME="${AML_ENDPOINT_NAME}"
 AML_STREAMING_BATCH_SIZE=10
+# When above 0, chunks are sized by estimated tokens instead of AML_STREAMING_BATCH_SIZE paragraphs
+AML_STREAMING_TOKENS_PER_CHUNK=0
+# When above 0, Document Intelligence analyses the document in concurrent ranges of this many pages
+AML_DI_PAGES_PER_RANGE=0
 
 # App logging
 APPINSIGHTS_INSTRUMENTATION_KEY="${APPINSIGHTS_INSTRUMENTATION_KEY}"
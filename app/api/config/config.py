@@ -13,6 +13,12 @@ class Settings(BaseSettings):
     cosmos_key: str = ""
     database_name: str = "state"
     issues_container: str = "issues"
+    reviews_container: str = "reviews"
+    metrics_container: str = "metrics"
+    # How long the reviewer metrics served by the API may be stale, in seconds
+    metrics_cache_seconds: int = 60
+    # How long a running review may go without updating its progress before another request resumes it, in seconds
+    review_lease_seconds: int = 600
     feedback_container: str = "feedback"
     storage_account_url: str = ""
     storage_container_name: str = "documents"
@@ -22,6 +28,8 @@ class Settings(BaseSettings):
     ai_hub_region: str = ""
     aml_endpoint_name: str = ""
     aml_streaming_batch_size: int = 10
+    aml_streaming_tokens_per_chunk: int = 0
+    aml_di_pages_per_range: int = 0
     appinsights_instrumentation_key: str = ""
     log_level: str = "INFO"
     model_config = SettingsConfigDict(env_file=".env")
@@ -1,4 +1,5 @@
 from common.logger import get_logger
+from azure.core import MatchConditions
 from azure.cosmos.exceptions import CosmosHttpResponseError
 from database.config import CosmosDBConfig
 from typing import Any, Dict, List, Optional
@@ -15,20 +16,47 @@ class CosmosDBClient:
         self.container = self.database.get_container_client(container_name)
 
 
-    async def store_item(self, item: Dict[str, any]) -> None:
+    async def store_item(self, item: Dict[str, any]) -> Dict[str, Any]:
         """
         Store an item in the Cosmos DB container.
 
         :param item: A dictionary representing the item to store. Must contain an 'id' field.
+        :return: The stored item, with its system properties such as '_ts'.
         """
         try:
-            self.container.upsert_item(body=item)
+            stored_item = self.container.upsert_item(body=item)
             logging.info("Item stored successfully.")
+            return stored_item
         except CosmosHttpResponseError as e:
             logging.error(f"An error occurred while storing the item: {e}")
             raise e
 
 
+    async def store_item_if_unchanged(self, item: Dict[str, Any], etag: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        Store an item only if it was not changed since it was read, or create it if it is new.
+
+        :param item: A dictionary representing the item to store. Must contain an 'id' field.
+        :param etag: The '_etag' of the item when it was read, or None to create the item.
+        :return: The stored item, or None if the item was changed or created by another writer.
+        """
+        try:
+            if etag is None:
+                stored_item = self.container.create_item(body=item)
+            else:
+                stored_item = self.container.replace_item(
+                    item=item["id"], body=item, etag=etag, match_condition=MatchConditions.IfNotModified
+                )
+            logging.info("Item stored successfully.")
+            return stored_item
+        except CosmosHttpResponseError as e:
+            if e.status_code in (409, 412):
+                logging.warning(f"Item with ID {item['id']} was changed by another writer.")
+                return None
+            logging.error(f"An error occurred while storing the item: {e}")
+            raise e
+
+
     async def retrieve_item_by_id(self, item_id: str, partition_key: str) -> Optional[Dict[str, Any]]:
         """
         Retrieve an item from the Cosmos DB container by its ID.
@@ -76,3 +104,78 @@ class CosmosDBClient:
         except CosmosHttpResponseError as e:
             logging.error(f"An error occurred while retrieving items: {e}")
             return None
+
+
+    async def delete_item(self, item_id: str, partition_key: str) -> None:
+        """
+        Delete an item from the Cosmos DB container by its ID.
+
+        :param item_id: The ID of the item to delete.
+        :param partition_key: The partition key of the item.
+        """
+        try:
+            self.container.delete_item(item=item_id, partition_key=partition_key)
+            logging.info("Item deleted successfully.")
+        except CosmosHttpResponseError as e:
+            if e.status_code == 404:
+                logging.warning(f"Item with ID {item_id} not found.")
+            else:
+                logging.error(f"An error occurred while deleting the item: {e}")
+                raise e
+
+
+    async def query_items(
+        self, query: str, parameters: List[Dict[str, Any]], partition_key: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Retrieve the items of a query, within a partition if its key is given.
+
+        :param query: The query, with @-prefixed parameters.
+        :param parameters: The name and value of each parameter.
+        :param partition_key: Optional partition key, to avoid a cross-partition query.
+        :return: A list of the items of the query.
+        """
+        try:
+            if partition_key is None:
+                items = self.container.query_items(
+                    query=query, parameters=parameters, enable_cross_partition_query=True
+                )
+            else:
+                items = self.container.query_items(query=query, parameters=parameters, partition_key=partition_key)
+            return list(items)
+        except CosmosHttpResponseError as e:
+            logging.error(f"An error occurred while querying items: {e}")
+            raise e
+
+
+    async def increment_item(
+        self, item_id: str, partition_key: str, increments: Dict[str, int], defaults: Dict[str, Any]
+    ) -> None:
+        """
+        Atomically add to counters of an item, creating the item if it does not exist.
+
+        :param item_id: The ID of the item.
+        :param partition_key: The partition key of the item.
+        :param increments: The value to add to each counter field.
+        :param defaults: The fields of the item when it is created, with the counters at 0.
+        """
+        operations = [{"op": "incr", "path": f"/{field}", "value": value} for field, value in increments.items()]
+        try:
+            self.container.patch_item(item=item_id, partition_key=partition_key, patch_operations=operations)
+            return
+        except CosmosHttpResponseError as e:
+            if e.status_code != 404:
+                logging.error(f"An error occurred while incrementing the item: {e}")
+                raise e
+
+        try:
+            item = {**defaults, "id": item_id}
+            for field, value in increments.items():
+                item[field] = item.get(field, 0) + value
+            self.container.create_item(body=item)
+        except CosmosHttpResponseError as e:
+            if e.status_code != 409:
+                logging.error(f"An error occurred while creating the item: {e}")
+                raise e
+            # Created concurrently since the patch failed
+            self.container.patch_item(item=item_id, partition_key=partition_key, patch_operations=operations)
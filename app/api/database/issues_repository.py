@@ -1,5 +1,5 @@
 from common.logger import get_logger
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 from common.models import Issue
 from config.config import settings
 from database.db_client import CosmosDBClient
@@ -28,6 +28,32 @@ class IssuesRepository:
         return [Issue(**issue) for issue in issues]
 
 
+    async def get_issues_since(self, doc_id: str, since: Optional[int] = None) -> Tuple[List[Issue], int]:
+        """
+        Retrieve the issues of a document created or modified since a cursor.
+
+        The cursor is a Cosmos _ts, which has a resolution of one second, so the issues changed in the second
+        of the cursor are returned again rather than missed.
+
+        Args:
+            doc_id (str): The document id.
+            since (int): Optional cursor of a previous call, all the issues by default.
+
+        Returns:
+            Tuple[List[Issue], int]: The issues, and the cursor of the next call.
+        """
+        query = "SELECT * FROM c WHERE c.doc_id = @doc_id"
+        parameters = [{"name": "@doc_id", "value": doc_id}]
+        if since is not None:
+            query += " AND c._ts >= @since"
+            parameters.append({"name": "@since", "value": since})
+
+        issues = await self.db_client.query_items(query, parameters, partition_key=doc_id)
+        logging.info(f"Retrieved {len(issues)} issues changed since {since} for document {doc_id}.")
+        cursor = max((issue["_ts"] for issue in issues), default=since or 0)
+        return [Issue(**issue) for issue in issues], cursor
+
+
     async def get_issue(self, doc_id: str, issue_id: str) -> Issue:
         """
         Retrieve issue for given issue id and doc id.
@@ -53,6 +79,19 @@ class IssuesRepository:
         logging.info("Issues stored successfully.")
 
 
+    async def delete_issues(self, issues: List[Issue]) -> None:
+        """
+        Delete issues from the database.
+
+        Args:
+            issues (List[Issue]): The issues to delete.
+        """
+        logging.info(f"Deleting {len(issues)} issues from the database.")
+        for issue in issues:
+            await self.db_client.delete_item(issue.id, issue.doc_id)
+        logging.info("Issues deleted successfully.")
+
+
     async def update_issue(self, doc_id: str, issue_id: str, fields: Dict[str, Any]) -> Issue:
         """
         Updates issue fields
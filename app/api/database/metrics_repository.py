@@ -0,0 +1,53 @@
+from common.logger import get_logger
+from typing import Dict, List, Optional
+from common.models import ReviewMetricsBucket
+from config.config import settings
+from database.db_client import CosmosDBClient
+
+logging = get_logger(__name__)
+
+# The counters of a bucket
+COUNTERS = ["created", "accepted", "dismissed", "accepted_with_modifications"]
+
+class MetricsRepository:
+    def __init__(self) -> None:
+        """Initialize the MetricsRepository with a CosmosDBClient."""
+        self.db_client = CosmosDBClient(settings.metrics_container)
+
+
+    async def increment_bucket(self, granularity: str, bucket: str, issue_type: str, increments: Dict[str, int]) -> None:
+        """
+        Add to the counters of a bucket, creating it at 0 if needed. Buckets are partitioned by granularity.
+
+        Args:
+            granularity (str): hour or day.
+            bucket (str): The start of the bucket.
+            issue_type (str): The issue type.
+            increments (Dict[str, int]): The value to add to each counter, negative to subtract.
+        """
+        defaults = {"granularity": granularity, "bucket": bucket, "type": issue_type, **{c: 0 for c in COUNTERS}}
+        await self.db_client.increment_item(f"{granularity}:{bucket}:{issue_type}", granularity, increments, defaults)
+
+
+    async def get_buckets(
+        self, granularity: str, start: str, end: str, issue_type: Optional[str] = None
+    ) -> List[ReviewMetricsBucket]:
+        """
+        Retrieve the buckets of a granularity from start to end, included, ordered by time.
+
+        Args:
+            granularity (str): hour or day.
+            start (str): The first bucket.
+            end (str): The last bucket.
+            issue_type (str): optional - only the buckets of this issue type.
+        """
+        query = "SELECT * FROM c WHERE c.bucket >= @start AND c.bucket <= @end"
+        parameters = [{"name": "@start", "value": start}, {"name": "@end", "value": end}]
+        if issue_type:
+            query += " AND c.type = @type"
+            parameters.append({"name": "@type", "value": issue_type})
+        query += " ORDER BY c.bucket"
+
+        items = await self.db_client.query_items(query, parameters, partition_key=granularity)
+        logging.info(f"Retrieved {len(items)} {granularity} metrics buckets from {start} to {end}.")
+        return [ReviewMetricsBucket(**item) for item in items]
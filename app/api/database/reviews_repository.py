@@ -0,0 +1,72 @@
+from common.logger import get_logger
+from typing import List, Optional
+from common.models import ReviewProgress
+from config.config import settings
+from database.db_client import CosmosDBClient
+
+logging = get_logger(__name__)
+
+class ReviewsRepository:
+    def __init__(self) -> None:
+        """Initialize the ReviewsRepository with a CosmosDBClient."""
+        self.db_client = CosmosDBClient(settings.reviews_container)
+
+
+    async def get_progress(self, doc_id: str) -> Optional[ReviewProgress]:
+        """
+        Retrieve the review progress of a document.
+
+        Args:
+            doc_id (str): The document id.
+
+        Returns:
+            ReviewProgress: The progress record, or None if the document was never reviewed with progress tracking.
+        """
+        item = await self.db_client.retrieve_item_by_id(doc_id, doc_id)
+        if not item:
+            return None
+        progress = ReviewProgress(**item)
+        progress._etag = item["_etag"]
+        return progress
+
+
+    async def store_progress(self, progress: ReviewProgress) -> Optional[int]:
+        """
+        Store the review progress of a document, unless another request stored it since it was read or last
+        stored, so that a single request runs the review.
+
+        Args:
+            progress (ReviewProgress): The progress record.
+
+        Returns:
+            int: The Cosmos _ts of the write, in seconds since the epoch, or None if another request stored the
+                progress and runs the review.
+        """
+        logging.debug(f"Storing review progress for document {progress.doc_id}: next chunk {progress.next_chunk}.")
+        stored_progress = await self.db_client.store_item_if_unchanged(progress.model_dump(), progress._etag)
+        if stored_progress is None:
+            return None
+        progress._etag = stored_progress["_etag"]
+        return stored_progress["_ts"]
+
+
+    async def record_deleted_issues(self, progress: ReviewProgress, issue_ids: List[str]) -> Optional[int]:
+        """
+        Store the review progress of a document with the ids of deleted issues, for the clients syncing the issue
+        changes, unless another request stored it since it was read or last stored.
+
+        The deletions are dated by the _ts of this write, which is set as the `issues_deleted_ts` of the progress
+        and stored by its next write. Until then the stored record has no date, and the ids are sent to every client.
+
+        Args:
+            progress (ReviewProgress): The progress record.
+            issue_ids (List[str]): The ids of the deleted issues.
+
+        Returns:
+            int: The Cosmos _ts of the write, or None if another request stored the progress and runs the review.
+        """
+        progress.deleted_issue_ids += issue_ids
+        progress.issues_deleted_ts = None
+        deleted_ts = await self.store_progress(progress)
+        progress.issues_deleted_ts = deleted_ts
+        return deleted_ts
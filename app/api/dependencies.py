@@ -1,13 +1,19 @@
 from services.aml_client import AMLClient
 from database.issues_repository import IssuesRepository
+from database.reviews_repository import ReviewsRepository
+from database.metrics_repository import MetricsRepository
 from services.issues_service import IssuesService
+from services.metrics_service import MetricsService
 from azure.identity import DefaultAzureCredential
 from azure.ai.ml import MLClient
 from config.config import settings
 
 
 def get_issues_service() -> IssuesService:
-    return IssuesService(IssuesRepository(), get_aml_client())
+    return IssuesService(IssuesRepository(), ReviewsRepository(), get_metrics_service(), get_aml_client())
+
+def get_metrics_service() -> MetricsService:
+    return MetricsService(MetricsRepository())
 
 def get_aml_client():
     credential = DefaultAzureCredential()
@@ -6,7 +6,7 @@ from middleware.logging import LoggingMiddleware
 from config.config import settings
 from fastapi.staticfiles import StaticFiles
 from middleware.logging import LoggingMiddleware, setup_logging
-from routers import issues
+from routers import issues, metrics
 
 
 # Set up logging configuration
@@ -35,6 +35,7 @@ app.add_middleware(
 
 # Include routers
 app.include_router(issues.router)
+app.include_router(metrics.router)
 
 
 # Health check endpoint
@@ -4,11 +4,12 @@ from dependencies import get_issues_service
 from common.logger import get_logger
 import json
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException, Header, Query
 from services.issues_service import IssuesService
 from fastapi.responses import StreamingResponse
 from security.auth import validate_authenticated
-from common.models import Issue, ModifiedFieldsModel, DismissalFeedbackModel
+from config.config import settings
+from common.models import Issue, IssueChanges, ModifiedFieldsModel, DismissalFeedbackModel, ReviewStatusEnum
 
 
 router = APIRouter()
@@ -19,6 +20,11 @@ def issues_event(issues: list[Issue]) -> str:
     issue_objs = [issue.model_dump() for issue in issues]
     return f"event: issues\n" + (f"data: {json.dumps(issue_objs)}\n" if issues else "") + "\n"
 
+
+def pages_event(first_page: int, last_page: int) -> str:
+    # Tells the client which pages the following issues event covers
+    return f"event: pages\ndata: {json.dumps({'first_page': first_page, 'last_page': last_page})}\n\n"
+
 @router.get(
     "/api/v1/review/{doc_id}/issues",
     summary="Get issues related to a PDF document",
@@ -30,6 +36,8 @@ def issues_event(issues: list[Issue]) -> str:
 )
 async def get_pdf_issues(
     doc_id: str,
+    previous_doc_id: Optional[str] = None,
+    focus_page: Optional[int] = None,
     user=Depends(validate_authenticated),
     issues_service=Depends(get_issues_service)
 ) -> StreamingResponse:
@@ -38,8 +46,16 @@ async def get_pdf_issues(
 
     Args:
         doc_id (str): The filename of the document
+        previous_doc_id (str): Optional filename of the previous version of the document. When provided, only the
+            changed paragraphs are reviewed and the issues of unchanged paragraphs are carried over.
+        focus_page (int): Optional page the reviewer is looking at. The chunks overlapping it are reviewed first,
+            then the review spreads outwards. Each batch of issues is preceded by a pages event with its page range.
         user (Depends): The authenticated user.
 
+    When the last review of the document was interrupted, it is resumed from its first incomplete chunk, and the
+    stream starts with the issues kept from the interrupted review. While the review is run by another request,
+    the issues stored so far are streamed, and the rest can be followed through the issue changes.
+
     Returns:
         StreamingResponse: A text events stream containing identified issues.
     """
@@ -47,9 +63,17 @@ async def get_pdf_issues(
 
     try:
         stored_issues = await issues_service.get_issues_data(doc_id)
+        progress = await issues_service.get_review_progress(doc_id)
+        # Documents reviewed before progress tracking have no progress record, and their reviews are complete
+        in_progress = progress is not None and progress.status == ReviewStatusEnum.in_progress
+        interrupted = in_progress and progress.is_stale(settings.review_lease_seconds)
+        running = in_progress and not interrupted
 
-        if stored_issues:
-            logging.info(f"Found stored issues for document {doc_id}. Streaming issues...")
+        if running or (stored_issues and not interrupted):
+            if running:
+                logging.info(f"Review of document {doc_id} is running in another request. Streaming stored issues...")
+            else:
+                logging.info(f"Found stored issues for document {doc_id}. Streaming issues...")
 
             def issues_events():
                 yield issues_event(stored_issues)
@@ -58,13 +82,18 @@ async def get_pdf_issues(
             issues = issues_events()
 
         else:
-            logging.info(f"No issues found for document {doc_id}. Initiating review...")
+            if interrupted:
+                logging.info(f"Review of document {doc_id} was interrupted. Resuming review...")
+            else:
+                logging.info(f"No issues found for document {doc_id}. Initiating review...")
             date_time = datetime.now(timezone.utc).isoformat()
-            issues_stream = issues_service.initiate_review(doc_id, user, date_time)
+            issues_stream = issues_service.initiate_review(doc_id, user, date_time, previous_doc_id, focus_page)
 
             async def issues_events():
                 try:
-                    async for issues in issues_stream:
+                    async for issues, flow_output in issues_stream:
+                        if flow_output.first_page is not None:
+                            yield pages_event(flow_output.first_page, flow_output.last_page)
                         yield issues_event(issues)
                     yield "event: complete\n\n"
                 except Exception as e:
@@ -87,6 +116,48 @@ async def get_pdf_issues(
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+@router.get(
+    "/api/v1/review/{doc_id}/issues/changes",
+    summary="Get the issues of a PDF document changed since a cursor",
+    responses={
+        HTTPStatus.OK: {"description": "Issue changes retrieved successfully"},
+        HTTPStatus.UNAUTHORIZED: {"description": "Unauthorized"},
+        HTTPStatus.UNPROCESSABLE_ENTITY: {"description": "Validation error"},
+        HTTPStatus.INTERNAL_SERVER_ERROR: {"description": "Internal server error"},
+    },
+    response_model=IssueChanges
+)
+async def get_issue_changes(
+    doc_id: str,
+    since: Optional[int] = Query(None, ge=0),
+    user=Depends(validate_authenticated),
+    issues_service: IssuesService = Depends(get_issues_service),
+) -> IssueChanges:
+    """
+    Retrieve the issues of the document created, modified or deleted since a cursor, so that a client refreshing
+    its issue list only transfers the changes made by other reviewers or by a running review.
+
+    Issues changed in the second of the cursor are returned again, so clients replace the issues they have by id,
+    then remove the deleted issues.
+
+    Args:
+        doc_id (str): The filename of the document.
+        since (int): Optional cursor returned by a previous call. Without it, all the issues are returned.
+        user (Depends): The authenticated user.
+        issues_service (IssuesService): The issues service instance.
+
+    Returns:
+        IssueChanges: The changed issues, the ids of the deleted issues and the cursor of the next call.
+    """
+    logging.info(f"Request received for the issue changes of document {doc_id} since {since}.")
+
+    try:
+        return await issues_service.get_issue_changes(doc_id, since)
+    except Exception as e:
+        logging.error(f"Unexpected error occurred retrieving the issue changes of document {doc_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
 @router.patch(
     "/api/v1/review/{doc_id}/issues/{issue_id}/accept",
     summary="Accept issue and optionally provide feedback",
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta, timezone
+from dependencies import get_metrics_service
+from common.logger import get_logger
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response
+from services.metrics_service import MetricsService
+from security.auth import validate_authenticated
+from config.config import settings
+from common.models import IssueType, MetricsGranularityEnum, ReviewMetricsBucket
+
+
+router = APIRouter()
+logging = get_logger(__name__)
+
+
+@router.get(
+    "/api/v1/metrics/reviews",
+    summary="Get reviewer acceptance and dismissal metrics over time",
+    responses={
+        200: {"description": "Metrics retrieved successfully"},
+        400: {"description": "Invalid time range"},
+        401: {"description": "Unauthorized"},
+        500: {"description": "Internal server error"},
+    },
+    response_model=List[ReviewMetricsBucket]
+)
+async def get_review_metrics(
+    response: Response,
+    granularity: MetricsGranularityEnum = MetricsGranularityEnum.day,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    issue_type: Optional[IssueType] = None,
+    user=Depends(validate_authenticated),
+    metrics_service: MetricsService = Depends(get_metrics_service)
+) -> List[ReviewMetricsBucket]:
+    """
+    Retrieve the issues created, accepted and dismissed per hour or day and issue type.
+
+    The metrics are served from rollups maintained as issues are stored, accepted and dismissed, so a query costs
+    the number of buckets in the range rather than the number of issues. Responses may be up to
+    `metrics_cache_seconds` old.
+
+    Args:
+        granularity (MetricsGranularityEnum): hour or day buckets.
+        start (str): Optional ISO date or time stamp in the first bucket, 30 days before end by default.
+        end (str): Optional ISO date or time stamp in the last bucket, now by default.
+        issue_type (IssueType): Optional issue type, all types by default.
+        user (Depends): The authenticated user.
+
+    Returns:
+        List[ReviewMetricsBucket]: The buckets with issues, ordered by time, with their acceptance rate.
+    """
+    try:
+        end_time = datetime.fromisoformat(end) if end else datetime.now(timezone.utc)
+        start_time = datetime.fromisoformat(start) if start else end_time - timedelta(days=30)
+    except ValueError as e:
+        logging.error(f"Invalid metrics time range {start} - {end}: {str(e)}")
+        raise HTTPException(status_code=400, detail="Invalid time range")
+
+    buckets = await metrics_service.get_metrics(
+        granularity, start_time.isoformat(), end_time.isoformat(), issue_type.value if issue_type else None
+    )
+    response.headers["Cache-Control"] = f"private, max-age={settings.metrics_cache_seconds}"
+    return buckets
@@ -1,7 +1,7 @@
 import json
 import os
 import ssl
-from typing import Any, AsyncGenerator
+from typing import Any, AsyncGenerator, List, Optional
 import requests
 from http import HTTPStatus
 from fastapi import HTTPException
@@ -17,13 +17,27 @@ class AMLClient:
         self.aml_client = ml_client_instance
 
 
-    async def call_aml_endpoint(self, endpoint_name: str, pdf_name: str) -> AsyncGenerator[Any, Any]:
+    async def call_aml_endpoint(
+        self,
+        endpoint_name: str,
+        pdf_name: str,
+        previous_pdf_name: Optional[str] = None,
+        previous_issues: Optional[str] = None,
+        focus_page: Optional[int] = None,
+        start_chunk: int = 0,
+        completed_chunks: Optional[List[int]] = None
+    ) -> AsyncGenerator[Any, Any]:
         """
         Calls the Azure ML endpoint with the name and data.
 
         Args:
             name (str): The name of the Azure ML endpoint.
             data (str): The body of the request.
+            previous_pdf_name (str): optional - the previous version of the document, for an incremental review.
+            previous_issues (str): optional - JSON with the issues of the previous version to carry over.
+            focus_page (int): optional - the page the reviewer is looking at, reviewed first.
+            start_chunk (int): optional - the first chunk to review, to resume an interrupted review.
+            completed_chunks (List[int]): optional - the chunks after start_chunk the interrupted review completed.
         """
         if not os.environ.get('PYTHONHTTPSVERIFY', '') and getattr(ssl, '_create_unverified_context', None):
             ssl._create_default_https_context = ssl._create_unverified_context
@@ -39,8 +53,19 @@ class AMLClient:
         data = {
             "pdf_name": pdf_name,
             "stream": True,
-            "pagination": settings.aml_streaming_batch_size
+            "pagination": settings.aml_streaming_batch_size,
+            "tokens_per_chunk": settings.aml_streaming_tokens_per_chunk,
+            "di_pages_per_range": settings.aml_di_pages_per_range
         }
+        if previous_pdf_name:
+            data["previous_pdf_name"] = previous_pdf_name
+            data["previous_issues"] = previous_issues or ""
+        if focus_page:
+            data["focus_page"] = focus_page
+        if start_chunk:
+            data["start_chunk"] = start_chunk
+        if completed_chunks:
+            data["completed_chunks"] = completed_chunks
 
         try:
             logging.info("Sending POST request to the Azure ML endpoint...")
@@ -1,19 +1,55 @@
 from common.logger import get_logger
+import json
 import uuid
 from datetime import datetime, timezone
-from typing import AsyncGenerator, List
+from typing import AsyncGenerator, Dict, List, Optional
 from services.aml_client import AMLClient
 from database.issues_repository import IssuesRepository
+from database.reviews_repository import ReviewsRepository
+from services.metrics_service import MetricsService
 from fastapi_azure_auth.user import User
 from config.config import settings
-from common.models import FlowOutputChunk, Issue, IssueStatusEnum, ModifiedFieldsModel, DismissalFeedbackModel
+from common.models import (
+    FlowOutputChunk, Issue, IssueChanges, IssueStatusEnum, ModifiedFieldsModel, DismissalFeedbackModel, ReviewProgress, ReviewStatusEnum
+)
 
 logging = get_logger(__name__)
 
+# The fields of the decision of the reviewers on an issue
+REVIEW_FIELDS = ("status", "resolved_by", "resolved_at_UTC", "modified_fields", "dismissal_feedback")
+
+
+def _carry_over_key(issue: Issue) -> tuple:
+    # Carrying an issue over only changes its location within the document
+    return issue.type, issue.text, issue.explanation, issue.suggested_fix, issue.location.source_sentence
+
+
+def carry_over_review(issue: Issue, previous_reviews: Dict[tuple, List[Issue]]) -> Issue:
+    """
+    Returns a carried over issue with the decision of the reviewers on the same issue of the previous version,
+    if it was accepted or dismissed.
+    """
+    reviewed = previous_reviews.get(_carry_over_key(issue))
+    if not reviewed:
+        return issue
+    previous = reviewed.pop()
+    return issue.model_copy(
+        update={**{field: getattr(previous, field) for field in REVIEW_FIELDS}, "review_carried_over": True}
+    )
+
+
 class IssuesService:
-    def __init__(self, issues_repository: IssuesRepository, aml_client: AMLClient) -> None:
+    def __init__(
+        self,
+        issues_repository: IssuesRepository,
+        reviews_repository: ReviewsRepository,
+        metrics_service: MetricsService,
+        aml_client: AMLClient
+    ) -> None:
         self.aml_client = aml_client
         self.issues_repository = issues_repository
+        self.reviews_repository = reviews_repository
+        self.metrics_service = metrics_service
 
 
     async def get_issues_data(self, doc_id: str) -> List[Issue]:
@@ -36,25 +72,160 @@ class IssuesService:
             raise e
 
 
-    async def initiate_review(self, pdf_name: str, user: User, time_stamp: datetime) -> AsyncGenerator:
+    async def get_issue_changes(self, doc_id: str, since: Optional[int] = None) -> IssueChanges:
+        """
+        Retrieves the issues of a document changed since a cursor, for clients refreshing their issue list.
+
+        Args:
+            doc_id (str): Document ID
+            since (int): Optional cursor returned by a previous call, all the issues by default
+
+        Returns:
+            IssueChanges: The issues created or modified and the ids of the issues deleted since the cursor,
+                with the cursor of the next call
+        """
+        issues, cursor = await self.issues_repository.get_issues_since(doc_id, since)
+        deleted_issue_ids = []
+        if since is not None:
+            progress = await self.reviews_repository.get_progress(doc_id)
+            if progress and progress.deleted_issue_ids and (
+                progress.issues_deleted_ts is None or progress.issues_deleted_ts >= since
+            ):
+                deleted_issue_ids = progress.deleted_issue_ids
+
+        return IssueChanges(issues=issues, deleted_issue_ids=deleted_issue_ids, cursor=cursor)
+
+
+    async def get_review_progress(self, doc_id: str) -> Optional[ReviewProgress]:
+        """
+        Retrieves the review progress of a document.
+
+        Args:
+            doc_id (str): Document ID
+
+        Returns:
+            ReviewProgress: The progress of the last review of the document, or None if it has none
+        """
+        return await self.reviews_repository.get_progress(doc_id)
+
+
+    async def initiate_review(
+        self,
+        pdf_name: str,
+        user: User,
+        time_stamp: datetime,
+        previous_pdf_name: Optional[str] = None,
+        focus_page: Optional[int] = None
+    ) -> AsyncGenerator:
         """
-        Initiates a review for a given document ID.
+        Initiates a review for a given document ID, or resumes it if the last review was interrupted.
+
+        The progress of the review is stored before the issues of each flow output, as a heartbeat, and after the
+        issues of each completed chunk. A review is interrupted once its progress is older than
+        `review_lease_seconds`. A resumed review keeps the issues of the completed chunks, deletes the others and
+        only reviews the chunks that did not complete.
+
+        The progress is only stored if no other request stored it since, so a single request runs the review: a
+        review that is still running is not resumed, and a review resumed by another request stops.
 
         Args:
             pdf_name (str): file name of the PDF
             user (dict): User initiating the review
             time_stamp (datetime): Time stamp of the review initiation
+            previous_pdf_name (str): optional - file name of the previous version of the PDF, to only review
+                the paragraphs that changed and carry over the issues of the unchanged ones
+            focus_page (int): optional - the page the reviewer is looking at, reviewed first
 
         Returns:
-            Generator: Stream of issues for the document
+            Generator: Stream of (issues, flow output chunk) pairs for the document, where the chunk carries
+                the page range the issues were found in. A resumed review starts with the kept issues.
         """
+        async def store_progress() -> int:
+            progress_ts = await self.reviews_repository.store_progress(progress)
+            if progress_ts is None:
+                raise RuntimeError(f"Review of document {pdf_name} is run by another request.")
+            return progress_ts
+
         try:
-            logging.info(f"Initiating review for document {pdf_name}")
+            progress = await self.reviews_repository.get_progress(pdf_name)
+            if progress and progress.status == ReviewStatusEnum.in_progress:
+                if not progress.is_stale(settings.review_lease_seconds):
+                    raise ValueError(f"Review of document {pdf_name} is already running.")
+
+                # The chunks depend on the previous version, so a resumed review keeps the one it started with
+                previous_pdf_name = progress.previous_doc_id
+                start_chunk = progress.next_chunk
+                completed_chunks = progress.completed_chunks
+                logging.info(f"Resuming review for document {pdf_name} from chunk {start_chunk}")
+
+                # Issues carried over from the previous version are sent again unless a chunk was completed
+                stored_issues = await self.issues_repository.get_issues(pdf_name)
+                stale_issues = [
+                    issue for issue in stored_issues
+                    if (issue.chunk_index is None and start_chunk == 0)
+                    or (issue.chunk_index is not None and issue.chunk_index >= start_chunk
+                        and issue.chunk_index not in completed_chunks)
+                ]
+
+                # Claims the review before deleting anything, so that concurrent requests do not resume it too.
+                # Deletions have no _ts, so the same write records them for the clients syncing the issue changes.
+                progress.updated_at_UTC = datetime.now(timezone.utc).isoformat()
+                if stale_issues:
+                    claimed = await self.reviews_repository.record_deleted_issues(
+                        progress, [issue.id for issue in stale_issues]
+                    )
+                else:
+                    claimed = await self.reviews_repository.store_progress(progress)
+                if claimed is None:
+                    raise RuntimeError(f"Review of document {pdf_name} is run by another request.")
+
+                await self.issues_repository.delete_issues(stale_issues)
+                await self.metrics_service.record_changes(stale_issues, [None] * len(stale_issues))
+
+                stale_ids = {issue.id for issue in stale_issues}
+                kept_issues = [issue for issue in stored_issues if issue.id not in stale_ids]
+                if kept_issues:
+                    yield kept_issues, FlowOutputChunk(issues=[])
+            else:
+                logging.info(f"Initiating review for document {pdf_name}")
+                start_chunk = 0
+                completed_chunks = []
+                completed_progress = progress
+                progress = ReviewProgress(
+                    id=pdf_name,
+                    doc_id=pdf_name,
+                    status=ReviewStatusEnum.in_progress,
+                    previous_doc_id=previous_pdf_name,
+                    review_initiated_by=user.oid,
+                    review_initiated_at_UTC=time_stamp
+                )
+                if completed_progress:
+                    # Replaces the record of the completed review, unless another request already did
+                    progress._etag = completed_progress._etag
+                await store_progress()
+
+            previous_issues = None
+            previous_reviews: Dict[tuple, List[Issue]] = {}
+            if previous_pdf_name:
+                logging.info(f"Reviewing changes since previous version {previous_pdf_name}")
+                issues = await self.issues_repository.get_issues(previous_pdf_name)
+                previous_issues = json.dumps({"issues": [issue.model_dump() for issue in issues]})
+                for issue in issues:
+                    if issue.status != IssueStatusEnum.not_reviewed and issue.location:
+                        previous_reviews.setdefault(_carry_over_key(issue), []).append(issue)
 
             # Initiate review to get a stream of issues
-            stream_data = self.aml_client.call_aml_endpoint(settings.aml_endpoint_name, pdf_name)
+            stream_data = self.aml_client.call_aml_endpoint(
+                settings.aml_endpoint_name, pdf_name, previous_pdf_name, previous_issues, focus_page, start_chunk,
+                completed_chunks
+            )
             async for chunk in stream_data:
                 flow_output = FlowOutputChunk.model_validate_json(chunk)
+
+                # Renews the lease of the review, and stops before storing issues if another request resumed it
+                progress.updated_at_UTC = datetime.now(timezone.utc).isoformat()
+                await store_progress()
+
                 issues = [
                     Issue(
                         **i.model_dump(),
@@ -62,13 +233,30 @@ class IssuesService:
                         doc_id=pdf_name,
                         status=IssueStatusEnum.not_reviewed,
                         review_initiated_by=user.oid,
-                        review_initiated_at_UTC=time_stamp
+                        review_initiated_at_UTC=time_stamp,
+                        chunk_index=flow_output.chunk_index
                     ) for i in flow_output.issues
                 ]
 
+                # Issues carried over from the previous version keep the decision of the reviewers, which is
+                # counted in the metrics of the previous version
+                if flow_output.chunk_index is None:
+                    issues = [carry_over_review(issue, previous_reviews) for issue in issues]
+
                 logging.info(f"Storing issues for document {pdf_name}")
                 await self.issues_repository.store_issues(issues)
-                yield issues
+                await self.metrics_service.record_changes([None] * len(issues), issues)
+
+                # The chunk only counts as reviewed once the issues of all its agents are stored
+                if flow_output.chunk_complete:
+                    progress.complete_chunk(flow_output.chunk_index)
+                    progress.updated_at_UTC = datetime.now(timezone.utc).isoformat()
+                    await store_progress()
+                yield issues, flow_output
+
+            progress.status = ReviewStatusEnum.completed
+            progress.updated_at_UTC = datetime.now(timezone.utc).isoformat()
+            await store_progress()
 
         except Exception as e:
             logging.error(f"Error initiating review for document {pdf_name}: {str(e)}")
@@ -92,7 +280,8 @@ class IssuesService:
             update_fields = {
                 "status": IssueStatusEnum.accepted,
                 "resolved_by": user.oid,
-                "resolved_at_UTC": datetime.now(timezone.utc).isoformat()
+                "resolved_at_UTC": datetime.now(timezone.utc).isoformat(),
+                "review_carried_over": False
             }
 
             if modified_fields:
@@ -101,6 +290,7 @@ class IssuesService:
             #  Store and return issue
             updated_issue = issue.model_copy(update=update_fields)
             await self.issues_repository.store_issues([updated_issue])
+            await self.metrics_service.record_changes([issue], [updated_issue])
             return updated_issue
 
         except ValueError as e:
@@ -131,17 +321,19 @@ class IssuesService:
             update_fields = {
                 "status": IssueStatusEnum.dismissed,
                 "resolved_by": user.oid,
-                "resolved_at_UTC": datetime.now(timezone.utc).isoformat()
+                "resolved_at_UTC": datetime.now(timezone.utc).isoformat(),
+                "review_carried_over": False
             }
 
             if dismissal_feedback:
                 update_fields["dismissal_feedback"] = dismissal_feedback.model_dump()
 
-            return await self.issues_repository.update_issue(
-                doc_id,
-                issue_id,
-                update_fields
-            )
+            # The previous version of the issue is needed to move it between the metrics counters
+            issue = await self.issues_repository.get_issue(doc_id, issue_id)
+            updated_issue = issue.model_copy(update=update_fields)
+            await self.issues_repository.store_issues([updated_issue])
+            await self.metrics_service.record_changes([issue], [updated_issue])
+            return updated_issue
 
         except ValueError as e:
             logging.error(
@@ -0,0 +1,124 @@
+from common.logger import get_logger
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from database.metrics_repository import MetricsRepository
+from config.config import settings
+from common.models import Issue, IssueStatusEnum, IssueType, MetricsGranularityEnum, ReviewMetricsBucket
+
+logging = get_logger(__name__)
+
+BUCKET_FORMATS = {
+    MetricsGranularityEnum.hour: "%Y-%m-%dT%H:00",
+    MetricsGranularityEnum.day: "%Y-%m-%d",
+}
+
+# Responses of get_metrics by query, shared by the requests of the process: (expiry, buckets)
+_cache: Dict[Tuple, Tuple[float, List[ReviewMetricsBucket]]] = {}
+
+
+def get_bucket(time_stamp: str, granularity: MetricsGranularityEnum) -> str:
+    """Returns the bucket of an ISO time stamp, in UTC."""
+    parsed = datetime.fromisoformat(time_stamp)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc)
+    return parsed.strftime(BUCKET_FORMATS[granularity])
+
+
+def get_contributions(issue: Optional[Issue]) -> Counter:
+    """
+    Returns the counters an issue adds to, by (granularity, bucket, type, counter).
+
+    An issue counts as created in the buckets of its review, and as accepted or dismissed in the buckets of its
+    resolution, according to its current status. A resolution carried over from the previous version is only
+    counted there, until the reviewers change it.
+    """
+    contributions = Counter()
+    if issue is None:
+        return contributions
+
+    # Fields updated with model_copy are not validated, so they may still be enum members
+    issue_type, status = IssueType(issue.type).value, IssueStatusEnum(issue.status).value
+    for granularity in MetricsGranularityEnum:
+        contributions[(granularity.value, get_bucket(issue.review_initiated_at_UTC, granularity), issue_type, "created")] += 1
+
+        if (status in (IssueStatusEnum.accepted, IssueStatusEnum.dismissed) and issue.resolved_at_UTC
+                and not issue.review_carried_over):
+            bucket = get_bucket(issue.resolved_at_UTC, granularity)
+            contributions[(granularity.value, bucket, issue_type, status)] += 1
+            if status == IssueStatusEnum.accepted and issue.modified_fields is not None:
+                contributions[(granularity.value, bucket, issue_type, "accepted_with_modifications")] += 1
+    return contributions
+
+
+class MetricsService:
+    def __init__(self, metrics_repository: MetricsRepository) -> None:
+        self.metrics_repository = metrics_repository
+
+
+    async def record_changes(self, previous: List[Optional[Issue]], current: List[Optional[Issue]]) -> None:
+        """
+        Updates the rollups with the changes of issues: created (no previous version), updated or deleted (no
+        current version).
+
+        The contributions of the previous versions are subtracted and those of the current versions added, so an
+        issue accepted after having been dismissed moves from the dismissed to the accepted counter. The changes
+        are summed per bucket first, so each bucket is written once. Failures are logged and do not fail the
+        change of the issues.
+
+        Args:
+            previous: The previous version of each issue, or None for created issues.
+            current: The current version of each issue, or None for deleted issues.
+        """
+        changes = Counter()
+        for issue in current:
+            changes.update(get_contributions(issue))
+        for issue in previous:
+            changes.subtract(get_contributions(issue))
+
+        increments: Dict[Tuple[str, str, str], Dict[str, int]] = {}
+        for (granularity, bucket, issue_type, counter), value in changes.items():
+            if value:
+                increments.setdefault((granularity, bucket, issue_type), {})[counter] = value
+
+        for (granularity, bucket, issue_type), counters in increments.items():
+            try:
+                await self.metrics_repository.increment_bucket(granularity, bucket, issue_type, counters)
+            except Exception as e:
+                logging.error(f"Failed to update the {granularity} metrics of {bucket} for {issue_type}: {e}")
+
+        # Responses of this process include the change right away, other processes after metrics_cache_seconds
+        if increments:
+            _cache.clear()
+
+
+    async def get_metrics(
+        self, granularity: MetricsGranularityEnum, start: str, end: str, issue_type: Optional[str] = None
+    ) -> List[ReviewMetricsBucket]:
+        """
+        Retrieves the reviewer metrics per bucket and issue type, from the rollups.
+
+        Args:
+            granularity: hour or day.
+            start: An ISO date or time stamp in the first bucket.
+            end: An ISO date or time stamp in the last bucket.
+            issue_type: optional - only the buckets of this issue type.
+
+        Returns:
+            List[ReviewMetricsBucket]: The buckets with issues, ordered by time, with their acceptance rate.
+        """
+        granularity = MetricsGranularityEnum(granularity).value
+        start_bucket, end_bucket = get_bucket(start, granularity), get_bucket(end, granularity)
+        key = (granularity, start_bucket, end_bucket, issue_type)
+        cached = _cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+
+        buckets = await self.metrics_repository.get_buckets(granularity, start_bucket, end_bucket, issue_type)
+        for bucket in buckets:
+            resolved = bucket.accepted + bucket.dismissed
+            bucket.acceptance_rate = bucket.accepted / resolved * 100 if resolved else None
+
+        _cache[key] = (time.monotonic() + settings.metrics_cache_seconds, buckets)
+        return buckets
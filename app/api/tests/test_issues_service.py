@@ -0,0 +1,198 @@
+import itertools
+import json
+import unittest
+from importlib.util import find_spec
+from types import SimpleNamespace
+from unittest import mock
+
+
+def installed(name):
+    try:
+        return find_spec(name) is not None
+    except ModuleNotFoundError:
+        return False
+
+
+API_REQUIREMENTS = ("fastapi", "fastapi_azure_auth", "azure.cosmos", "pydantic_settings", "sseclient")
+API_REQUIREMENTS_INSTALLED = all(installed(name) for name in API_REQUIREMENTS)
+
+if API_REQUIREMENTS_INSTALLED:
+    from common.models import IssueStatusEnum
+    from database import issues_repository, metrics_repository, reviews_repository
+    from services.issues_service import IssuesService
+    from services.metrics_service import MetricsService
+
+
+class FakeCosmosDBClient:
+    """An in-memory container, with the _ts and _etag of Cosmos DB."""
+
+    clock = itertools.count(1000)
+    etags = itertools.count()
+
+    def __init__(self, container_name):
+        self.items = {}
+
+    async def store_item(self, item):
+        item = {**item, "_ts": next(self.clock), "_etag": str(next(self.etags))}
+        self.items[item["id"]] = item
+        return item
+
+    async def store_item_if_unchanged(self, item, etag):
+        stored = self.items.get(item["id"])
+        if (stored["_etag"] if stored else None) != etag:
+            return None
+        return await self.store_item(item)
+
+    async def retrieve_item_by_id(self, item_id, partition_key):
+        return self.items.get(item_id)
+
+    async def retrieve_items_by_values(self, filters):
+        return [item for item in self.items.values() if all(item.get(k) == v for k, v in filters.items())]
+
+    async def delete_item(self, item_id, partition_key):
+        del self.items[item_id]
+
+    async def query_items(self, query, parameters, partition_key=None):
+        values = {parameter["name"]: parameter["value"] for parameter in parameters}
+        return [
+            item for item in self.items.values()
+            if item["doc_id"] == values["@doc_id"] and item["_ts"] >= values.get("@since", 0)
+        ]
+
+    async def increment_item(self, item_id, partition_key, increments, defaults):
+        item = self.items.setdefault(item_id, {**defaults, "id": item_id})
+        for field, value in increments.items():
+            item[field] += value
+
+
+class FakeAMLClient:
+    def __init__(self, *outputs):
+        self.outputs = outputs
+        self.calls = []
+
+    async def call_aml_endpoint(self, *args):
+        self.calls.append(args)
+        for output in self.outputs:
+            yield json.dumps(output)
+
+
+def flow_output(chunk_index, *texts, chunk_complete=None):
+    issues = [
+        {"type": "Grammar & Spelling", "text": text, "explanation": "A typo.", "suggested_fix": "fix",
+         "location": {"source_sentence": f"The {text} sentence.", "page_num": 1, "bounding_box": [], "para_index": 0}}
+        for text in texts
+    ]
+    # The issues carried over from the previous version are not part of a chunk
+    if chunk_complete is None:
+        chunk_complete = chunk_index is not None
+    return {"issues": issues, "chunk_index": chunk_index, "chunk_complete": chunk_complete}
+
+
+@unittest.skipUnless(API_REQUIREMENTS_INSTALLED, "the API requirements are not installed")
+class TestIssuesService(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        patches = [
+            mock.patch.object(module, "CosmosDBClient", FakeCosmosDBClient)
+            for module in (issues_repository, metrics_repository, reviews_repository)
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        self.issues_repository = issues_repository.IssuesRepository()
+        self.reviews_repository = reviews_repository.ReviewsRepository()
+        self.metrics_repository = metrics_repository.MetricsRepository()
+        self.service = IssuesService(
+            self.issues_repository, self.reviews_repository, MetricsService(self.metrics_repository), FakeAMLClient()
+        )
+        self.user = SimpleNamespace(oid="reviewer")
+
+    async def review(self, doc_id, *outputs, previous_doc_id=None, time_stamp="2024-10-01T09:00:00+00:00"):
+        self.service.aml_client = FakeAMLClient(*outputs)
+        stream = self.service.initiate_review(doc_id, self.user, time_stamp, previous_pdf_name=previous_doc_id)
+        return [issue async for issues, _ in stream for issue in issues]
+
+    def interrupt(self, doc_id):
+        # A review not updated within the lease was interrupted
+        self.reviews_repository.db_client.items[doc_id]["updated_at_UTC"] = "2024-10-01T09:00:00+00:00"
+
+    def counters(self):
+        totals = {"created": 0, "accepted": 0, "dismissed": 0}
+        for bucket in self.metrics_repository.db_client.items.values():
+            if bucket["granularity"] == "day":
+                for counter in totals:
+                    totals[counter] += bucket[counter]
+        return totals
+
+    async def test_resume_skips_completed_chunks(self):
+        # Chunks reviewed out of order, from a focus page: chunk 0 is interrupted after chunk 2 completed
+        self.service.aml_client = FakeAMLClient(
+            flow_output(2, "late"), flow_output(0, "partial", chunk_complete=False), flow_output(1, "never")
+        )
+        stream = self.service.initiate_review("v1", self.user, "2024-10-01T09:00:00+00:00")
+        await anext(stream)
+        await anext(stream)
+        await stream.aclose()
+        self.interrupt("v1")
+
+        issues = await self.review("v1", flow_output(0, "first"), flow_output(1, "second"))
+        self.assertEqual(sorted(issue.text for issue in issues), ["first", "late", "second"])
+        *_, start_chunk, completed_chunks = self.service.aml_client.calls[0]
+        self.assertEqual((start_chunk, completed_chunks), (0, [2]))
+
+        progress = await self.reviews_repository.get_progress("v1")
+        self.assertEqual((progress.status, progress.next_chunk), ("completed", 3))
+
+    async def test_issue_changes_send_the_issues_deleted_on_resume(self):
+        self.service.aml_client = FakeAMLClient(flow_output(0, "kept"), flow_output(1, "partial", chunk_complete=False))
+        stream = self.service.initiate_review("v1", self.user, "2024-10-01T09:00:00+00:00")
+        await anext(stream)
+        await anext(stream)
+        await stream.aclose()
+        self.interrupt("v1")
+
+        changes = await self.service.get_issue_changes("v1")
+        self.assertEqual(sorted(issue.text for issue in changes.issues), ["kept", "partial"])
+        [partial] = [issue for issue in changes.issues if issue.text == "partial"]
+
+        await self.review("v1", flow_output(1, "redone"))
+        changes = await self.service.get_issue_changes("v1", since=changes.cursor)
+        self.assertIn("redone", [issue.text for issue in changes.issues])
+        self.assertEqual(changes.deleted_issue_ids, [partial.id])
+
+        # The deletions are dated by the write that recorded them, before the issues of the resumed review
+        progress = await self.reviews_repository.get_progress("v1")
+        self.assertLess(progress.issues_deleted_ts, changes.cursor)
+        changes = await self.service.get_issue_changes("v1", since=changes.cursor)
+        self.assertEqual(changes.deleted_issue_ids, [])
+
+    async def test_carried_over_decision_is_counted_once(self):
+        [issue] = await self.review("v1", flow_output(0, "speling"))
+        await self.service.accept_issue(issue.id, "v1", self.user)
+
+        [carried_over] = await self.review(
+            "v2", flow_output(None, "speling"), previous_doc_id="v1", time_stamp="2024-10-02T09:00:00+00:00"
+        )
+        self.assertEqual(carried_over.status, IssueStatusEnum.accepted)
+        self.assertEqual(self.counters(), {"created": 2, "accepted": 1, "dismissed": 0})
+
+        await self.service.dismiss_issue(carried_over.id, "v2", self.user)
+        self.assertEqual(self.counters(), {"created": 2, "accepted": 1, "dismissed": 1})
+
+    async def test_deleted_carried_over_decision_is_not_subtracted(self):
+        [issue] = await self.review("v1", flow_output(0, "speling"))
+        await self.service.accept_issue(issue.id, "v1", self.user)
+
+        # The review of v2 is interrupted before its first chunk completes, so the carried over issue is deleted
+        self.service.aml_client = FakeAMLClient(flow_output(None, "speling"), flow_output(0, "typo"))
+        stream = self.service.initiate_review("v2", self.user, "2024-10-02T09:00:00+00:00", previous_pdf_name="v1")
+        await anext(stream)
+        await stream.aclose()
+        self.interrupt("v2")
+
+        await self.review("v2", flow_output(None, "speling"), flow_output(0))
+        self.assertEqual(self.counters(), {"created": 2, "accepted": 1, "dismissed": 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -69,6 +69,10 @@ function Review() {
   const [selectedIssueAnnotationId, setSelectedIssueAnnotationId] = useState<string>();
 
   const abortControllerRef = useRef<AbortController>();
+  // Pages whose issues have arrived during the running check
+  const [reviewedPages, setReviewedPages] = useState<Set<number>>(new Set());
+  // The page in view when a check starts is reviewed first
+  const pageNumberRef = useRef<number>(1);
 
   const classes = useStyles();
   const [searchParams] = useSearchParams();
@@ -165,11 +169,12 @@ function Review() {
       setCheckInProgress(true);
       setCheckError(undefined);
       setCheckComplete(false);
+      setReviewedPages(new Set());
 
       abortControllerRef.current = new AbortController();
 
       streamApi(
-        `${docId}/issues`,
+        `${docId}/issues?focus_page=${pageNumberRef.current}`,
         (msg) => {
           switch (msg.event) {
             case APIEvent.Issues: {
@@ -192,6 +197,18 @@ function Review() {
               }
               break;
             }
+            case APIEvent.Pages: {
+              // Page range of the next batch of issues; each issue is placed using its own location
+              const { first_page, last_page } = JSON.parse(msg.data) as { first_page: number, last_page: number };
+              setReviewedPages(pages => {
+                const reviewed = new Set(pages);
+                for (let page = first_page; page <= last_page; page++) {
+                  reviewed.add(page);
+                }
+                return reviewed;
+              });
+              break;
+            }
             case APIEvent.Error: {
               throw new Error(msg.data);
             }
@@ -248,6 +265,10 @@ function Review() {
     }
   }, [docId]);
 
+  useEffect(() => {
+    pageNumberRef.current = pageNumber;
+  }, [pageNumber]);
+
   // Run check when document ID is set
   useEffect(() => {
     runCheck();
@@ -275,6 +296,12 @@ function Review() {
                   disabled={pageNumber === 1}
                 />
                   <small><b>{pageNumber}</b> / {numPages}</small>
+                  {
+                    // Shows whether the issues of the page in view have arrived while the check runs
+                    checkInProgress && (reviewedPages.has(pageNumber)
+                      ? <CheckmarkFilled aria-label="Page reviewed" />
+                      : <Spinner size="extra-tiny" aria-label="Reviewing page" />)
+                  }
                 <ToolbarButton
                   aria-label="Next page"
                   icon={<ChevronDown16Regular />}
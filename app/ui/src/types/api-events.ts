@@ -1,5 +1,6 @@
 export enum APIEvent {
   Error = 'error',
   Issues = 'issues',
+  Pages = 'pages',
   Complete = 'complete'
 }
@@ -1,6 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 from enum import Enum
 from typing import Optional
+from datetime import datetime, timedelta, timezone
 
 
 class Location(BaseModel):
@@ -43,8 +44,37 @@ class AllConsolidatorIssues(BaseModel):
     issues: list[ConsolidatorIssue]
 
 
+class LLMUsage(BaseModel):
+    requests: int = 0
+    calls: int = 0
+    cache_hits: int = 0
+    skipped_requests: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    saved_prompt_tokens: int = 0
+    saved_completion_tokens: int = 0
+    # Prompt tokens served from the prompt prefix cache of Azure OpenAI, included in prompt_tokens
+    cached_prompt_tokens: int = 0
+    # Wall time of the node's requests, including the waits in the LLM scheduler
+    seconds: float = 0.0
+
+
+class ReviewTimings(BaseModel):
+    # Wall time of the review stages of a document, in seconds; the LLM time is in the usage of each node
+    document_intelligence: float = 0.0
+    post_processing: float = 0.0
+    total: float = 0.0
+
+
 class AllCombinedIssues(BaseModel):
     issues: list[CombinedIssue]
+    llm_usage: Optional[dict[str, LLMUsage]] = None
+    timings: Optional[ReviewTimings] = None
+    first_page: Optional[int] = None
+    last_page: Optional[int] = None
+    # The position of the chunk in the document, and whether all the agents have reviewed it
+    chunk_index: Optional[int] = None
+    chunk_complete: bool = False
 
 
 class BaseIssue(BaseModel):
@@ -57,6 +87,10 @@ class BaseIssue(BaseModel):
 
 class FlowOutputChunk(BaseModel):
     issues: list[BaseIssue]
+    first_page: Optional[int] = None
+    last_page: Optional[int] = None
+    chunk_index: Optional[int] = None
+    chunk_complete: bool = False
 
 
 class IssueStatusEnum(str, Enum):
@@ -89,6 +123,84 @@ class Issue(BaseModel):
     resolved_at_UTC: Optional[str] = None
     modified_fields: Optional[ModifiedFieldsModel] = None
     dismissal_feedback: Optional[DismissalFeedbackModel] = None
+    # The chunk the issue was found in, None for issues carried over from the previous version
+    chunk_index: Optional[int] = None
+    # The decision of the reviewers was carried over from the previous version, where it is counted in the metrics
+    review_carried_over: bool = False
+
+    class Config:
+        use_enum_values = True
+
+
+class IssueChanges(BaseModel):
+    # Issues created or modified since the cursor of the request
+    issues: list[Issue]
+    # Issues deleted since the cursor, to be removed by the client
+    deleted_issue_ids: list[str] = []
+    # The cursor of the next request
+    cursor: int
+
+
+class ReviewStatusEnum(str, Enum):
+    in_progress = 'in_progress'
+    completed = 'completed'
+
+
+class ReviewProgress(BaseModel):
+    id: str
+    doc_id: str
+    status: ReviewStatusEnum
+    previous_doc_id: Optional[str] = None
+    # The first chunk not reviewed yet; a resumed review starts from it
+    next_chunk: int = 0
+    # Chunks after next_chunk that were reviewed already, as chunks complete out of order
+    completed_chunks: list[int] = []
+    review_initiated_by: str
+    review_initiated_at_UTC: str
+    updated_at_UTC: Optional[str] = None
+    # Issues deleted when the review was resumed, and the Cosmos _ts by which they were deleted, None until recorded
+    deleted_issue_ids: list[str] = []
+    issues_deleted_ts: Optional[int] = None
+    # The Cosmos _etag of the record when it was read or last stored, to detect writes of other requests
+    _etag: Optional[str] = PrivateAttr(default=None)
+
+    def is_stale(self, lease_seconds: int) -> bool:
+        """Whether the review has not updated its progress for longer than the lease, i.e. it was interrupted."""
+        last_update = datetime.fromisoformat(self.updated_at_UTC or self.review_initiated_at_UTC)
+        if last_update.tzinfo is None:
+            last_update = last_update.replace(tzinfo=timezone.utc)
+        return datetime.now(timezone.utc) - last_update > timedelta(seconds=lease_seconds)
+
+    def complete_chunk(self, chunk_index: int) -> None:
+        completed = set(self.completed_chunks)
+        completed.add(chunk_index)
+        while self.next_chunk in completed:
+            completed.remove(self.next_chunk)
+            self.next_chunk += 1
+        self.completed_chunks = sorted(completed)
+
+    class Config:
+        use_enum_values = True
+
+
+class MetricsGranularityEnum(str, Enum):
+    hour = 'hour'
+    day = 'day'
+
+
+class ReviewMetricsBucket(BaseModel):
+    id: str
+    granularity: MetricsGranularityEnum
+    # The start of the bucket in UTC: YYYY-MM-DDTHH:00 for hours, YYYY-MM-DD for days
+    bucket: str
+    type: IssueType
+    # Issues found by reviews initiated in the bucket
+    created: int = 0
+    # Issues resolved in the bucket, by their current status
+    accepted: int = 0
+    dismissed: int = 0
+    accepted_with_modifications: int = 0
+    acceptance_rate: Optional[float] = None
 
     class Config:
         use_enum_values = True
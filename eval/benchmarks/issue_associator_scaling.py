@@ -0,0 +1,122 @@
+"""
+Scaling benchmark of the issue association, comparing every pair against the prefiltered matching.
+
+Golden sets of increasing size are generated with sentences of `--words` words on average, drawn from a
+vocabulary of `--vocabulary` generated words with Zipf-distributed frequencies like natural text. Most detected
+issues are edited copies of a ground truth sentence, the others are unrelated sentences. A small vocabulary makes
+unrelated sentences look alike character by character, which is the worst case for the prefilters. For each size the associations
+of both modes are checked to be identical, and the time of each mode and of the optimal assignment are reported.
+
+Usage:
+    python eval/benchmarks/issue_associator_scaling.py --sizes 250,500,1000,2000
+"""
+import sys
+import json
+import time
+import random
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parents[2]))
+
+from eval.src.issue_associator import IssueAssociator  # noqa: E402
+
+ISSUE_TYPES = ["Grammar & Spelling", "Definitive Language"]
+LETTERS = "etaoinshrdlcumwfgypbvkjxqz"
+
+
+def create_vocabulary(rnd, size):
+    words = ["".join(rnd.choice(LETTERS[:rnd.randint(8, 26)]) for _ in range(rnd.randint(2, 10))) for _ in range(size)]
+    weights = [1 / rank for rank in range(1, size + 1)]
+    return words, weights
+
+
+def create_sentence(rnd, vocabulary, words):
+    return " ".join(rnd.choices(*vocabulary, k=max(1, int(rnd.gauss(words, words / 3)))))
+
+
+def edit_sentence(rnd, sentence):
+    characters = list(sentence)
+    for _ in range(rnd.randint(0, 8)):
+        position = rnd.randrange(len(characters) + 1)
+        if characters and rnd.random() < 0.5:
+            del characters[min(position, len(characters) - 1)]
+        else:
+            characters.insert(position, rnd.choice("abcdefghijklmnopqrstuvwxyz "))
+    return "".join(characters)
+
+
+def create_issues(size, words, vocabulary_size, match_rate, seed):
+    rnd = random.Random(seed)
+    vocabulary = create_vocabulary(rnd, vocabulary_size)
+    ground_truth = [
+        {"type": rnd.choice(ISSUE_TYPES),
+         "location": {"source_sentence": create_sentence(rnd, vocabulary, words), "page_num": page}}
+        for page in (rnd.randint(1, max(1, size // 20)) for _ in range(size))
+    ]
+    detected = []
+    for _ in range(size):
+        if rnd.random() < match_rate:
+            truth = rnd.choice(ground_truth)
+            location = {"source_sentence": edit_sentence(rnd, truth["location"]["source_sentence"]),
+                        "page_num": truth["location"]["page_num"]}
+            detected.append({"type": truth["type"], "location": location})
+        else:
+            location = {"source_sentence": create_sentence(rnd, vocabulary, words),
+                        "page_num": rnd.randint(1, max(1, size // 20))}
+            detected.append({"type": rnd.choice(ISSUE_TYPES), "location": location})
+    return detected, ground_truth
+
+
+def run(detected, ground_truth, threshold, **options):
+    start = time.perf_counter()
+    associator = IssueAssociator(detected, ground_truth, threshold=threshold, **options)
+    associator.associate_issues()
+    return associator, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="250,500,1000,2000", help="Issues per side of each golden set")
+    parser.add_argument("--words", type=int, default=20, help="Average words per sentence")
+    parser.add_argument("--vocabulary", type=int, default=5000, help="Distinct words")
+    parser.add_argument("--match-rate", type=float, default=0.7, help="Share of detected issues edited from the ground truth")
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--all-pairs-max-size", type=int, default=1000, help="Largest size also run comparing every pair")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    try:
+        import scipy  # noqa: F401
+        optimal = True
+    except ImportError:
+        optimal = False
+
+    results = []
+    for size in (int(size) for size in args.sizes.split(",")):
+        detected, ground_truth = create_issues(size, args.words, args.vocabulary, args.match_rate, args.seed)
+        prefiltered, prefiltered_seconds = run(detected, ground_truth, args.threshold)
+        result = {
+            "issues": size,
+            "associations": prefiltered.get_true_positives(),
+            "prefiltered_seconds": round(prefiltered_seconds, 3),
+        }
+        if size <= args.all_pairs_max_size:
+            all_pairs, all_pairs_seconds = run(detected, ground_truth, args.threshold, prefilter=False)
+            assert all_pairs.get_associations() == prefiltered.get_associations(), "associations differ"
+            assert all_pairs.get_unassociated_ground_truth() == prefiltered.get_unassociated_ground_truth()
+            result["all_pairs_seconds"] = round(all_pairs_seconds, 3)
+            result["speedup"] = round(all_pairs_seconds / prefiltered_seconds, 1)
+
+        _, page_seconds = run(detected, ground_truth, args.threshold, block_by_page=True)
+        result["block_by_page_seconds"] = round(page_seconds, 3)
+        if optimal:
+            one_to_one, optimal_seconds = run(detected, ground_truth, args.threshold, assignment="optimal")
+            result["optimal_seconds"] = round(optimal_seconds, 3)
+            result["optimal_associations"] = one_to_one.get_true_positives()
+        results.append(result)
+        print(json.dumps(result), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Simulation of the early stopping of `sequential_evaluator`: how much of the golden set a prompt experiment reviews,
+and whether it stops with the right decision.
+
+A golden set of `--documents` documents is generated in three strata, each with a different mix of issue types. A
+review finds each ground truth issue with the recall of its type and adds false positives, and the baseline report is
+the evaluation of a baseline review of the whole golden set. Candidates with the same recall as the baseline, a lower
+recall for one type and a higher recall for all types are then evaluated sequentially against it, for several seeds.
+For each scenario, the decisions, the share of the golden set reviewed and the decisions that contradict the
+comparison of the full golden set are reported.
+
+Usage:
+    python eval/benchmarks/sequential_evaluation.py --documents 1000 --seeds 5
+"""
+import sys
+import json
+import random
+import argparse
+import tempfile
+from pathlib import Path
+from statistics import mean
+from collections import Counter
+
+sys.path.insert(0, str(Path(__file__).parents[2]))
+
+from eval.src.batch_evaluator import evaluate_document  # noqa: E402
+from eval.src.metric_calculator import MetricsCalculator  # noqa: E402
+from eval.src.sequential_evaluator import evaluate_sequentially  # noqa: E402
+
+ISSUE_TYPES = ["Grammar & Spelling", "Definitive Language", "Alarmist Terms"]
+# The issue type mix of each stratum of documents
+STRATA = [[0.7, 0.2, 0.1], [0.2, 0.6, 0.2], [0.3, 0.3, 0.4]]
+BASELINE_RECALL = {"Grammar & Spelling": 0.8, "Definitive Language": 0.6, "Alarmist Terms": 0.5}
+SCENARIOS = {
+    "same": BASELINE_RECALL,
+    "worse": {**BASELINE_RECALL, "Definitive Language": 0.5},
+    "better": {issue_type: recall + 0.1 for issue_type, recall in BASELINE_RECALL.items()},
+}
+WORDS = ["tender", "supply", "offer", "contract", "price", "delivery", "service", "quality", "term", "clause",
+         "bidder", "scope", "award", "budget", "notice", "period", "vendor", "annex", "lot", "criteria"]
+
+
+def sentence(rnd):
+    return " ".join(rnd.choice(WORDS) for _ in range(12))
+
+
+def create_golden_set(size, seed):
+    rnd = random.Random(seed)
+    documents = []
+    for index in range(size):
+        stratum = index % len(STRATA)
+        issues = [
+            {"type": rnd.choices(ISSUE_TYPES, STRATA[stratum])[0], "location": {"source_sentence": sentence(rnd)}}
+            for _ in range(rnd.randint(4, 16))
+        ]
+        documents.append({"name": f"doc-{index}", "stratum": stratum, "gt_json": {"issues": issues}})
+    return documents
+
+
+def review(document, recall, rnd):
+    issues = [issue for issue in document["gt_json"]["issues"] if rnd.random() < recall[issue["type"]]]
+    issues += [{"type": rnd.choice(ISSUE_TYPES), "location": {"source_sentence": sentence(rnd)}}
+               for _ in range(rnd.randint(0, 3))]
+    return {"issues": issues}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=1000)
+    parser.add_argument("--seeds", type=int, default=5)
+    parser.add_argument("--max-interval-width", type=float, default=0.1)
+    parser.add_argument("--margin", type=float, default=0.02)
+    parser.add_argument("--min-documents", type=int, default=30)
+    parser.add_argument("--batch-size", type=int, default=10)
+    args = parser.parse_args()
+
+    golden_set = create_golden_set(args.documents, seed=0)
+    rnd = random.Random(0)
+    baseline = MetricsCalculator.calculate_metrics_from_multiple_results([
+        evaluate_document(document["gt_json"], review(document, BASELINE_RECALL, rnd)) for document in golden_set
+    ])
+
+    for scenario, recall in SCENARIOS.items():
+        decisions, fractions, contradicted = Counter(), [], 0
+        for seed in range(args.seeds):
+            rnd = random.Random(seed + 1)
+            documents = [{**document, "llm_output": review(document, recall, rnd)} for document in golden_set]
+            full = MetricsCalculator.calculate_metrics_from_multiple_results([
+                evaluate_document(document["gt_json"], document["llm_output"]) for document in documents
+            ])
+            with tempfile.TemporaryDirectory() as directory:
+                report = evaluate_sequentially(
+                    documents, Path(directory), baseline=baseline, max_interval_width=args.max_interval_width,
+                    margin=args.margin, min_documents=args.min_documents, batch_size=args.batch_size, seed=seed)
+
+            decision = report["stopping"]["decision"]
+            decisions[decision] += 1
+            fractions.append(report["stopping"]["fraction"])
+            # A decision contradicts the full golden set when it is worse (better) but no metric is (every metric is)
+            differences = [full[metric][issue_type] - baseline[metric][issue_type]
+                           for metric in ("precision", "recall") for issue_type in baseline[metric]]
+            if decision == "worse" and min(differences) >= -args.margin:
+                contradicted += 1
+            if decision == "better" and min(differences) < -args.margin:
+                contradicted += 1
+
+        print(json.dumps({
+            "scenario": scenario,
+            "decisions": dict(decisions),
+            "mean_fraction_reviewed": round(mean(fractions), 3),
+            "max_fraction_reviewed": max(fractions),
+            "contradicted_by_full_golden_set": contradicted,
+        }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark of the `SystemMonitor` metrics, comparing the grouped pass with one scan of the issues per metric.
+
+Issues are generated with `--docs-ratio` issues per document on average and the columns of an export: `doc_id`,
+`type` and `status` as strings and `modified_fields` as an object or None. The previous implementation, which
+scanned the issues once per metric and sorted them by document version to count documents, is kept here as the
+baseline, with the version columns it needs. The time and the peak memory allocated by each calculation are
+reported, with the string columns as objects and as categoricals, and the metrics are checked to be equal.
+
+Usage:
+    python eval/benchmarks/system_monitor_metrics.py --sizes 1000000,10000000
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parents[2]))
+
+from eval.src.system_monitor import SystemMonitor  # noqa: E402
+
+METRICS = ["acceptance_rate", "suggestion_approval_rate", "amount_of_unique_documents_reviewed", "issue_type_distribution"]
+
+
+def create_issues(size, docs_ratio, seed):
+    rng = np.random.default_rng(seed)
+    doc_ids = np.array([f"doc-{i:08d}" for i in range(max(1, size // docs_ratio))], dtype=object)
+    modified = np.array([None, {"suggested_fix": "fix"}], dtype=object)
+    return pd.DataFrame({
+        "doc_id": doc_ids[rng.integers(0, len(doc_ids), size)],
+        "type": np.array(["Grammar & Spelling", "Definitive Language"], dtype=object)[rng.integers(0, 2, size)],
+        "status": np.array(["accepted", "dismissed", "not_reviewed"], dtype=object)[rng.integers(0, 3, size)],
+        "modified_fields": modified[(rng.random(size) < 0.3).astype(int)],
+        "doc_major_version": rng.integers(1, 3, size),
+        "doc_minor_version": rng.integers(0, 5, size),
+    })
+
+
+def legacy_metrics(issues_df):
+    """
+    The metrics as calculated before the grouped pass, one scan of the issues per metric.
+    """
+    accepted = (issues_df['status'] == 'accepted').sum()
+    reviewed = accepted + (issues_df['status'] == 'dismissed').sum()
+    accepted_with_modifications = ((issues_df['status'] == 'accepted') & (issues_df['modified_fields'].notna())).sum()
+    latest_df = issues_df.sort_values(['doc_id', 'doc_major_version', 'doc_minor_version'],
+                                      ascending=[True, False, False]).drop_duplicates(subset=['doc_id'], keep='first')
+    type_counts = issues_df['type'].value_counts()
+    return {
+        "acceptance_rate": accepted / reviewed * 100,
+        "suggestion_approval_rate": accepted_with_modifications / accepted * 100,
+        "amount_of_unique_documents_reviewed": latest_df['doc_id'].nunique(),
+        "issue_type_distribution": {"counts": type_counts.to_dict(),
+                                    "proportions": (type_counts / type_counts.sum()).to_dict()},
+    }
+
+
+def measure(calculate):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = calculate()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, round(seconds, 3), round(peak / 2**20, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000000,10000000")
+    parser.add_argument("--docs-ratio", type=int, default=50, help="Issues per document on average")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        config_file = os.path.join(directory, "config.json")
+        with open(config_file, "w") as f:
+            json.dump({"metrics": METRICS}, f)
+        monitor = SystemMonitor(config_file)
+
+        def grouped_metrics(issues_df):
+            monitor.calculate_metrics(issues_df)
+            return {name: monitor.get_metric(name) for name in METRICS}
+
+        for size in map(int, args.sizes.split(",")):
+            issues_df = create_issues(size, args.docs_ratio, args.seed)
+            legacy, legacy_seconds, legacy_mb = measure(lambda: legacy_metrics(issues_df))
+            grouped, grouped_seconds, grouped_mb = measure(lambda: grouped_metrics(issues_df))
+
+            categorical_df = issues_df.astype({"doc_id": "category", "type": "category", "status": "category"})
+            categorical, categorical_seconds, categorical_mb = measure(lambda: grouped_metrics(categorical_df))
+            del categorical_df, issues_df
+
+            for metrics in (grouped, categorical):
+                assert metrics["amount_of_unique_documents_reviewed"] == legacy["amount_of_unique_documents_reviewed"]
+                assert metrics["issue_type_distribution"]["counts"] == legacy["issue_type_distribution"]["counts"]
+                for name in ("acceptance_rate", "suggestion_approval_rate"):
+                    assert abs(metrics[name] - legacy[name]) < 1e-9, name
+
+            print(json.dumps({
+                "issues": size,
+                "per_metric_scans_seconds": legacy_seconds,
+                "per_metric_scans_peak_mb": legacy_mb,
+                "grouped_pass_seconds": grouped_seconds,
+                "grouped_pass_peak_mb": grouped_mb,
+                "grouped_pass_categorical_seconds": categorical_seconds,
+                "grouped_pass_categorical_peak_mb": categorical_mb,
+            }))
+
+
+if __name__ == "__main__":
+    main()
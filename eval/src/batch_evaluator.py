@@ -0,0 +1,232 @@
+"""
+Evaluates a golden set outside promptflow, spreading the documents over a process pool.
+
+The golden set is either a JSONL file with a `gt_json` and an `llm_output` object per line, like the inputs of
+the evaluation flow, and optionally a `name`, or a directory with a `ground_truth` and an `llm_output`
+subdirectory holding one JSON file per document under the same name.
+
+The result of each document, as returned by the evaluation flow, is written to `<output-dir>/results.ndjson` as
+soon as the document is evaluated, and the aggregated metrics are written with the throughput of the run to
+`<output-dir>/report.json`. With `--cache-dir`, the associations of the documents whose issues did not change since
+a previous run are reused instead of being computed again.
+
+Usage:
+    python -m eval.src.batch_evaluator --golden-set golden_set.jsonl --output-dir eval_results
+"""
+import os
+import json
+import time
+import logging
+import argparse
+from pathlib import Path
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Iterable, Iterator, Optional
+
+from eval.src.evaluation_cache import EvaluationCache, association_key
+from eval.src.issue_associator import IssueAssociator
+from eval.src.metric_calculator import MetricsCalculator
+
+
+RESULTS_FILE = "results.ndjson"
+REPORT_FILE = "report.json"
+
+
+def evaluate_document(
+    gt_json: dict,
+    llm_output: dict,
+    threshold: float = 0.8,
+    cache: Optional[EvaluationCache] = None,
+    **associator_options
+) -> dict:
+    """
+    Associates the issues of a model output with the ground truth issues of a document and counts them per type.
+
+    Args:
+    - gt_json: dict, the ground truth of the document, with its 'issues'.
+    - llm_output: dict, the output of the review flow for the document, with its 'issues' and 'llm_usage'.
+    - threshold: float, similarity threshold of the associations.
+    - cache: EvaluationCache, optional - reuses the association of the same issues from a previous evaluation.
+    - associator_options: options of the `IssueAssociator`, e.g. `assignment` or `block_by_page`.
+
+    Returns:
+    - dict, the TP, FP and FN per type, the cases behind them, the LLM usage and timings of the document and
+      whether the association was reused from the cache.
+    """
+    associator = IssueAssociator(detected_issues=llm_output['issues'],
+                                 ground_truth_issues=gt_json['issues'],
+                                 threshold=threshold,
+                                 **associator_options)
+
+    matches = key = None
+    if cache is not None:
+        key = association_key(llm_output['issues'], gt_json['issues'], {"threshold": threshold, **associator_options})
+        matches = cache.get(key)
+    if matches is not None:
+        associator.load_matches(matches)
+    else:
+        associator.associate_issues()
+        if cache is not None:
+            cache.set(key, associator.get_matches())
+
+    calculator = MetricsCalculator(associator)
+
+    return {
+        "tp": calculator.calculate_true_positives_per_type(),
+        "fp": calculator.calculate_false_positives_per_type(),
+        "fn": calculator.calculate_false_negatives_per_type(),
+        "true_positive_cases": associator.get_associations(),
+        "false_positive_cases": associator.get_unassociated_model_output(),
+        "false_negative_cases": associator.get_unassociated_ground_truth(),
+        "llm_usage": llm_output.get('llm_usage') or {},
+        "timings": llm_output.get('timings') or {},
+        "association_cached": matches is not None
+    }
+
+
+def read_golden_set(path: Path) -> Iterator[tuple[str, dict, dict]]:
+    """
+    Yields the name, ground truth and model output of each document of a JSONL file or directory.
+
+    Documents of a directory that have only a ground truth or only a model output are logged and skipped.
+    """
+    if path.is_dir():
+        ground_truth_dir, output_dir = path / "ground_truth", path / "llm_output"
+        names = {file.name for file in ground_truth_dir.glob("*.json")}
+        output_names = {file.name for file in output_dir.glob("*.json")}
+        for name in sorted(names ^ output_names):
+            logging.warning(f"Skipping {name}, which has only a ground truth or only a model output.")
+
+        for name in sorted(names & output_names):
+            with open(ground_truth_dir / name, encoding="utf-8") as f:
+                gt_json = json.load(f)
+            with open(output_dir / name, encoding="utf-8") as f:
+                llm_output = json.load(f)
+            yield Path(name).stem, gt_json, llm_output
+        return
+
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if line.strip():
+                document = json.loads(line)
+                yield str(document.get("name", line_number)), document["gt_json"], document["llm_output"]
+
+
+def _evaluate(name: str, gt_json: dict, llm_output: dict, options: dict) -> tuple[str, dict, float]:
+    start = time.process_time()
+    result = evaluate_document(gt_json, llm_output, **options)
+    return name, result, time.process_time() - start
+
+
+def _evaluate_in_pool(documents: Iterable[tuple[str, dict, dict]], options: dict, workers: int) -> Iterator[tuple[str, dict, float]]:
+    """
+    Yields the results in the order the documents are evaluated, with a bounded number of documents in flight,
+    so the golden set is never entirely held in memory.
+    """
+    max_in_flight = workers * 4
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = set()
+        for name, gt_json, llm_output in documents:
+            in_flight.add(pool.submit(_evaluate, name, gt_json, llm_output, options))
+            if len(in_flight) >= max_in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in in_flight:
+            yield future.result()
+
+
+def evaluate_golden_set(
+    documents: Iterable[tuple[str, dict, dict]],
+    output_dir: Path,
+    workers: Optional[int] = None,
+    threshold: float = 0.8,
+    cache_dir: Optional[Path] = None,
+    **associator_options
+) -> dict:
+    """
+    Evaluates the documents, streaming their results to `results.ndjson`, and returns the report of the run.
+
+    Args:
+    - documents: iterable of (name, ground truth, model output) tuples, e.g. from `read_golden_set`.
+    - output_dir: Path, the directory of the results and of the report.
+    - workers: int, the number of processes, by default the number of CPUs; 1 evaluates in this process.
+    - threshold: float, similarity threshold of the associations.
+    - cache_dir: Path, optional - the directory of an `EvaluationCache` shared by the runs.
+    - associator_options: options of the `IssueAssociator`, e.g. `assignment` or `block_by_page`.
+
+    Returns:
+    - dict, precision and recall with their confidence intervals, TP, FN and FP per type, the LLM usage per node,
+      the latency and cost percentiles of the documents, the documents reused from the cache and the throughput of
+      the run.
+    """
+    workers = workers or os.cpu_count() or 1
+    options = {"threshold": threshold, **associator_options}
+    if cache_dir is not None:
+        options["cache"] = EvaluationCache(str(cache_dir))
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    if workers > 1:
+        evaluations = _evaluate_in_pool(documents, options, workers)
+    else:
+        evaluations = (_evaluate(name, gt_json, llm_output, options) for name, gt_json, llm_output in documents)
+
+    # Only the counts are kept for the aggregation, the cases are only written to the results
+    counts = []
+    issues = 0
+    cpu_seconds = 0.0
+    start = time.perf_counter()
+    with open(output_dir / RESULTS_FILE, "w", encoding="utf-8") as f:
+        for name, result, seconds in evaluations:
+            f.write(json.dumps({"name": name, **result}) + "\n")
+            counts.append({key: result[key] for key in ("tp", "fp", "fn", "llm_usage", "timings", "association_cached")})
+            issues += len(result["true_positive_cases"]) + len(result["false_positive_cases"])
+            cpu_seconds += seconds
+    wall_seconds = time.perf_counter() - start
+
+    report = MetricsCalculator.calculate_metrics_from_multiple_results(counts)
+    report.update(MetricsCalculator.calculate_confidence_intervals_from_multiple_results(counts))
+    report.update(MetricsCalculator.calculate_llm_usage_from_multiple_results(counts))
+    report.update(MetricsCalculator.calculate_performance_from_multiple_results(counts))
+    report.update(MetricsCalculator.calculate_cache_usage_from_multiple_results(counts))
+    report["throughput"] = {
+        "documents": len(counts),
+        "detected_issues": issues,
+        "workers": workers,
+        "wall_seconds": round(wall_seconds, 3),
+        "documents_per_second": round(len(counts) / wall_seconds, 1) if wall_seconds > 0 else 0.0,
+        "cpu_seconds": round(cpu_seconds, 3),
+        # The CPUs busy on average, up to the number of workers
+        "parallelism": round(cpu_seconds / wall_seconds, 1) if wall_seconds > 0 else 0.0,
+    }
+
+    with open(output_dir / REPORT_FILE, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--golden-set", required=True, help="JSONL file or directory of the documents")
+    parser.add_argument("--output-dir", required=True)
+    parser.add_argument("--workers", type=int, default=None, help="Number of processes, by default the number of CPUs")
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--assignment", choices=["greedy", "optimal"], default="greedy")
+    parser.add_argument("--block-by-page", action="store_true")
+    parser.add_argument("--cache-dir", default=None, help="Reuse the associations of unchanged documents from this directory")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    report = evaluate_golden_set(
+        read_golden_set(Path(args.golden_set)),
+        Path(args.output_dir),
+        workers=args.workers,
+        threshold=args.threshold,
+        cache_dir=Path(args.cache_dir) if args.cache_dir else None,
+        assignment=args.assignment,
+        block_by_page=args.block_by_page,
+    )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Caches the associations of the evaluated documents, so that re-evaluating a golden set after a prompt change only
+associates the documents whose model output changed.
+
+The association of a document only depends on the type, source sentence and page of its issues, in order, and on
+the options of the `IssueAssociator`, so the cache key is a hash of those and the cached entry is the matches of the
+issues by position. The cases of a reused document are rebuilt from its current issues, so outputs that only differ
+in e.g. their explanations or suggested fixes are reused too.
+
+Entries are small and never expire; bump `EVALUATION_CACHE_VERSION` when the association changes, or delete the
+directory.
+"""
+import os
+import json
+import hashlib
+import threading
+from pathlib import Path
+from typing import Optional
+
+
+# The cache of the evaluation flow, which evaluates without a cache when it is not set
+EVALUATION_CACHE_DIR = os.environ.get("EVALUATION_CACHE_DIR")
+
+# Part of every key, so entries of a previous association algorithm are not reused
+EVALUATION_CACHE_VERSION = 1
+
+
+def _sha256(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def _issues_digest(issues: list) -> str:
+    """Hashes the fields of the issues the association depends on."""
+    fields = [
+        [issue.get("type"), issue["location"].get("source_sentence"), issue["location"].get("page_num")]
+        for issue in issues
+    ]
+    return _sha256(json.dumps(fields, ensure_ascii=False))
+
+
+def association_key(detected_issues: list, ground_truth_issues: list, options: dict) -> str:
+    """
+    Builds the cache key of the association of a document.
+
+    Args:
+    - detected_issues: list of dicts, the issues of the model output.
+    - ground_truth_issues: list of dicts, the ground truth issues.
+    - options: dict, the threshold and the other options of the `IssueAssociator`.
+    """
+    parts = [
+        str(EVALUATION_CACHE_VERSION),
+        _issues_digest(detected_issues),
+        _issues_digest(ground_truth_issues),
+        json.dumps(options, sort_keys=True),
+    ]
+    return _sha256("|".join(parts))
+
+
+class EvaluationCache:
+    def __init__(self, directory: str):
+        """
+        A persistent cache of associations, storing one JSON file per document version.
+
+        Args:
+        - directory: str, the directory holding the cache entries.
+        """
+        self.directory = Path(directory)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[list]:
+        """
+        Returns the cached matches for the key, or None if they are missing.
+        """
+        try:
+            return json.loads(self._path(key).read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def set(self, key: str, matches: list) -> None:
+        """
+        Stores the matches of an association, as returned by `IssueAssociator.get_matches`.
+        """
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write to a temporary file first so that concurrent readers, e.g. other workers, never see a partial entry
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_text(json.dumps(matches), encoding="utf-8")
+        os.replace(tmp_path, path)
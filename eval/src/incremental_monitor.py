@@ -0,0 +1,219 @@
+"""
+Keeps the `SystemMonitor` metrics up to date from the changes of the issues, instead of recomputing them from an
+export of every issue.
+
+The changes are read from the Cosmos DB change feed of the issues container, or replayed from a local NDJSON file
+with one issue per line, e.g. a dump of the change feed. After each run the state of the monitor is checkpointed,
+with the position in the changes, so the next run only reads the changes made since.
+
+Usage:
+    python -m eval.src.incremental_monitor --config eval/config.json --checkpoint monitor.json --replay-file changes.ndjson
+    python -m eval.src.incremental_monitor --config eval/config.json --checkpoint monitor.json \\
+        --cosmos-url https://<account>.documents.azure.com --database <database> --container issues
+"""
+import os
+import json
+import logging
+import argparse
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+import pandas as pd
+
+from eval.src.system_monitor import SystemMonitor
+
+
+# Index of each field in the state kept per issue
+DOC_ID, TYPE, STATUS, MODIFIED, TIMESTAMP = range(5)
+
+# The field of the state for each column the metrics can be calculated from, and its name in the counts
+STATE_FIELDS = {'doc_id': (DOC_ID, 'doc_id'), 'type': (TYPE, 'type'), 'status': (STATUS, 'status'),
+                'modified_fields': (MODIFIED, 'modified')}
+
+
+class IncrementalSystemMonitor(SystemMonitor):
+    def __init__(self, config_file: str):
+        """
+        A `SystemMonitor` whose metrics are maintained from issue create, update and delete events.
+
+        The change feed only delivers the latest version of an issue, so the fields the metrics depend on are kept
+        per issue: when an issue changes, its previous contribution to the counters is removed before the new one
+        is added, e.g. an issue accepted after having been dismissed moves from one count to the other.
+
+        The issues are counted per combination of the columns the configured metrics need, and the metrics are
+        calculated from these counts like `SystemMonitor` calculates them from its grouped pass. Plugin metrics are
+        supported as long as they only need these columns.
+        """
+        super().__init__(config_file)
+        unsupported = [column for column in self.get_required_columns() if column not in STATE_FIELDS]
+        if unsupported:
+            raise ValueError(f"Columns {unsupported} of the configured metrics are not maintained incrementally.")
+        self.key_fields = [STATE_FIELDS[column] for column in self.get_required_columns()]
+        self._reset()
+
+    def _reset(self):
+        self.issues: Dict[str, list] = {}
+        # The `_ts` of the deleted issues, so that older changes do not bring them back
+        self.deleted: Dict[str, int] = {}
+        self.continuation: Any = None
+        self.counts = Counter()
+
+    def _count(self, state: list, sign: int):
+        key = tuple(state[index] for index, _ in self.key_fields)
+        self.counts[key] += sign
+        # Drop the combinations counted down to 0, so they do not show in the metrics
+        if self.counts[key] == 0:
+            del self.counts[key]
+
+    def apply_event(self, event: Dict[str, Any]):
+        """
+        Applies an issue event: the issue as created or updated, or `{"id": ..., "deleted": true}` for a deletion.
+
+        Events older than the version of the issue already applied, by their `_ts`, are ignored, so replaying
+        changes twice leaves the metrics unchanged.
+        """
+        previous = self.issues.get(event['id'])
+        timestamp = event.get('_ts')
+        if timestamp is not None:
+            if previous is not None and timestamp < previous[TIMESTAMP]:
+                return
+            if timestamp <= self.deleted.get(event['id'], -1):
+                return
+
+        if previous is not None:
+            self._count(previous, -1)
+            del self.issues[event['id']]
+
+        if event.get('deleted'):
+            self.deleted[event['id']] = timestamp or 0
+            return
+        self.deleted.pop(event['id'], None)
+
+        state = [event['doc_id'], event['type'], event['status'], event.get('modified_fields') is not None,
+                 timestamp or 0]
+        self.issues[event['id']] = state
+        self._count(state, 1)
+
+    def apply_events(self, events: Iterable[Tuple[Dict[str, Any], Any]]) -> int:
+        """
+        Applies the (event, continuation) pairs of a change reader and updates the metrics.
+
+        Returns:
+        - int, the number of events applied.
+        """
+        applied = 0
+        for event, continuation in events:
+            self.apply_event(event)
+            self.continuation = continuation
+            applied += 1
+        self.refresh_metrics()
+        return applied
+
+    def refresh_metrics(self):
+        """
+        Updates the configured metrics from the counts, with the same values as `calculate_metrics` over all the
+        issues.
+        """
+        columns = [name for _, name in self.key_fields]
+        counts = pd.DataFrame(list(self.counts), columns=columns)
+        if 'modified' in counts:
+            counts['modified'] = counts['modified'].astype(bool)
+        counts['count'] = list(self.counts.values())
+        self.calculate_metrics_from_counts(counts)
+
+    def save_checkpoint(self, path: str):
+        """
+        Writes the state of the monitor and its position in the changes to a JSON file, replacing it atomically.
+        """
+        partial_path = path + '.partial'
+        with open(partial_path, 'w', encoding='utf-8') as f:
+            json.dump({'continuation': self.continuation, 'issues': self.issues, 'deleted': self.deleted}, f)
+        os.replace(partial_path, path)
+
+    def load_checkpoint(self, path: str) -> bool:
+        """
+        Restores the state saved by `save_checkpoint`, if the file exists, and updates the metrics.
+
+        Returns:
+        - bool, whether a checkpoint was loaded.
+        """
+        if not os.path.exists(path):
+            return False
+
+        with open(path, encoding='utf-8') as f:
+            checkpoint = json.load(f)
+        self._reset()
+        for issue_id, state in checkpoint['issues'].items():
+            self.issues[issue_id] = state
+            self._count(state, 1)
+        self.deleted = checkpoint['deleted']
+        self.continuation = checkpoint['continuation']
+        self.refresh_metrics()
+        return True
+
+
+def read_replay_file(path: str, offset: Optional[int] = None) -> Iterator[Tuple[Dict[str, Any], int]]:
+    """
+    Yields the events of an NDJSON file from a byte offset, each with the offset of the next line as continuation.
+    """
+    with open(path, 'rb') as f:
+        f.seek(offset or 0)
+        for line in iter(f.readline, b''):
+            if line.strip():
+                yield json.loads(line), f.tell()
+
+
+def read_change_feed(container, continuation: Optional[str] = None) -> Iterator[Tuple[Dict[str, Any], str]]:
+    """
+    Yields the issues created or updated since the continuation token, from the beginning without one, each with
+    the continuation token after its page.
+
+    The change feed does not report deletions; deleted issues remain counted until the monitor is rebuilt.
+
+    Args:
+    - container: the `azure.cosmos` container client of the issues.
+    - continuation: str, the token returned with the last change read, or None.
+    """
+    pages = container.query_items_change_feed(
+        is_start_from_beginning=continuation is None, continuation=continuation
+    ).by_page()
+    for page in pages:
+        items = list(page)
+        token = container.client_connection.last_response_headers.get('etag')
+        for item in items:
+            yield item, token
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", required=True, help="Configuration file of the metrics")
+    parser.add_argument("--checkpoint", required=True, help="State of the monitor, created by the first run")
+    parser.add_argument("--replay-file", help="NDJSON file of issue events")
+    parser.add_argument("--cosmos-url")
+    parser.add_argument("--database")
+    parser.add_argument("--container", default="issues")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    monitor = IncrementalSystemMonitor(args.config)
+    monitor.load_checkpoint(args.checkpoint)
+
+    if args.replay_file:
+        events = read_replay_file(args.replay_file, monitor.continuation)
+    else:
+        # Only needed to read the change feed
+        from azure.cosmos import CosmosClient
+        from azure.identity import DefaultAzureCredential
+
+        client = CosmosClient(args.cosmos_url, DefaultAzureCredential())
+        container = client.get_database_client(args.database).get_container_client(args.container)
+        events = read_change_feed(container, monitor.continuation)
+
+    applied = monitor.apply_events(events)
+    monitor.save_checkpoint(args.checkpoint)
+    logging.info(f"Applied {applied} events, {len(monitor.issues)} issues monitored.")
+    print(json.dumps({name: metric.value for name, metric in monitor.metrics.items()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
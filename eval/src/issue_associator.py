@@ -1,7 +1,99 @@
+import math
+from collections import Counter, defaultdict
 from difflib import SequenceMatcher
 
+
+class ShingleIndex:
+    def __init__(self, sentences, threshold):
+        """
+        Inverted index of character bigrams, used to find the sentences that may reach a similarity ratio.
+
+        A pair of sentences with a `SequenceMatcher` ratio of at least `threshold` shares a minimum number of
+        bigrams, which grows with the length of the sentences (each matching block of k characters holds k - 1
+        shared bigrams, and there are at most as many blocks as unmatched characters plus one). Only the rarest
+        bigrams of each sentence are indexed, enough that any such pair shares at least one of them (prefix
+        filtering), so candidates are found without comparing every pair and no match is missed.
+
+        Args:
+        - sentences: dict, sentences to index by their key.
+        - threshold: float, similarity threshold of the matches.
+        """
+        # Minimum shared bigrams per character of the shorter sentence, at or below 0 when no bound applies
+        self.overlap_per_char = (3 * threshold - 2) / (2 - threshold) if threshold < 2 else 0
+        self.frequency = Counter()
+        for sentence in sentences.values():
+            self.frequency.update(set(self._bigrams(sentence)))
+
+        self.unbounded = []
+        self.postings = defaultdict(list)
+        for key, sentence in sentences.items():
+            prefix = self._prefix(sentence)
+            if prefix is None:
+                self.unbounded.append(key)
+            else:
+                for token in prefix:
+                    self.postings[token].append(key)
+
+    @staticmethod
+    def _bigrams(sentence):
+        return [sentence[i:i + 2] for i in range(len(sentence) - 1)]
+
+    def _prefix(self, sentence):
+        """
+        Returns the rarest bigram occurrences of the sentence, of which any match shares at least one, or None
+        if a match may share no bigram at all.
+        """
+        min_overlap = math.ceil(self.overlap_per_char * len(sentence) - 1 - 1e-9)
+        if min_overlap <= 0:
+            return None
+
+        # Repeated bigrams are numbered, so the shared occurrences of two sentences are their shared tokens
+        occurrences = Counter()
+        tokens = []
+        for bigram in self._bigrams(sentence):
+            tokens.append((bigram, occurrences[bigram]))
+            occurrences[bigram] += 1
+        tokens.sort(key=lambda token: (self.frequency[token[0]], token))
+        return tokens[:max(0, len(tokens) - min_overlap + 1)]
+
+    def candidates(self, sentence):
+        """
+        Returns the keys of the indexed sentences that may reach the threshold with the sentence.
+        """
+        prefix = self._prefix(sentence)
+        if prefix is None:
+            return None
+        keys = set(self.unbounded)
+        for token in prefix:
+            keys.update(self.postings.get(token, ()))
+        return keys
+
+
+def character_masks(text):
+    """
+    Returns the bit mask of the positions of each character in the text, for `longest_common_subsequence`.
+    """
+    masks = {}
+    for i, character in enumerate(text):
+        masks[character] = masks.get(character, 0) | (1 << i)
+    return masks
+
+
+def longest_common_subsequence(text, masks, length):
+    """
+    Returns the length of the longest common subsequence of a text and another text of `length` characters,
+    given by its character masks, with the bit-parallel algorithm of Hyyrö (one big integer step per character).
+    """
+    v = (1 << length) - 1
+    for character in text:
+        u = v & masks.get(character, 0)
+        v = (v + u) | (v - u)
+    return length - bin(v & ((1 << length) - 1)).count("1")
+
+
 class IssueAssociator:
-    def __init__(self, detected_issues, ground_truth_issues, threshold=0.8):
+    def __init__(self, detected_issues, ground_truth_issues, threshold=0.8, assignment="greedy",
+                 block_by_page=False, prefilter=True):
         """
         Initializes the IssueAssociator with detected issues, ground truth issues, and an optional threshold.
         
@@ -9,13 +101,25 @@ class IssueAssociator:
         - detected_issues: dict, list of detected issues from the model.
         - ground_truth_issues: dict, list of ground truth issues.
         - threshold: float, similarity threshold to consider two sentences as a match (default: 0.8).
+        - assignment: str, "greedy" to match each detected issue to its most similar ground truth issue, which may
+          be matched several times, or "optimal" for a one-to-one matching with the highest total similarity
+          (requires scipy) (default: "greedy").
+        - block_by_page: bool, only match issues on the same page (default: False).
+        - prefilter: bool, skip the pairs that cannot reach the threshold before computing their similarity;
+          the associations are the same as when comparing every pair (default: True).
         """
+        if assignment not in ("greedy", "optimal"):
+            raise ValueError(f"Unknown assignment: {assignment}")
         self.detected_issues = detected_issues
         self.ground_truth_issues = ground_truth_issues
         self.threshold = threshold
+        self.assignment = assignment
+        self.block_by_page = block_by_page
+        self.prefilter = prefilter
         self._associations = []
         self._unassociated_model_output = []
         self._unassociated_ground_truth = []
+        self._matches = {}
 
     @staticmethod
     def similarity_ratio(text1, text2):
@@ -31,39 +135,128 @@ class IssueAssociator:
         """
         return SequenceMatcher(None, text1, text2).ratio()
 
+    def _block_key(self, issue):
+        if self.block_by_page:
+            return issue["type"], issue["location"].get("page_num")
+        return issue["type"]
+
+    def _candidate_scores(self, detected_indices, truth_indices, best_only):
+        """
+        Computes the similarity of the detected and ground truth issues of a block that may reach the threshold.
+
+        Pairs are skipped when an upper bound of their ratio is below the threshold. The bounds are tried from the
+        cheapest: the lengths, the shared characters, then the longest common subsequence, which the matching
+        blocks of `SequenceMatcher` form. With `best_only`, the candidates of each detected issue are compared from the
+        highest bound down, and the comparison stops once no remaining pair can beat the best score found.
+
+        Yields:
+        - (detected index, ground truth index, score) for the compared pairs.
+        """
+        def sentence(issue):
+            return issue["location"]["source_sentence"]
+
+        if not self.prefilter or self.threshold <= 0:
+            for d in detected_indices:
+                for t in truth_indices:
+                    yield d, t, self.similarity_ratio(
+                        sentence(self.detected_issues[d]), sentence(self.ground_truth_issues[t]))
+            return
+
+        truth_sentences = {t: sentence(self.ground_truth_issues[t]) for t in truth_indices}
+        index = ShingleIndex(truth_sentences, self.threshold)
+        character_counts = {text: Counter(text) for text in set(truth_sentences.values())}
+        masks = {text: character_masks(text) for text in character_counts}
+        # The matcher caches the analysis of its second sequence, so each ground truth sentence is analysed once
+        matchers = {}
+        scores = {}
+
+        for d in detected_indices:
+            detected_sentence = sentence(self.detected_issues[d])
+            detected_counts = Counter(detected_sentence)
+            candidates = index.candidates(detected_sentence)
+
+            bounded = []
+            for t in (truth_indices if candidates is None else candidates):
+                truth_sentence = truth_sentences[t]
+                total = len(detected_sentence) + len(truth_sentence)
+                if not total:
+                    bounded.append((1.0, t))
+                    continue
+                # Same arithmetic as SequenceMatcher.ratio, so a bound equals the ratio when it is exact
+                if 2.0 * min(len(detected_sentence), len(truth_sentence)) / total < self.threshold:
+                    continue
+                if 2.0 * sum((detected_counts & character_counts[truth_sentence]).values()) / total < self.threshold:
+                    continue
+                common = longest_common_subsequence(detected_sentence, masks[truth_sentence], len(truth_sentence))
+                bound = 2.0 * common / total
+                if bound >= self.threshold:
+                    bounded.append((bound, t))
+
+            # Highest bound first, and the first ground truth issue first at the same bound
+            bounded.sort(key=lambda candidate: (-candidate[0], candidate[1]))
+            best_score = 0
+            for bound, t in bounded:
+                if best_only and bound < best_score:
+                    break
+                truth_sentence = truth_sentences[t]
+                pair = (detected_sentence, truth_sentence)
+                if pair not in scores:
+                    if truth_sentence not in matchers:
+                        matchers[truth_sentence] = SequenceMatcher(None, b=truth_sentence)
+                    matcher = matchers[truth_sentence]
+                    matcher.set_seq1(detected_sentence)
+                    scores[pair] = matcher.ratio()
+                best_score = max(best_score, scores[pair])
+                yield d, t, scores[pair]
+
     def associate_issues(self):
         """
         Perform the association between detected issues and ground truth issues based on text similarity.
         Populates the associations, unassociated_model_output, and unassociated_ground_truth attributes.
         """
-        matched_ground_truth_indices = set()
+        detected_blocks = defaultdict(list)
+        for i, detected in enumerate(self.detected_issues):
+            detected_blocks[self._block_key(detected)].append(i)
+        truth_blocks = defaultdict(list)
+        for i, truth in enumerate(self.ground_truth_issues):
+            truth_blocks[self._block_key(truth)].append(i)
 
-        for detected in self.detected_issues:
-            detected_sentence = detected["location"]["source_sentence"]
-            best_match = None
-            best_score = 0
-            best_match_index = None
-            
-            # Loop through ground truth issues to find the best match
-            for i, truth in enumerate(self.ground_truth_issues):
-                if truth['type'] == detected['type']:
-                    truth_sentence = truth["location"]["source_sentence"]
-                    score = self.similarity_ratio(detected_sentence, truth_sentence)
-                    
-                    if score > best_score:
-                        best_match = truth
-                        best_score = score
-                        best_match_index = i
-                
-            # If a match is found within the threshold, associate the issues
-            if best_score >= self.threshold:
+        matches = {}
+        for key, detected_indices in detected_blocks.items():
+            truth_indices = truth_blocks.get(key, [])
+            if self.assignment == "greedy":
+                matches.update(self._greedy_matches(detected_indices, truth_indices))
+            else:
+                matches.update(self._optimal_matches(detected_indices, truth_indices))
+
+        self._set_matches(matches)
+
+    def load_matches(self, matches):
+        """
+        Populates the associations from the matches of a previous association of the same issues, as returned by
+        `get_matches`, without comparing the sentences again.
+
+        Args:
+        - matches: list of [detected index, ground truth index, score].
+        """
+        self._set_matches({d: (t, score) for d, t, score in matches})
+
+    def _set_matches(self, matches):
+        self._matches = matches
+        self._associations = []
+        self._unassociated_model_output = []
+
+        matched_ground_truth_indices = set()
+        for i, detected in enumerate(self.detected_issues):
+            if i in matches:
+                truth_index, score = matches[i]
                 self._associations.append({
                     "detected_issue": detected,
-                    "ground_truth_issue": best_match,
-                    "score": best_score,
+                    "ground_truth_issue": self.ground_truth_issues[truth_index] if truth_index is not None else None,
+                    "score": score,
                     "type": detected['type']
                 })
-                matched_ground_truth_indices.add(best_match_index)  # Mark ground truth issue as matched
+                matched_ground_truth_indices.add(truth_index)  # Mark ground truth issue as matched
             else:
                 self._unassociated_model_output.append(detected)  # No match found, mark as unassociated
 
@@ -73,6 +266,63 @@ class IssueAssociator:
             if i not in matched_ground_truth_indices
         ]
 
+    def _greedy_matches(self, detected_indices, truth_indices):
+        """
+        Matches each detected issue to the first ground truth issue with the highest similarity, if it reaches
+        the threshold.
+
+        Returns:
+        - dict, (ground truth index, score) by detected index.
+        """
+        best = {d: (None, 0) for d in detected_indices}
+        for d, t, score in self._candidate_scores(detected_indices, truth_indices, best_only=True):
+            best_index, best_score = best[d]
+            if score > best_score or (score == best_score and best_index is not None and t < best_index):
+                best[d] = (t, score)
+        return {d: match for d, match in best.items() if match[1] >= self.threshold}
+
+    def _optimal_matches(self, detected_indices, truth_indices):
+        """
+        Matches detected and ground truth issues one-to-one, maximising the total similarity of the pairs that
+        reach the threshold.
+
+        Returns:
+        - dict, (ground truth index, score) by detected index.
+        """
+        from scipy.optimize import linear_sum_assignment
+
+        pairs = [
+            (d, t, score)
+            for d, t, score in self._candidate_scores(detected_indices, truth_indices, best_only=False)
+            if score >= self.threshold
+        ]
+        if not pairs:
+            return {}
+
+        # Only the issues with a possible match take part in the assignment
+        rows = {d: i for i, d in enumerate(sorted({d for d, _, _ in pairs}))}
+        columns = {t: i for i, t in enumerate(sorted({t for _, t, _ in pairs}))}
+        scores = [[0.0] * len(columns) for _ in rows]
+        for d, t, score in pairs:
+            scores[rows[d]][columns[t]] = score
+
+        detected_by_row = {i: d for d, i in rows.items()}
+        truth_by_column = {i: t for t, i in columns.items()}
+        matches = {}
+        for row, column in zip(*linear_sum_assignment(scores, maximize=True)):
+            if scores[row][column] >= self.threshold:
+                matches[detected_by_row[row]] = (truth_by_column[column], scores[row][column])
+        return matches
+
+    def get_matches(self):
+        """
+        Get the matches of the association by position of the issues, e.g. to cache them.
+
+        Returns:
+        - list of [detected index, ground truth index, score], by detected index.
+        """
+        return [[d, t, score] for d, (t, score) in sorted(self._matches.items())]
+
     def get_associations(self):
         """
         Get the list of associated issues.
@@ -0,0 +1,280 @@
+"""
+Exports the issues container to Parquet files for analytics, e.g. for the `SystemMonitor` metrics.
+
+Only the fields used for monitoring are read from Cosmos DB, by a projection, and the issues are written to
+`<output-dir>/date=<YYYY-MM-DD>/` partitions, by the date their review was initiated. The first run exports every
+issue; later runs only export the issues created or modified since the previous run, by their `_ts`, in new files
+of the same partitions. Deleted issues are not seen by later runs, they are dropped by exporting to a new
+directory. When loading, the latest version of each issue is kept and only the requested columns are
+read, so a metric over millions of issues only reads the columns it needs.
+
+Requires `pyarrow`.
+
+Usage:
+    python -m eval.src.issues_exporter --cosmos-url https://<account>.documents.azure.com --database <database> \\
+        --container issues --output-dir issues_snapshot
+"""
+import os
+import json
+import uuid
+import logging
+import argparse
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+
+STATE_FILE = "_export_state.json"
+
+# The exported columns and the Cosmos DB expression of each; the large text fields of the issues are not exported
+EXPORT_COLUMNS = {
+    "id": "c.id",
+    "doc_id": "c.doc_id",
+    "type": "c.type",
+    "status": "c.status",
+    "page_num": "c.location.page_num",
+    "review_initiated_by": "c.review_initiated_by",
+    "review_initiated_at_UTC": "c.review_initiated_at_UTC",
+    "resolved_by": "c.resolved_by",
+    "resolved_at_UTC": "c.resolved_at_UTC",
+    "modified_fields": "c.modified_fields",
+    "dismissal_feedback": "c.dismissal_feedback",
+    "_ts": "c._ts",
+}
+
+# Nested fields, stored as JSON strings
+JSON_COLUMNS = ["modified_fields", "dismissal_feedback"]
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        import pyarrow.dataset
+    except ImportError as e:
+        raise ImportError("Exporting issues to Parquet requires pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+
+def build_export_query(since: Optional[int]) -> tuple[str, List[Dict[str, Any]]]:
+    """
+    Returns the query of the exported columns of the issues modified at or after `since`, every issue without it.
+
+    Items modified in the same second as the previous export are read again, as `_ts` has a resolution of a
+    second; the duplicates are dropped when loading.
+    """
+    projection = ", ".join(f"{expression} AS {column}" for column, expression in EXPORT_COLUMNS.items())
+    if since is None:
+        return f"SELECT {projection} FROM c", []
+    return f"SELECT {projection} FROM c WHERE c._ts >= @since", [{"name": "@since", "value": since}]
+
+
+def get_partition_date(item: Dict[str, Any]) -> str:
+    """
+    Returns the date partition of an issue: the date its review was initiated, which does not change when the
+    issue is updated, or the date of its last modification if it is missing.
+    """
+    initiated_at = item.get("review_initiated_at_UTC")
+    if initiated_at:
+        return str(initiated_at)[:10]
+    return datetime.fromtimestamp(item.get("_ts", 0), tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+def to_rows(items: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    rows = []
+    for item in items:
+        row = {column: item.get(column) for column in EXPORT_COLUMNS}
+        for column in JSON_COLUMNS:
+            if row[column] is not None:
+                row[column] = json.dumps(row[column])
+        rows.append(row)
+    return rows
+
+
+class IssuesExporter:
+    def __init__(self, output_dir: str):
+        """
+        Exports issues to date-partitioned Parquet files in `output_dir`, keeping the `_ts` watermark of the last
+        export in `_export_state.json`.
+        """
+        self.pa = _import_pyarrow()
+        self.output_dir = output_dir
+        self.state_path = os.path.join(output_dir, STATE_FILE)
+        self.watermark: Optional[int] = None
+        if os.path.exists(self.state_path):
+            with open(self.state_path, encoding="utf-8") as f:
+                self.watermark = json.load(f)["watermark"]
+
+    def schema(self):
+        pa = self.pa
+        return pa.schema([
+            (column, pa.int64() if column in ("page_num", "_ts") else pa.string()) for column in EXPORT_COLUMNS
+        ])
+
+    def write_items(self, pages: Iterable[Iterable[Dict[str, Any]]], rows_per_file: int = 100_000) -> int:
+        """
+        Writes pages of exported items to their date partitions, and advances the watermark once all the pages are
+        written.
+
+        Rows are buffered per partition and written in files of up to `rows_per_file` rows, as reading many small
+        files costs more than reading their rows.
+
+        Returns:
+        - int, the number of items written.
+        """
+        run_id = uuid.uuid4().hex[:12]
+        file_numbers = Counter()
+        partitions: Dict[str, List[Dict[str, Any]]] = {}
+        buffered = written = 0
+        watermark = self.watermark
+
+        def flush(date: str):
+            rows = partitions.pop(date)
+            partition_dir = os.path.join(self.output_dir, f"date={date}")
+            os.makedirs(partition_dir, exist_ok=True)
+            file_name = f"part-{run_id}-{file_numbers[date]:05d}.parquet"
+            file_numbers[date] += 1
+            # Files are written under a hidden name, ignored when loading, and put in place once complete
+            partial_path = os.path.join(partition_dir, f".{file_name}")
+            self.pa.parquet.write_table(self.pa.Table.from_pylist(rows, schema=self.schema()), partial_path)
+            os.replace(partial_path, os.path.join(partition_dir, file_name))
+            return len(rows)
+
+        for page in pages:
+            for row in to_rows(page):
+                date = get_partition_date(row)
+                partitions.setdefault(date, []).append(row)
+                watermark = max(watermark or 0, row["_ts"] or 0)
+                buffered += 1
+                if len(partitions[date]) >= rows_per_file:
+                    flushed = flush(date)
+                    buffered -= flushed
+                    written += flushed
+
+            # Bounds the memory when the rows are spread over many dates
+            if buffered >= 4 * rows_per_file:
+                for date in list(partitions):
+                    written += flush(date)
+                buffered = 0
+
+        for date in list(partitions):
+            written += flush(date)
+
+        # Only advanced once every page is written: an interrupted export is resumed from the previous watermark
+        self.watermark = watermark
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(self.state_path + ".partial", "w", encoding="utf-8") as f:
+            json.dump({"watermark": self.watermark}, f)
+        os.replace(self.state_path + ".partial", self.state_path)
+        return written
+
+    def export(self, container, page_size: int = 1000) -> int:
+        """
+        Exports the issues created or modified since the last export from an `azure.cosmos` container client.
+
+        Returns:
+        - int, the number of items exported.
+        """
+        query, parameters = build_export_query(self.watermark)
+        pages = container.query_items(
+            query=query,
+            parameters=parameters,
+            enable_cross_partition_query=True,
+            max_item_count=page_size,
+        ).by_page()
+        written = self.write_items(pages)
+        logging.info(f"Exported {written} issues to {self.output_dir}, watermark {self.watermark}.")
+        return written
+
+    def compact(self):
+        """
+        Rewrites each date partition as a single file with the latest version of its issues, dropping the files
+        accumulated by incremental exports.
+        """
+        for entry in sorted(os.listdir(self.output_dir)):
+            partition_dir = os.path.join(self.output_dir, entry)
+            files = sorted(name for name in os.listdir(partition_dir) if name.endswith(".parquet")
+                           and not name.startswith(".")) if entry.startswith("date=") else []
+            if len(files) < 2:
+                continue
+
+            table = self.pa.concat_tables(
+                self.pa.parquet.read_table(os.path.join(partition_dir, name), schema=self.schema()) for name in files
+            )
+            rows = table.to_pandas().sort_values("_ts", kind="stable").drop_duplicates("id", keep="last")
+            file_name = f"part-{uuid.uuid4().hex[:12]}-compacted.parquet"
+            partial_path = os.path.join(partition_dir, f".{file_name}")
+            self.pa.parquet.write_table(
+                self.pa.Table.from_pandas(rows, schema=self.schema(), preserve_index=False), partial_path
+            )
+            os.replace(partial_path, os.path.join(partition_dir, file_name))
+            for name in files:
+                os.remove(os.path.join(partition_dir, name))
+
+
+def load_issues(
+    output_dir: str,
+    columns: Optional[List[str]] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Loads the latest version of the exported issues into a DataFrame.
+
+    Args:
+    - output_dir: str, the directory of the export.
+    - columns: list of str, the columns to read, e.g. `SystemMonitor.get_required_columns()`; all without it.
+    - start_date, end_date: str, the first and last review dates (YYYY-MM-DD) to read, all dates without them.
+
+    Returns:
+    - pd.DataFrame, one row per issue with the requested columns.
+    """
+    pa = _import_pyarrow()
+    requested = list(columns or EXPORT_COLUMNS)
+    # The id and _ts are needed to keep the latest version of the issues exported more than once
+    read_columns = list(dict.fromkeys(requested + ["id", "_ts"]))
+
+    if not os.path.exists(output_dir):
+        return pd.DataFrame(columns=requested)
+
+    partitioning = pa.dataset.partitioning(pa.schema([("date", pa.string())]), flavor="hive")
+    dataset = pa.dataset.dataset(output_dir, format="parquet", partitioning=partitioning)
+    date = pa.dataset.field("date")
+    filters = None
+    if start_date:
+        filters = date >= start_date
+    if end_date:
+        filters = (date <= end_date) if filters is None else filters & (date <= end_date)
+
+    issues_df = dataset.to_table(columns=read_columns, filter=filters).to_pandas()
+    issues_df = issues_df.sort_values("_ts", kind="stable").drop_duplicates("id", keep="last")
+    return issues_df[requested].reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cosmos-url", required=True)
+    parser.add_argument("--database", required=True)
+    parser.add_argument("--container", default="issues")
+    parser.add_argument("--output-dir", required=True)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--compact", action="store_true", help="Rewrite each date partition as a single file")
+    args = parser.parse_args()
+
+    # Only needed to read the container
+    from azure.cosmos import CosmosClient
+    from azure.identity import DefaultAzureCredential
+
+    logging.basicConfig(level=logging.INFO)
+    client = CosmosClient(args.cosmos_url, DefaultAzureCredential())
+    container = client.get_database_client(args.database).get_container_client(args.container)
+    exporter = IssuesExporter(args.output_dir)
+    exporter.export(container, page_size=args.page_size)
+    if args.compact:
+        exporter.compact()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import json
+import numpy as np
 import promptflow
 from collections import defaultdict
 
@@ -281,3 +282,160 @@ class MetricsCalculator:
             'fn' : total_fn,
             'fp' : total_fp
         }
+
+    @staticmethod
+    def calculate_confidence_intervals_from_multiple_results(results, confidence=0.95, resamples=1000, seed=0):
+        """
+        Calculate bootstrap confidence intervals of the precision and recall per type from multiple results.
+
+        The documents are resampled with replacement, `resamples` times, and the precision and recall of each
+        resample are calculated from its summed tp, fp and fn, like `calculate_metrics_from_multiple_results`.
+        The interval of each metric is the central `confidence` share of its resampled values.
+
+        Parameters:
+        - results: list of dicts, where each dict contains 'tp', 'fn' and 'fp' dictionaries per type.
+        - confidence: float, the confidence level of the intervals.
+        - resamples: int, the number of bootstrap resamples.
+        - seed: int, the seed of the resampling, so the intervals of the same results are reproducible.
+
+        Returns:
+        - dict, the lower and upper bounds of the precision and recall per type: 'precision_ci_low',
+          'precision_ci_high', 'recall_ci_low' and 'recall_ci_high'.
+        """
+        intervals = {'precision_ci_low': {}, 'precision_ci_high': {}, 'recall_ci_low': {}, 'recall_ci_high': {}}
+        all_types = sorted({issue_type for result in results for name in ('tp', 'fp', 'fn') for issue_type in result[name]})
+        if not results or not all_types:
+            return intervals
+
+        counts = {
+            name: np.array([[result[name].get(issue_type, 0) for issue_type in all_types] for result in results], dtype=float)
+            for name in ('tp', 'fp', 'fn')
+        }
+        # Each resample weighs every document by the number of times it was drawn
+        rng = np.random.default_rng(seed)
+        weights = rng.multinomial(len(results), np.full(len(results), 1.0 / len(results)), size=resamples)
+        tp, fp, fn = (weights @ counts[name] for name in ('tp', 'fp', 'fn'))
+
+        # Zero when there is nothing to divide, as for the point estimates
+        precision = np.divide(tp, tp + fp, out=np.zeros_like(tp), where=tp + fp > 0)
+        recall = np.divide(tp, tp + fn, out=np.zeros_like(tp), where=tp + fn > 0)
+
+        tail = (1 - confidence) / 2 * 100
+        for name, values in (('precision', precision), ('recall', recall)):
+            low, high = np.percentile(values, [tail, 100 - tail], axis=0)
+            intervals[f'{name}_ci_low'] = dict(zip(all_types, low.tolist()))
+            intervals[f'{name}_ci_high'] = dict(zip(all_types, high.tolist()))
+        return intervals
+
+    @staticmethod
+    def calculate_llm_usage_from_multiple_results(results):
+        """
+        Calculate the LLM calls made and saved per agent node from multiple evaluation results.
+
+        Each result in the `results` list may contain:
+        - 'llm_usage': dict, usage counters per agent node as reported by the review flow.
+
+        A call is saved when the node served a requested shot from the cache or skipped it by
+        stopping early, so `llm_calls_saved` = requests - calls.
+
+        Parameters:
+        - results: list of dicts, where each dict may contain an 'llm_usage' dictionary per node.
+
+        Returns:
+        - dict, LLM requests, calls, saved calls and the savings rate per node.
+        """
+        total_requests = {}
+        total_calls = {}
+
+        for result in results:
+            for node, usage in (result.get('llm_usage') or {}).items():
+                total_requests[node] = total_requests.get(node, 0) + usage.get('requests', 0)
+                total_calls[node] = total_calls.get(node, 0) + usage.get('calls', 0)
+
+        total_saved = {node: total_requests[node] - total_calls.get(node, 0) for node in total_requests}
+        savings_rate = {
+            node: total_saved[node] / float(total_requests[node]) if total_requests[node] else 0.0
+            for node in total_requests
+        }
+
+        return {
+            'llm_requests': total_requests,
+            'llm_calls': total_calls,
+            'llm_calls_saved': total_saved,
+            'llm_calls_saved_rate': savings_rate
+        }
+
+    @staticmethod
+    def calculate_cache_usage_from_multiple_results(results):
+        """
+        Calculate how many documents reused their association from the evaluation cache.
+
+        Each result in the `results` list may contain:
+        - 'association_cached': bool, whether the association of the document was reused.
+
+        Parameters:
+        - results: list of dicts, the evaluation results of the documents.
+
+        Returns:
+        - dict, the number of documents whose association was reused and evaluated.
+        """
+        reused = sum(1 for result in results if result.get('association_cached'))
+
+        return {
+            'evaluation_cache': {
+                'reused': reused,
+                'evaluated': len(results) - reused
+            }
+        }
+
+    @staticmethod
+    def calculate_performance_from_multiple_results(results, percentiles=(50, 90, 95)):
+        """
+        Calculate percentiles of the latency and cost of the documents from multiple evaluation results.
+
+        Each result in the `results` list may contain:
+        - 'timings': dict, the seconds spent by the review flow in `document_intelligence`, `post_processing`
+          and in `total` for the document.
+        - 'llm_usage': dict, usage counters per agent node, with the `seconds`, `calls`, `prompt_tokens` and
+          `completion_tokens` of the node for the document.
+
+        The metrics are named after their percentile, e.g. `latency_p95`, and hold a value per stage or node,
+        like the per type metrics, so they are logged by `write_metrics_to_promptflow_per_type`. Documents
+        without timings, e.g. outputs of an earlier version of the review flow, are left out of the latency.
+
+        Parameters:
+        - results: list of dicts, the evaluation results of the documents.
+        - percentiles: the percentiles to calculate.
+
+        Returns:
+        - dict, `latency_pXX` (seconds per stage and LLM node), `tokens_pXX` and `llm_calls_pXX` (per node
+          and in total) for each percentile.
+        """
+        latency, tokens, calls = defaultdict(list), defaultdict(list), defaultdict(list)
+
+        for result in results:
+            timings = result.get('timings') or {}
+            for stage in ('total', 'document_intelligence', 'post_processing'):
+                if stage in timings:
+                    latency[stage].append(timings[stage])
+
+            usage = result.get('llm_usage') or {}
+            for node, node_usage in usage.items():
+                if 'seconds' in node_usage:
+                    latency[node].append(node_usage['seconds'])
+                tokens[node].append(node_usage.get('prompt_tokens', 0) + node_usage.get('completion_tokens', 0))
+                calls[node].append(node_usage.get('calls', 0))
+            if usage:
+                tokens['total'].append(sum(
+                    node_usage.get('prompt_tokens', 0) + node_usage.get('completion_tokens', 0)
+                    for node_usage in usage.values()
+                ))
+                calls['total'].append(sum(node_usage.get('calls', 0) for node_usage in usage.values()))
+
+        performance = {}
+        for name, values in (('latency', latency), ('tokens', tokens), ('llm_calls', calls)):
+            for percentile in percentiles:
+                performance[f'{name}_p{percentile}'] = {
+                    key: float(np.percentile(key_values, percentile)) for key, key_values in values.items()
+                }
+        return performance
@@ -0,0 +1,107 @@
+"""
+Compares the evaluation report of a candidate prompt with the report of the baseline, and fails when the candidate
+regresses in quality, latency or cost.
+
+The reports are the `report.json` of the batch evaluator or the `aggregated_results` of the evaluation flow. Quality
+regresses when the precision or recall of an issue type drops by more than `--max-quality-drop`; latency when a
+stage or LLM node is slower by more than `--max-latency-increase` (relative) and `--min-latency-increase-seconds`;
+cost when the tokens or LLM calls of a node grow by more than `--max-cost-increase` (relative). Latency and cost are
+compared at the gated percentiles of the documents, the median and the tail by default.
+
+Usage:
+    python -m eval.src.regression_gate --baseline baseline/report.json --candidate eval_results/report.json
+"""
+import sys
+import json
+import argparse
+from typing import Iterable
+
+
+def _compare(baseline: dict, candidate: dict, metric: str, regressed) -> list[dict]:
+    regressions = []
+    for key, baseline_value in (baseline.get(metric) or {}).items():
+        candidate_value = (candidate.get(metric) or {}).get(key)
+        if candidate_value is not None and regressed(baseline_value, candidate_value):
+            regressions.append({"metric": metric, "key": key, "baseline": baseline_value, "candidate": candidate_value})
+    return regressions
+
+
+def find_regressions(
+    baseline: dict,
+    candidate: dict,
+    max_quality_drop: float = 0.02,
+    max_latency_increase: float = 0.2,
+    min_latency_increase_seconds: float = 1.0,
+    max_cost_increase: float = 0.1,
+    percentiles: Iterable[int] = (50, 95)
+) -> list[dict]:
+    """
+    Compares the metrics of two evaluation reports.
+
+    Only the issue types, stages and nodes reported in both are compared, and latency and cost metrics with a
+    baseline of 0 are skipped, as they have no relative increase.
+
+    Args:
+    - baseline: dict, the report of the baseline.
+    - candidate: dict, the report of the candidate.
+    - max_quality_drop: float, the largest accepted drop of the precision or recall of a type.
+    - max_latency_increase: float, the largest accepted relative increase of a latency percentile.
+    - min_latency_increase_seconds: float, latency increases below this are accepted, as noise.
+    - max_cost_increase: float, the largest accepted relative increase of a tokens or LLM calls percentile.
+    - percentiles: the percentiles of the latency and cost that are gated.
+
+    Returns:
+    - list of dicts, the `metric`, `key`, `baseline` and `candidate` value of each regression.
+    """
+    regressions = []
+    for metric in ("precision", "recall"):
+        regressions += _compare(baseline, candidate, metric,
+                                lambda base, new: base - new > max_quality_drop)
+
+    for percentile in percentiles:
+        regressions += _compare(
+            baseline, candidate, f"latency_p{percentile}",
+            lambda base, new: base > 0 and new > base * (1 + max_latency_increase)
+            and new - base >= min_latency_increase_seconds)
+        for metric in ("tokens", "llm_calls"):
+            regressions += _compare(baseline, candidate, f"{metric}_p{percentile}",
+                                    lambda base, new: base > 0 and new > base * (1 + max_cost_increase))
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--baseline", required=True, help="Report of the baseline")
+    parser.add_argument("--candidate", required=True, help="Report of the candidate")
+    parser.add_argument("--max-quality-drop", type=float, default=0.02)
+    parser.add_argument("--max-latency-increase", type=float, default=0.2)
+    parser.add_argument("--min-latency-increase-seconds", type=float, default=1.0)
+    parser.add_argument("--max-cost-increase", type=float, default=0.1)
+    parser.add_argument("--percentiles", default="50,95", help="Gated percentiles of the latency and cost")
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = json.load(f)
+
+    regressions = find_regressions(
+        baseline,
+        candidate,
+        max_quality_drop=args.max_quality_drop,
+        max_latency_increase=args.max_latency_increase,
+        min_latency_increase_seconds=args.min_latency_increase_seconds,
+        max_cost_increase=args.max_cost_increase,
+        percentiles=[int(percentile) for percentile in args.percentiles.split(",")],
+    )
+    for regression in regressions:
+        print(f"{regression['metric']} {regression['key']}: {regression['baseline']:.4g} -> {regression['candidate']:.4g}")
+
+    if regressions:
+        print(f"{len(regressions)} regressions against the baseline.")
+        sys.exit(1)
+    print("No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+Evaluates a prompt change on as few documents of the golden set as needed, instead of the whole golden set.
+
+The documents are taken in a stratified order, so that every prefix of the order has about the same share of each
+stratum as the golden set. They are reviewed and evaluated in batches, and after each batch the precision and recall
+per type are calculated with bootstrap confidence intervals. The run stops as soon as:
+
+- the intervals are all narrower than `--max-interval-width` (`converged`), or
+- with a `--baseline` report, an interval is entirely below the baseline by more than `--margin` (`worse`), or every
+  interval is above the baseline minus `--margin` and one is entirely above it (`better`).
+
+The rest of the golden set is never reviewed. Comparing several intervals with the baseline after every batch makes
+a wrong decision more likely than the confidence level suggests. The intervals compared with the baseline are therefore
+widened to the Bonferroni-corrected confidence `1 - (1 - confidence) / k` for `k` compared intervals, the default
+`--margin` ignores differences of up to 2 points, and the first check waits for `--min-documents` documents.
+
+The golden set is a JSONL file with a `gt_json` per line and either the `pdf_name` of the document in storage, which
+is reviewed with the review flow in this process when it is reached, or its `llm_output`. A `stratum` may be given
+per document; by default the stratum is the most frequent issue type of the ground truth.
+
+The result of each document is written to `<output-dir>/results.ndjson`, and the metrics, their intervals and the
+stopping decision to `<output-dir>/report.json`, in the format of the batch evaluator.
+
+Usage:
+    python -m eval.src.sequential_evaluator --golden-set golden_set.jsonl --output-dir eval_results \\
+        --baseline baseline_results/report.json
+"""
+import sys
+import json
+import random
+import logging
+import argparse
+from pathlib import Path
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Optional
+
+from eval.src.batch_evaluator import evaluate_document
+from eval.src.evaluation_cache import EvaluationCache
+from eval.src.metric_calculator import MetricsCalculator
+
+
+RESULTS_FILE = "results.ndjson"
+REPORT_FILE = "report.json"
+
+
+def get_stratum(document: dict) -> str:
+    """
+    Returns the stratum of a golden set document: its `stratum`, or the most frequent issue type of its ground truth.
+    """
+    if document.get("stratum") is not None:
+        return str(document["stratum"])
+    types = Counter(issue["type"] for issue in document["gt_json"].get("issues", []))
+    return types.most_common(1)[0][0] if types else "none"
+
+
+def stratified_order(documents: list, key: Callable[[dict], str] = get_stratum, seed: int = 0) -> list:
+    """
+    Orders the documents so that every prefix of the order has about the same share of each stratum.
+
+    The documents of each stratum are shuffled and spread evenly over [0, 1), from a random offset, and the
+    documents of all the strata are then sorted by their position.
+    """
+    rnd = random.Random(seed)
+    strata = defaultdict(list)
+    for document in documents:
+        strata[key(document)].append(document)
+
+    positioned = []
+    for stratum in sorted(strata):
+        members = strata[stratum]
+        rnd.shuffle(members)
+        offset = rnd.random()
+        positioned.extend(((i + offset) / len(members), rnd.random(), document) for i, document in enumerate(members))
+    positioned.sort(key=lambda entry: entry[:2])
+    return [document for _, _, document in positioned]
+
+
+def get_comparison_confidence(confidence: float, baseline: dict) -> float:
+    """
+    Returns the Bonferroni-corrected confidence of the intervals compared with a baseline, so that all of them hold
+    together with the `confidence` level.
+    """
+    compared = sum(len(baseline.get(metric, {})) for metric in ("precision", "recall"))
+    return 1 - (1 - confidence) / max(compared, 1)
+
+
+def check_stopping(
+    report: dict,
+    max_interval_width: float = 0.1,
+    baseline: Optional[dict] = None,
+    margin: float = 0.02,
+    comparison_intervals: Optional[dict] = None
+) -> Optional[str]:
+    """
+    Decides whether the evaluation can stop, from the precision and recall intervals of a report.
+
+    Args:
+    - report: dict, with the `precision_ci_low`, `precision_ci_high`, `recall_ci_low` and `recall_ci_high` per type.
+    - max_interval_width: float, the run converged once every interval is at most this wide.
+    - baseline: dict, optional - a report with the `precision` and `recall` per type of the baseline.
+    - margin: float, differences with the baseline smaller than this do not matter.
+    - comparison_intervals: dict, optional - the intervals compared with the baseline, in the format of the report,
+      e.g. at the confidence of `get_comparison_confidence`. By default those of the report.
+
+    Returns:
+    - str, 'worse', 'better' or 'converged', or None to continue.
+    """
+    def get_intervals(source: dict) -> list:
+        return [
+            (metric, issue_type, low, source[f"{metric}_ci_high"][issue_type])
+            for metric in ("precision", "recall")
+            for issue_type, low in source[f"{metric}_ci_low"].items()
+        ]
+
+    intervals = get_intervals(report)
+    if not intervals:
+        return None
+
+    if baseline is not None:
+        compared = [
+            (low, high, baseline[metric][issue_type])
+            for metric, issue_type, low, high in get_intervals(comparison_intervals or report)
+            if issue_type in baseline.get(metric, {})
+        ]
+        if any(high < value - margin for _, high, value in compared):
+            return "worse"
+        if compared and all(low > value - margin for low, _, value in compared) \
+                and any(low > value for low, _, value in compared):
+            return "better"
+
+    if all(high - low <= max_interval_width for _, _, low, high in intervals):
+        return "converged"
+    return None
+
+
+def review_with_flow(pdf_name: str) -> dict:
+    """
+    Reviews a document in storage with the review flow in this process, and returns its non-streaming output.
+    """
+    root_path = Path(__file__).parents[2]
+    flow_path = str(root_path / "flows" / "ai_doc_review")
+    if flow_path not in sys.path:
+        # The flow modules use flat imports, as they do when promptflow runs the flow
+        sys.path.insert(0, flow_path)
+    import flows
+    from process import process
+
+    # The models module is an additional include of the flow when it is deployed
+    flows.MODELS_MODULE_PATH = root_path / "common" / "models.py"
+
+    return json.loads(process(pdf_name))
+
+
+def evaluate_sequentially(
+    documents: list,
+    output_dir: Path,
+    review: Callable[[str], dict] = review_with_flow,
+    baseline: Optional[dict] = None,
+    max_interval_width: float = 0.1,
+    margin: float = 0.02,
+    min_documents: int = 20,
+    batch_size: int = 10,
+    concurrent_reviews: int = 4,
+    confidence: float = 0.95,
+    seed: int = 0,
+    cache_dir: Optional[Path] = None,
+    threshold: float = 0.8,
+    **associator_options
+) -> dict:
+    """
+    Reviews and evaluates the documents in stratified order until the stopping rule is met.
+
+    Args:
+    - documents: list of golden set documents, each a dict with a `gt_json` and a `pdf_name` or an `llm_output`.
+    - output_dir: Path, the directory of the results and of the report.
+    - review: the function returning the output of the review flow for a `pdf_name`.
+    - baseline: dict, optional - the report of the baseline to compare with.
+    - max_interval_width: float, the width of the intervals at which the run converged.
+    - margin: float, differences with the baseline smaller than this do not matter.
+    - min_documents: int, the number of documents evaluated before the first check.
+    - batch_size: int, the number of documents evaluated between two checks.
+    - concurrent_reviews: int, the number of documents of a batch reviewed at once.
+    - confidence: float, the confidence level of the intervals, and of the comparison with the baseline.
+    - seed: int, the seed of the stratified order and of the bootstrap.
+    - cache_dir: Path, optional - the directory of an `EvaluationCache`.
+    - threshold: float, similarity threshold of the associations.
+    - associator_options: options of the `IssueAssociator`, e.g. `assignment` or `block_by_page`.
+
+    Returns:
+    - dict, the metrics and their intervals on the evaluated documents, and the `stopping` decision with the number
+      of documents evaluated.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    ordered = stratified_order(documents, seed=seed)
+    cache = EvaluationCache(str(cache_dir)) if cache_dir is not None else None
+    comparison_confidence = get_comparison_confidence(confidence, baseline) if baseline is not None else None
+
+    def get_output(document: dict) -> dict:
+        if document.get("llm_output") is not None:
+            return document["llm_output"]
+        return review(document["pdf_name"])
+
+    results = []
+    report, decision = {}, None
+    with open(output_dir / RESULTS_FILE, "w", encoding="utf-8") as f, \
+            ThreadPoolExecutor(max_workers=concurrent_reviews) as pool:
+        for start in range(0, len(ordered), batch_size):
+            batch = ordered[start:start + batch_size]
+            for document, llm_output in zip(batch, pool.map(get_output, batch)):
+                result = evaluate_document(document["gt_json"], llm_output, threshold=threshold, cache=cache,
+                                           **associator_options)
+                name = document.get("name", document.get("pdf_name"))
+                f.write(json.dumps({"name": name, "stratum": get_stratum(document), **result}) + "\n")
+                results.append({key: result[key] for key in ("tp", "fp", "fn", "llm_usage", "timings", "association_cached")})
+
+            report = MetricsCalculator.calculate_metrics_from_multiple_results(results)
+            report.update(MetricsCalculator.calculate_confidence_intervals_from_multiple_results(
+                results, confidence=confidence, seed=seed))
+            if len(results) >= min_documents:
+                comparison_intervals = None
+                if baseline is not None:
+                    comparison_intervals = MetricsCalculator.calculate_confidence_intervals_from_multiple_results(
+                        results, confidence=comparison_confidence, seed=seed)
+                decision = check_stopping(report, max_interval_width, baseline, margin, comparison_intervals)
+            logging.info(f"Evaluated {len(results)} of {len(ordered)} documents: {decision or 'continuing'}.")
+            if decision:
+                break
+
+    report.update(MetricsCalculator.calculate_llm_usage_from_multiple_results(results))
+    report.update(MetricsCalculator.calculate_performance_from_multiple_results(results))
+    report.update(MetricsCalculator.calculate_cache_usage_from_multiple_results(results))
+    report["stopping"] = {
+        # 'exhausted' when the golden set ran out before the stopping rule was met
+        "decision": decision or "exhausted",
+        "documents": len(results),
+        "golden_set_documents": len(ordered),
+        "fraction": round(len(results) / len(ordered), 3) if ordered else 0.0,
+        "comparison_confidence": comparison_confidence,
+    }
+
+    with open(output_dir / REPORT_FILE, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def read_documents(path: Path) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--golden-set", required=True, help="JSONL file of the documents")
+    parser.add_argument("--output-dir", required=True)
+    parser.add_argument("--baseline", default=None, help="Report of the baseline, e.g. of the batch evaluator")
+    parser.add_argument("--max-interval-width", type=float, default=0.1)
+    parser.add_argument("--margin", type=float, default=0.02)
+    parser.add_argument("--min-documents", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--concurrent-reviews", type=int, default=4)
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cache-dir", default=None, help="Reuse the associations of unchanged documents from this directory")
+    parser.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    logging.basicConfig(level=logging.INFO)
+    report = evaluate_sequentially(
+        read_documents(Path(args.golden_set)),
+        Path(args.output_dir),
+        baseline=baseline,
+        max_interval_width=args.max_interval_width,
+        margin=args.margin,
+        min_documents=args.min_documents,
+        batch_size=args.batch_size,
+        concurrent_reviews=args.concurrent_reviews,
+        confidence=args.confidence,
+        seed=args.seed,
+        cache_dir=Path(args.cache_dir) if args.cache_dir else None,
+        threshold=args.threshold,
+    )
+    print(json.dumps(report["stopping"], indent=2))
+
+
+if __name__ == "__main__":
+    main()
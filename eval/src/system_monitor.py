@@ -1,6 +1,8 @@
 import json
+import importlib
+import numpy as np
 import pandas as pd
-from typing import Dict, Callable, Union, Any
+from typing import Dict, Callable, List, Union, Any
 
 class Metric:
     def __init__(self, value: Union[float, Dict[Any, float]] = 0.0, description: str = ""):
@@ -22,23 +24,76 @@ class Metric:
         else:
             self.value = new_value
 
+def count_combinations(keys: List[pd.Series]) -> pd.DataFrame:
+    """
+    Counts the rows per combination of categorical or boolean columns.
+
+    The codes of the columns are combined into a single integer per row, which is counted with
+    `np.bincount`, in one linear pass, unless there are too many possible combinations, in
+    which case they are counted by sorting (`np.unique`). Missing values form their own group.
+
+    Returns:
+    - pd.DataFrame, one row per combination present, with the columns and their 'count'.
+    """
+    levels = [(key.name, None, 2) if key.dtype == bool else (key.name, key.cat.categories, len(key.cat.categories) + 1)
+              for key in keys]
+    possible = int(np.prod([cardinality for _, _, cardinality in levels], dtype=object))
+    if possible >= 2 ** 63:
+        # Too many combinations for a single integer
+        return pd.concat(keys, axis=1).groupby(
+            [key.name for key in keys], observed=True, sort=False, dropna=False
+        ).size().reset_index(name='count')
+
+    combined = np.zeros(len(keys[0]), dtype=np.int64)
+    for key, (_, categories, cardinality) in zip(keys, levels):
+        combined *= cardinality
+        # Category codes are shifted by one, so missing values (-1) have code 0
+        combined += key.to_numpy() if categories is None else key.cat.codes.to_numpy() + 1
+
+    if possible <= max(2 * len(combined), 2 ** 20):
+        counts = np.bincount(combined, minlength=possible)
+        present = np.flatnonzero(counts)
+        counts = counts[present]
+    else:
+        present, counts = np.unique(combined, return_counts=True)
+
+    columns = {}
+    for (name, categories, _), codes in zip(levels, np.unravel_index(present, [level[2] for level in levels])):
+        if categories is None:
+            columns[name] = codes.astype(bool)
+        else:
+            columns[name] = pd.Categorical.from_codes(codes - 1, categories)
+    columns['count'] = counts
+    return pd.DataFrame(columns)
+
+
 class SystemMonitor:
+    # The columns of the issues each metric is calculated from
+    METRIC_COLUMNS = {
+        'acceptance_rate': ['status'],
+        'suggestion_approval_rate': ['status', 'modified_fields'],
+        'amount_of_unique_documents_reviewed': ['doc_id'],
+        'issue_type_distribution': ['type']
+    }
+
     def __init__(self, config_file: str):
         """
         Initializes the MetricCalculator by loading configuration from a JSON file.
         It prepares a structured dictionary to store calculated metrics and maps
         metric names to their respective calculation functions.
+
+        Besides the names of the built-in metrics, the configured metrics can be plugins:
+        `{"name": ..., "function": "module:function", "columns": [...]}`, where the function
+        receives the counts of the issues (see `aggregate`) grouped by at least `columns`
+        and returns the value of the metric.
         """
         self.metrics: Dict[str, Metric] = {}
         self.metric_functions: Dict[str, Callable[[pd.DataFrame], None]] = {}
+        self.metric_columns: Dict[str, List[str]] = dict(self.METRIC_COLUMNS)
 
         # Load the configuration from the JSON file
         with open(config_file, 'r') as f:
             self.config = json.load(f)
-        
-        # Initialize Metric objects for each configured metric
-        for metric_name in self.config['metrics']:
-            self.metrics[metric_name] = Metric()
 
         # Map metric names to their corresponding calculation functions.
         self.metric_functions = {
@@ -48,22 +103,82 @@ class SystemMonitor:
             'issue_type_distribution': self._calculate_issue_type_distribution
         }
 
+        # Initialize Metric objects for each configured metric
+        self.metric_names: List[str] = []
+        for metric in self.config['metrics']:
+            if isinstance(metric, dict):
+                self._register_plugin(metric)
+                metric = metric['name']
+            self.metric_names.append(metric)
+            self.metrics[metric] = Metric()
+
+    def _register_plugin(self, metric: Dict[str, Any]):
+        module_name, function_name = metric['function'].split(':')
+        function = getattr(importlib.import_module(module_name), function_name)
+
+        def calculate(counts: pd.DataFrame):
+            self.metrics[metric['name']].update_value(function(counts))
+
+        self.metric_functions[metric['name']] = calculate
+        self.metric_columns[metric['name']] = list(metric.get('columns', []))
+
     def calculate_metrics(self, issues_df: pd.DataFrame):
         """
-        Dynamically calculates the metrics based on the issues data provided,
-        without using if-else. It uses the mapping of metric names to functions.
+        Calculates the configured metrics from a single grouped pass over the issues.
+        """
+        self.calculate_metrics_from_counts(self.aggregate(issues_df))
+
+    def calculate_metrics_from_counts(self, counts: pd.DataFrame):
+        """
+        Dynamically calculates the metrics from the counts of the issues, without using
+        if-else. It uses the mapping of metric names to functions.
         """
-        for metric_name in self.config['metrics']:
+        for metric_name in self.metric_names:
             calculate_func = self.metric_functions.get(metric_name)
             if calculate_func:
-                calculate_func(issues_df)  # Call the respective function
+                calculate_func(counts)  # Call the respective function
+
+    def get_required_columns(self) -> List[str]:
+        """
+        Returns the columns of the issues needed by the configured metrics, e.g. to load only them from an export.
+        """
+        columns = []
+        for metric_name in self.metric_names:
+            columns.extend(self.metric_columns.get(metric_name, []))
+        return list(dict.fromkeys(columns))
 
-    def _calculate_issue_type_distribution(self, issues_df: pd. DataFrame):
+    def aggregate(self, issues_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Counts the issues per combination of the columns needed by the configured metrics,
+        in one grouped pass, instead of one scan of the issues per metric.
+
+        Columns are grouped as categoricals, and 'modified_fields' is reduced to whether it
+        is set, in a 'modified' column.
+
+        Returns:
+        - pd.DataFrame, one row per combination present in the issues, with its 'count'.
+        """
+        keys = []
+        for column in self.get_required_columns():
+            if column == 'modified_fields':
+                keys.append(issues_df[column].notna().rename('modified'))
+            else:
+                keys.append(issues_df[column].astype('category'))
+
+        if not keys:
+            return pd.DataFrame({'count': [len(issues_df)]})
+        return count_combinations(keys)
+
+    @staticmethod
+    def _count_by(counts: pd.DataFrame, column: str) -> pd.Series:
+        return counts.groupby(column, observed=True)['count'].sum()
+
+    def _calculate_issue_type_distribution(self, counts: pd.DataFrame):
         """
         Calculates the issue type distribution and update the relevant metric
         """
         # Count occurrences of each issue type
-        type_counts = issues_df['type'].value_counts()
+        type_counts = self._count_by(counts, 'type').sort_values(ascending=False, kind='stable')
 
         # Convert counts to proportions (optional)
         type_proportions = type_counts / type_counts.sum()
@@ -73,43 +188,36 @@ class SystemMonitor:
             'counts': type_counts.to_dict(),
             'proportions': type_proportions.to_dict()
         }
-        
+
         self.metrics['issue_type_distribution'].update_value(distribution_dict)
 
-    def _calculate_amount_of_unique_document_reviewed(self, issues_df: pd. DataFrame):
+    def _calculate_amount_of_unique_document_reviewed(self, counts: pd.DataFrame):
         """
-
+        Calculates the number of unique documents (`doc_id`) with issues.
         """
-        issues_df = issues_df.sort_values(['doc_id', 'doc_major_version', 'doc_minor_version'], 
-                                        ascending=[True, False, False])
-
-        # Drop duplicates to keep only the latest version per 'doc_id'
-        latest_df = issues_df.drop_duplicates(subset=['doc_id'], keep='first')
-
-        # Count the number of unique 'doc_id' in the latest reviewed documents
-
-        self.metrics['amount_of_unique_documents_reviewed'].update_value(latest_df['doc_id'].nunique())
+        self.metrics['amount_of_unique_documents_reviewed'].update_value(counts['doc_id'].nunique())
 
-        
-    def _calculate_acceptance_rate(self, issues_df: pd.DataFrame):
+    def _calculate_acceptance_rate(self, counts: pd.DataFrame):
         """
         Calculates the acceptance rate and updates the corresponding metric.
         """
-        accepted_count = (issues_df['status'] == 'accepted').sum()
-        total_count = accepted_count + (issues_df['status'] == 'dismissed').sum()
+        status_counts = self._count_by(counts, 'status')
+        accepted_count = status_counts.get('accepted', 0)
+        total_count = accepted_count + status_counts.get('dismissed', 0)
 
         if total_count > 0:
             self.metrics['acceptance_rate'].update_value((accepted_count / total_count) * 100)
         else:
             self.metrics['acceptance_rate'].update_value(None)
 
-    def _calculate_suggestion_approval_rate(self, issues_df: pd.DataFrame):
+    def _calculate_suggestion_approval_rate(self, counts: pd.DataFrame):
         """
-        Calculates the suggestion approval rate as the ratio of rows where 
+        Calculates the suggestion approval rate as the ratio of rows where
         status is 'accepted' and modified_fields is not None.
         """
-        accepted_with_modifications = ((issues_df['status'] == 'accepted') & (issues_df['modified_fields'].notna())).sum()
-        total_accepted = (issues_df['status'] == 'accepted').sum()
+        accepted = counts[counts['status'] == 'accepted']
+        accepted_with_modifications = accepted.loc[accepted['modified'], 'count'].sum()
+        total_accepted = accepted['count'].sum()
 
         if total_accepted > 0:
             self.metrics['suggestion_approval_rate'].update_value((accepted_with_modifications / total_accepted) * 100)
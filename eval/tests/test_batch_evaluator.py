@@ -0,0 +1,111 @@
+import copy
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from eval.src.batch_evaluator import evaluate_document, evaluate_golden_set, read_golden_set
+from eval.src.evaluation_cache import EvaluationCache
+
+
+def make_document(index):
+    ground_truth = {"issues": [
+        {"type": "Grammar & Spelling", "location": {"source_sentence": f"Document {index} has a speling error."}},
+        {"type": "Definitive Language", "location": {"source_sentence": f"Document {index} is the best offer."}},
+    ]}
+    llm_output = {
+        "issues": [
+            {"type": "Grammar & Spelling", "location": {"source_sentence": f"Document {index} has a speling error."}},
+            {"type": "Definitive Language", "location": {"source_sentence": "An unrelated sentence."}},
+        ],
+        "llm_usage": {"grammar": {"requests": 2, "calls": 1}},
+    }
+    return f"doc-{index}", ground_truth, llm_output
+
+
+class TestBatchEvaluator(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name)
+        self.documents = [make_document(i) for i in range(6)]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_evaluate_document(self):
+        _, ground_truth, llm_output = self.documents[0]
+        result = evaluate_document(ground_truth, llm_output)
+
+        self.assertEqual(result["tp"], {"Grammar & Spelling": 1})
+        self.assertEqual(result["fp"], {"Definitive Language": 1})
+        self.assertEqual(result["fn"], {"Definitive Language": 1})
+        self.assertEqual(result["llm_usage"], llm_output["llm_usage"])
+
+    def test_read_golden_set_from_jsonl(self):
+        path = self.path / "golden_set.jsonl"
+        with open(path, "w", encoding="utf-8") as f:
+            for name, ground_truth, llm_output in self.documents:
+                f.write(json.dumps({"name": name, "gt_json": ground_truth, "llm_output": llm_output}) + "\n")
+
+        self.assertEqual(list(read_golden_set(path)), self.documents)
+
+    def test_read_golden_set_from_directory_skips_incomplete_documents(self):
+        for folder in ("ground_truth", "llm_output"):
+            (self.path / folder).mkdir()
+        for name, ground_truth, llm_output in self.documents:
+            (self.path / "ground_truth" / f"{name}.json").write_text(json.dumps(ground_truth))
+            (self.path / "llm_output" / f"{name}.json").write_text(json.dumps(llm_output))
+        (self.path / "ground_truth" / "no-output.json").write_text(json.dumps({"issues": []}))
+
+        self.assertEqual(list(read_golden_set(self.path)), self.documents)
+
+    def test_pool_matches_in_process_evaluation(self):
+        in_process = evaluate_golden_set(self.documents, self.path / "in_process", workers=1)
+        pooled = evaluate_golden_set(self.documents, self.path / "pooled", workers=2)
+
+        for report in (in_process, pooled):
+            self.assertEqual(report["tp"], {"Grammar & Spelling": 6})
+            self.assertEqual(report["fp"], {"Definitive Language": 6})
+            self.assertEqual(report["fn"], {"Definitive Language": 6})
+            self.assertEqual(report["llm_calls_saved"], {"grammar": 6})
+            self.assertEqual(report["throughput"]["documents"], 6)
+
+        with open(self.path / "pooled" / "results.ndjson", encoding="utf-8") as f:
+            results = {result["name"]: result for result in map(json.loads, f)}
+        self.assertEqual(sorted(results), [name for name, _, _ in self.documents])
+        self.assertEqual(results["doc-0"]["tp"], evaluate_document(*self.documents[0][1:])["tp"])
+
+    def test_cache_reuses_unchanged_documents(self):
+        cache_dir = self.path / "cache"
+        first = evaluate_golden_set(self.documents, self.path / "first", workers=1, cache_dir=cache_dir)
+        self.assertEqual(first["evaluation_cache"], {"reused": 0, "evaluated": 6})
+
+        # An explanation does not change the association, a source sentence does
+        documents = copy.deepcopy(self.documents)
+        documents[0][2]["issues"][0]["explanation"] = "A new explanation."
+        documents[1][2]["issues"][1]["location"]["source_sentence"] = "Document 1 is the best offer."
+        second = evaluate_golden_set(documents, self.path / "second", workers=2, cache_dir=cache_dir)
+        self.assertEqual(second["evaluation_cache"], {"reused": 5, "evaluated": 1})
+        self.assertEqual(second["tp"], {"Grammar & Spelling": 6, "Definitive Language": 1})
+
+        with open(self.path / "second" / "results.ndjson", encoding="utf-8") as f:
+            results = {result.pop("name"): result for result in map(json.loads, f)}
+        for name, ground_truth, llm_output in documents:
+            expected = evaluate_document(ground_truth, llm_output)
+            self.assertEqual(results[name]["association_cached"], name != "doc-1")
+            for key in ("tp", "fp", "fn", "true_positive_cases", "false_positive_cases", "false_negative_cases"):
+                self.assertEqual(results[name][key], expected[key])
+        # The cases of a reused document are rebuilt from its current issues
+        self.assertEqual(results["doc-0"]["true_positive_cases"][0]["detected_issue"]["explanation"], "A new explanation.")
+
+    def test_cache_key_includes_options(self):
+        cache = EvaluationCache(str(self.path / "cache"))
+        _, ground_truth, llm_output = self.documents[0]
+        evaluate_document(ground_truth, llm_output, cache=cache)
+
+        self.assertTrue(evaluate_document(ground_truth, llm_output, cache=cache)["association_cached"])
+        self.assertFalse(evaluate_document(ground_truth, llm_output, threshold=0.5, cache=cache)["association_cached"])
+
+
+if __name__ == "__main__":
+    unittest.main()
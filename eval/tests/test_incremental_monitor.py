@@ -0,0 +1,109 @@
+import os
+import json
+import random
+import tempfile
+import unittest
+import pandas as pd
+from eval.src.system_monitor import SystemMonitor
+from eval.src.incremental_monitor import IncrementalSystemMonitor, read_replay_file
+
+METRICS = ["acceptance_rate", "suggestion_approval_rate", "amount_of_unique_documents_reviewed", "issue_type_distribution"]
+
+
+def make_events(count, seed):
+    """
+    Random issue events: new issues, status changes of existing issues, deletions and stale replays.
+    """
+    rnd = random.Random(seed)
+    events, latest = [], {}
+    for ts in range(1, count + 1):
+        action = rnd.random()
+        if latest and action < 0.1:
+            issue_id = rnd.choice(list(latest))
+            events.append({"id": issue_id, "deleted": True, "_ts": ts})
+            del latest[issue_id]
+        elif latest and action < 0.2:
+            # A change delivered again after a later one
+            events.append(rnd.choice(events))
+        else:
+            issue_id = rnd.choice(list(latest)) if latest and action < 0.6 else f"issue-{ts}"
+            status = rnd.choice(["not_reviewed", "accepted", "dismissed"])
+            event = {
+                "id": issue_id,
+                "doc_id": f"doc-{rnd.randint(1, 10)}" if issue_id not in latest else latest[issue_id]["doc_id"],
+                "type": rnd.choice(["Grammar & Spelling", "Definitive Language"]),
+                "status": status,
+                "modified_fields": {"suggested_fix": "fix"} if status == "accepted" and rnd.random() < 0.5 else None,
+                "_ts": ts,
+            }
+            events.append(event)
+            latest[issue_id] = event
+    return events, latest
+
+
+class TestIncrementalSystemMonitor(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.config_file = os.path.join(self.directory.name, "config.json")
+        with open(self.config_file, "w") as f:
+            json.dump({"metrics": METRICS}, f)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def assert_same_metrics(self, monitor, latest):
+        issues_df = pd.DataFrame(list(latest.values()))
+        issues_df["doc_major_version"] = issues_df["doc_minor_version"] = 1
+        full = SystemMonitor(self.config_file)
+        full.calculate_metrics(issues_df)
+
+        for metric_name in ["acceptance_rate", "suggestion_approval_rate"]:
+            if full.get_metric(metric_name) is None:
+                self.assertIsNone(monitor.get_metric(metric_name))
+            else:
+                self.assertAlmostEqual(monitor.get_metric(metric_name), full.get_metric(metric_name))
+        self.assertEqual(monitor.get_amount_of_reviewed_documents(), full.get_amount_of_reviewed_documents())
+        self.assertEqual(monitor.get_issue_type_distribution()["counts"], full.get_issue_type_distribution()["counts"])
+
+    def test_events_match_full_recomputation(self):
+        for seed in range(10):
+            events, latest = make_events(300, seed)
+            monitor = IncrementalSystemMonitor(self.config_file)
+            monitor.apply_events((event, None) for event in events)
+            self.assert_same_metrics(monitor, latest)
+
+    def test_status_transition_moves_issue_between_counts(self):
+        monitor = IncrementalSystemMonitor(self.config_file)
+        issue = {"id": "1", "doc_id": "doc", "type": "Definitive Language", "status": "dismissed", "_ts": 1}
+        monitor.apply_events([(issue, None), ({**issue, "status": "accepted", "_ts": 2}, None)])
+        self.assertEqual(monitor.get_acceptance_rate(), 100.0)
+
+        monitor.apply_events([({**issue, "status": "dismissed", "_ts": 3}, None)])
+        self.assertEqual(monitor.get_acceptance_rate(), 0.0)
+
+    def test_checkpoint_resumes_replay_file(self):
+        events, latest = make_events(200, seed=42)
+        replay_file = os.path.join(self.directory.name, "changes.ndjson")
+        checkpoint = os.path.join(self.directory.name, "monitor.json")
+        with open(replay_file, "w") as f:
+            for event in events[:120]:
+                f.write(json.dumps(event) + "\n")
+
+        first = IncrementalSystemMonitor(self.config_file)
+        first.apply_events(read_replay_file(replay_file))
+        first.save_checkpoint(checkpoint)
+
+        with open(replay_file, "a") as f:
+            for event in events[120:]:
+                f.write(json.dumps(event) + "\n")
+
+        resumed = IncrementalSystemMonitor(self.config_file)
+        self.assertTrue(resumed.load_checkpoint(checkpoint))
+        applied = resumed.apply_events(read_replay_file(replay_file, resumed.continuation))
+
+        self.assertEqual(applied, 80)
+        self.assert_same_metrics(resumed, latest)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,7 @@
+import random
 import unittest
-from eval.src.issue_associator import IssueAssociator  # Import the actual IssueAssociator class
+from importlib.util import find_spec
+from eval.src.issue_associator import IssueAssociator, ShingleIndex  # Import the actual IssueAssociator class
 
 
 class TestIssueAssociator(unittest.TestCase):
@@ -104,5 +106,94 @@ class TestIssueAssociator(unittest.TestCase):
         self.assertEqual(self.issue_associator.get_unassociated_ground_truth(), expected_unassociated_ground_truth)
 
 
+def make_issue(sentence, issue_type="Grammar & Spelling", page_num=1):
+    return {"type": issue_type, "location": {"source_sentence": sentence, "page_num": page_num}}
+
+
+def make_random_issues(rnd, count, sentences=None):
+    words = "the bidder shall submit all documents before the deadline of a tender contract".split()
+    issues = []
+    for _ in range(count):
+        if sentences and rnd.random() < 0.6:
+            characters = list(rnd.choice(sentences))
+            for _ in range(rnd.randint(0, 6)):
+                if characters and rnd.random() < 0.5:
+                    del characters[rnd.randrange(len(characters))]
+                else:
+                    characters.insert(rnd.randint(0, len(characters)), rnd.choice("abcde "))
+            sentence = "".join(characters)
+        else:
+            sentence = " ".join(rnd.choice(words) for _ in range(rnd.randint(0, 20)))
+        issues.append(make_issue(sentence, rnd.choice(["Grammar & Spelling", "Definitive Language"]), rnd.randint(1, 3)))
+    return issues
+
+
+class TestIssueAssociatorMatching(unittest.TestCase):
+    def associate(self, detected, ground_truth, **options):
+        associator = IssueAssociator(detected, ground_truth, **options)
+        associator.associate_issues()
+        return associator
+
+    def test_prefilter_gives_the_same_associations_as_all_pairs(self):
+        for seed in range(50):
+            rnd = random.Random(seed)
+            ground_truth = make_random_issues(rnd, rnd.randint(0, 25))
+            detected = make_random_issues(
+                rnd, rnd.randint(0, 25), [issue["location"]["source_sentence"] for issue in ground_truth])
+            threshold = rnd.choice([0.0, 0.5, 0.7, 0.8, 0.95, 1.0])
+
+            all_pairs = self.associate(detected, ground_truth, threshold=threshold, prefilter=False)
+            prefiltered = self.associate(detected, ground_truth, threshold=threshold)
+
+            self.assertEqual(prefiltered.get_associations(), all_pairs.get_associations())
+            self.assertEqual(prefiltered.get_unassociated_model_output(), all_pairs.get_unassociated_model_output())
+            self.assertEqual(prefiltered.get_unassociated_ground_truth(), all_pairs.get_unassociated_ground_truth())
+
+    def test_shingle_index_finds_every_match(self):
+        rnd = random.Random(0)
+        sentences = {i: issue["location"]["source_sentence"] for i, issue in enumerate(make_random_issues(rnd, 40))}
+        probes = make_random_issues(rnd, 40, list(sentences.values()))
+        index = ShingleIndex(sentences, 0.8)
+
+        for probe in probes:
+            probe_sentence = probe["location"]["source_sentence"]
+            candidates = index.candidates(probe_sentence)
+            for key, sentence in sentences.items():
+                if IssueAssociator.similarity_ratio(probe_sentence, sentence) >= 0.8 and candidates is not None:
+                    self.assertIn(key, candidates)
+
+    def test_greedy_matches_the_first_best_ground_truth(self):
+        detected = [make_issue("This is the best product.")]
+        ground_truth = [make_issue("This is the best product!"), make_issue("This is the best product.")] * 2
+
+        associator = self.associate(detected, ground_truth)
+
+        self.assertIs(associator.get_associations()[0]["ground_truth_issue"], ground_truth[1])
+        self.assertEqual(associator.get_associations()[0]["score"], 1.0)
+
+    def test_block_by_page_only_matches_issues_on_the_same_page(self):
+        detected = [make_issue("This is the best product.", page_num=2)]
+        ground_truth = [make_issue("This is the best product.", page_num=1)]
+
+        self.assertEqual(self.associate(detected, ground_truth).get_true_positives(), 1)
+        self.assertEqual(self.associate(detected, ground_truth, block_by_page=True).get_true_positives(), 0)
+
+    @unittest.skipUnless(find_spec("scipy"), "scipy is not installed")
+    def test_optimal_assignment_is_one_to_one(self):
+        detected = [make_issue("The bidder shall submit the form."), make_issue("The bidder shall submit the forms.")]
+        ground_truth = [make_issue("The bidder shall submit the forms."), make_issue("The bidders shall submit the form.")]
+
+        greedy = self.associate(detected, ground_truth)
+        optimal = self.associate(detected, ground_truth, assignment="optimal")
+
+        self.assertEqual(len({id(a["ground_truth_issue"]) for a in greedy.get_associations()}), 1)
+        self.assertEqual(len({id(a["ground_truth_issue"]) for a in optimal.get_associations()}), 2)
+        self.assertEqual(optimal.get_unassociated_ground_truth(), [])
+
+    def test_unknown_assignment_is_rejected(self):
+        with self.assertRaises(ValueError):
+            IssueAssociator([], [], assignment="random")
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,109 @@
+import os
+import tempfile
+import unittest
+from importlib.util import find_spec
+
+from eval.src.issues_exporter import IssuesExporter, build_export_query, load_issues
+
+
+class FakePages:
+    def __init__(self, items, page_size):
+        self.items = items
+        self.page_size = page_size
+
+    def by_page(self):
+        return iter([self.items[i:i + self.page_size] for i in range(0, len(self.items), self.page_size)])
+
+
+class FakeContainer:
+    """
+    Returns the stored items modified at or after the `@since` parameter, like the export query.
+    """
+    def __init__(self):
+        self.items = {}
+
+    def upsert(self, item):
+        self.items[item["id"]] = item
+
+    def query_items(self, query, parameters, enable_cross_partition_query, max_item_count):
+        since = parameters[0]["value"] if parameters else None
+        items = [item for item in self.items.values() if since is None or item["_ts"] >= since]
+        return FakePages(items, max_item_count)
+
+
+def make_issue(index, status="not_reviewed", ts=100):
+    return {
+        "id": f"issue-{index}",
+        "doc_id": f"doc-{index % 3}",
+        "type": "Definitive Language" if index % 2 else "Grammar & Spelling",
+        "status": status,
+        "text": "text",
+        "location": {"source_sentence": "sentence", "page_num": index % 5 + 1},
+        "review_initiated_by": "reviewer",
+        "review_initiated_at_UTC": f"2024-10-0{index % 2 + 1}T10:00:00+00:00",
+        "modified_fields": None,
+        "_ts": ts,
+    }
+
+
+@unittest.skipUnless(find_spec("pyarrow"), "pyarrow is not installed")
+class TestIssuesExporter(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.output_dir = self.directory.name
+        self.container = FakeContainer()
+        for i in range(10):
+            self.container.upsert(make_issue(i, ts=90 + i))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_query_projects_columns(self):
+        query, parameters = build_export_query(since=100)
+        self.assertIn("c.location.page_num AS page_num", query)
+        self.assertNotIn("c.text", query)
+        self.assertEqual(parameters, [{"name": "@since", "value": 100}])
+
+    def test_export_and_load_columns(self):
+        self.assertEqual(IssuesExporter(self.output_dir).export(self.container, page_size=4), 10)
+        self.assertEqual(sorted(os.listdir(self.output_dir)), ["_export_state.json", "date=2024-10-01", "date=2024-10-02"])
+
+        issues_df = load_issues(self.output_dir, columns=["status", "page_num"])
+        self.assertEqual(list(issues_df.columns), ["status", "page_num"])
+        self.assertEqual(len(issues_df), 10)
+
+    def test_incremental_export_keeps_latest_version(self):
+        IssuesExporter(self.output_dir).export(self.container)
+        self.container.upsert({**make_issue(3, status="accepted", ts=200), "modified_fields": {"suggested_fix": "fix"}})
+        self.container.upsert(make_issue(10, ts=200))
+
+        exporter = IssuesExporter(self.output_dir)
+        self.assertEqual(exporter.watermark, 99)
+        # The issue modified in the second of the watermark is exported again
+        self.assertEqual(exporter.export(self.container), 3)
+
+        issues_df = load_issues(self.output_dir, columns=["id", "status", "modified_fields"]).set_index("id")
+        self.assertEqual(len(issues_df), 11)
+        self.assertEqual(issues_df.loc["issue-3", "status"], "accepted")
+        self.assertEqual(issues_df.loc["issue-3", "modified_fields"], '{"suggested_fix": "fix"}')
+
+    def test_compact_and_date_filter(self):
+        IssuesExporter(self.output_dir).export(self.container, page_size=3)
+        self.container.upsert(make_issue(4, status="dismissed", ts=200))
+        exporter = IssuesExporter(self.output_dir)
+        exporter.export(self.container)
+        before = load_issues(self.output_dir).sort_values("id").reset_index(drop=True)
+
+        exporter.compact()
+
+        for partition in ("date=2024-10-01", "date=2024-10-02"):
+            self.assertEqual(len(os.listdir(os.path.join(self.output_dir, partition))), 1)
+        after = load_issues(self.output_dir).sort_values("id").reset_index(drop=True)
+        self.assertTrue(before.equals(after))
+
+        first_day = load_issues(self.output_dir, columns=["id"], start_date="2024-10-01", end_date="2024-10-01")
+        self.assertEqual(len(first_day), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
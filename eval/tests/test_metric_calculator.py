@@ -116,6 +116,51 @@ class TestMetricsCalculator(unittest.TestCase):
             for call in expected_calls:
                 self.assertIn(call, calls)
 
+    def test_calculate_llm_usage_from_multiple_results(self):
+        results = [
+            {"llm_usage": {
+                "llm_multishot": {"requests": 5, "calls": 3, "cache_hits": 0, "skipped_requests": 2},
+                "consolidator": {"requests": 1, "calls": 1},
+            }},
+            {"llm_usage": {
+                "llm_multishot": {"requests": 5, "calls": 0, "cache_hits": 5, "skipped_requests": 0},
+                "consolidator": {"requests": 1, "calls": 0},
+            }},
+            {"llm_usage": {}},
+            {},
+        ]
+
+        usage = MetricsCalculator.calculate_llm_usage_from_multiple_results(results)
+
+        self.assertEqual(usage["llm_requests"], {"llm_multishot": 10, "consolidator": 2})
+        self.assertEqual(usage["llm_calls"], {"llm_multishot": 3, "consolidator": 1})
+        self.assertEqual(usage["llm_calls_saved"], {"llm_multishot": 7, "consolidator": 1})
+        self.assertAlmostEqual(usage["llm_calls_saved_rate"]["llm_multishot"], 0.7)
+        self.assertAlmostEqual(usage["llm_calls_saved_rate"]["consolidator"], 0.5)
+
+    def test_calculate_performance_from_multiple_results(self):
+        results = [
+            {
+                "timings": {"total": 10.0 * i, "document_intelligence": 2.0 * i, "post_processing": 0.5},
+                "llm_usage": {
+                    "llm_multishot": {"calls": i, "prompt_tokens": 1000 * i, "completion_tokens": 100 * i, "seconds": 5.0 * i},
+                    "consolidator": {"calls": 1, "prompt_tokens": 500, "completion_tokens": 50, "seconds": 1.0},
+                },
+            }
+            for i in range(1, 6)
+        ]
+        # Outputs of an earlier review flow have no timings
+        results.append({"llm_usage": {"consolidator": {"calls": 1, "prompt_tokens": 500, "completion_tokens": 50}}})
+
+        performance = MetricsCalculator.calculate_performance_from_multiple_results(results, percentiles=(50, 100))
+
+        self.assertEqual(performance["latency_p50"],
+                         {"total": 30.0, "document_intelligence": 6.0, "post_processing": 0.5,
+                          "llm_multishot": 15.0, "consolidator": 1.0})
+        self.assertEqual(performance["latency_p100"]["total"], 50.0)
+        self.assertEqual(performance["tokens_p100"], {"llm_multishot": 5500.0, "consolidator": 550.0, "total": 6050.0})
+        self.assertEqual(performance["llm_calls_p50"], {"llm_multishot": 3.0, "consolidator": 1.0, "total": 3.5})
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+
+from eval.src.regression_gate import find_regressions
+
+
+def make_report(precision=0.8, recall=0.7, total_seconds=40.0, consolidator_seconds=2.0, tokens=10000):
+    return {
+        "precision": {"Grammar & Spelling": precision},
+        "recall": {"Grammar & Spelling": recall},
+        "latency_p50": {"total": total_seconds, "consolidator": consolidator_seconds},
+        "latency_p95": {"total": total_seconds * 2, "consolidator": consolidator_seconds},
+        "tokens_p50": {"total": tokens},
+        "tokens_p95": {"total": tokens * 2},
+        "llm_calls_p50": {"total": 10},
+    }
+
+
+class TestRegressionGate(unittest.TestCase):
+    def test_no_regressions_within_tolerances(self):
+        candidate = make_report(precision=0.79, total_seconds=44.0, tokens=10500)
+        self.assertEqual(find_regressions(make_report(), candidate), [])
+
+    def test_quality_regression(self):
+        regressions = find_regressions(make_report(), make_report(recall=0.6))
+        self.assertEqual(regressions, [{"metric": "recall", "key": "Grammar & Spelling", "baseline": 0.7, "candidate": 0.6}])
+
+    def test_latency_regression_ignores_small_absolute_increases(self):
+        # The consolidator is 40% slower, but by less than a second
+        regressions = find_regressions(make_report(), make_report(total_seconds=56.0, consolidator_seconds=2.8))
+        self.assertEqual({(regression["metric"], regression["key"]) for regression in regressions},
+                         {("latency_p50", "total"), ("latency_p95", "total")})
+
+    def test_cost_regression(self):
+        regressions = find_regressions(make_report(), make_report(tokens=20000), percentiles=(95,))
+        self.assertEqual(regressions, [{"metric": "tokens_p95", "key": "total", "baseline": 20000, "candidate": 40000}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from eval.src.metric_calculator import MetricsCalculator
+from eval.src.sequential_evaluator import (
+    check_stopping, evaluate_sequentially, get_comparison_confidence, get_stratum, stratified_order
+)
+
+
+def make_document(index, issue_type, detected):
+    issues = [{"type": issue_type, "location": {"source_sentence": f"Document {index} issue {i}."}} for i in range(4)]
+    return {
+        "pdf_name": f"doc-{index}.pdf",
+        "gt_json": {"issues": issues},
+        # The review finds the first `detected` issues of the ground truth
+        "output": {"issues": issues[:detected]},
+    }
+
+
+class TestSequentialEvaluator(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_stratified_order_keeps_proportions_in_every_prefix(self):
+        documents = [make_document(i, "Grammar & Spelling" if i < 30 else "Definitive Language", 2) for i in range(40)]
+        ordered = stratified_order(documents)
+
+        self.assertEqual(sorted(d["pdf_name"] for d in ordered), sorted(d["pdf_name"] for d in documents))
+        for size in range(4, 41, 4):
+            minority = sum(get_stratum(d) == "Definitive Language" for d in ordered[:size])
+            self.assertLessEqual(abs(minority - size / 4), 1, size)
+
+    def test_confidence_intervals_narrow_with_more_documents(self):
+        results = [{"tp": {"A": i % 3}, "fp": {"A": 1}, "fn": {"A": 2 - i % 3}} for i in range(200)]
+
+        few = MetricsCalculator.calculate_confidence_intervals_from_multiple_results(results[:20])
+        many = MetricsCalculator.calculate_confidence_intervals_from_multiple_results(results)
+        point = MetricsCalculator.calculate_metrics_from_multiple_results(results)
+
+        self.assertLessEqual(many["recall_ci_low"]["A"], point["recall"]["A"])
+        self.assertGreaterEqual(many["recall_ci_high"]["A"], point["recall"]["A"])
+        self.assertLess(many["recall_ci_high"]["A"] - many["recall_ci_low"]["A"],
+                        few["recall_ci_high"]["A"] - few["recall_ci_low"]["A"])
+        self.assertEqual(many, MetricsCalculator.calculate_confidence_intervals_from_multiple_results(results))
+
+    def test_check_stopping(self):
+        report = {"precision_ci_low": {"A": 0.70}, "precision_ci_high": {"A": 0.78},
+                  "recall_ci_low": {"A": 0.50}, "recall_ci_high": {"A": 0.65}}
+
+        self.assertIsNone(check_stopping(report, max_interval_width=0.1))
+        self.assertEqual(check_stopping(report, max_interval_width=0.2), "converged")
+        self.assertEqual(check_stopping(report, baseline={"precision": {"A": 0.8}, "recall": {"A": 0.6}}, margin=0.0),
+                         "worse")
+        self.assertIsNone(check_stopping(report, baseline={"precision": {"A": 0.8}, "recall": {"A": 0.6}}))
+        self.assertEqual(check_stopping(report, baseline={"precision": {"A": 0.6}, "recall": {"A": 0.45}}), "better")
+
+        # The wider intervals of the comparison with the baseline overlap it
+        wider = {"precision_ci_low": {"A": 0.66}, "precision_ci_high": {"A": 0.82},
+                 "recall_ci_low": {"A": 0.44}, "recall_ci_high": {"A": 0.70}}
+        self.assertIsNone(check_stopping(report, baseline={"precision": {"A": 0.8}, "recall": {"A": 0.6}}, margin=0.0,
+                                         comparison_intervals=wider))
+
+    def test_comparison_confidence_is_corrected_for_the_compared_intervals(self):
+        baseline = {"precision": {"A": 0.8, "B": 0.7}, "recall": {"A": 0.6, "B": 0.5}}
+
+        self.assertAlmostEqual(get_comparison_confidence(0.95, baseline), 0.9875)
+        self.assertAlmostEqual(get_comparison_confidence(0.95, {}), 0.95)
+
+    def test_stops_before_reviewing_the_whole_golden_set(self):
+        documents = [make_document(i, "Grammar & Spelling", 2 + i % 2) for i in range(200)]
+        outputs = {document["pdf_name"]: document.pop("output") for document in documents}
+        reviewed = []
+
+        def review(pdf_name):
+            reviewed.append(pdf_name)
+            return outputs[pdf_name]
+
+        report = evaluate_sequentially(documents, self.path, review=review, max_interval_width=0.1,
+                                       min_documents=20, batch_size=10)
+
+        self.assertEqual(report["stopping"]["decision"], "converged")
+        self.assertLess(report["stopping"]["documents"], 200)
+        self.assertEqual(len(reviewed), report["stopping"]["documents"])
+        self.assertAlmostEqual(report["recall"]["Grammar & Spelling"], 0.625, delta=0.05)
+
+        # A candidate finding fewer issues than the baseline is stopped as worse
+        report = evaluate_sequentially(documents, self.path, review=review,
+                                       baseline={"precision": {"Grammar & Spelling": 1.0},
+                                                 "recall": {"Grammar & Spelling": 0.75}})
+        self.assertEqual(report["stopping"]["decision"], "worse")
+        self.assertEqual(report["stopping"]["documents"], 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
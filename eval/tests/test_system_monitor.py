@@ -1,6 +1,8 @@
+import json
 import unittest
+import numpy as np
 import pandas as pd
-from eval.src.system_monitor import SystemMonitor
+from eval.src.system_monitor import SystemMonitor, count_combinations
 
 class TestSystemMonitor(unittest.TestCase):
     
@@ -95,6 +97,86 @@ class TestSystemMonitor(unittest.TestCase):
         import os
         os.remove(self.config_file)  # Remove the test config file
 
+
+def dismissed_per_type(counts):
+    """
+    Plugin metric of the tests: the number of dismissed issues per type.
+    """
+    dismissed = counts[counts['status'] == 'dismissed']
+    return dismissed.groupby('type', observed=True)['count'].sum().to_dict()
+
+
+class TestSystemMonitorMetricEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.config_file = 'test_engine_config.json'
+        with open(self.config_file, 'w') as f:
+            json.dump({"metrics": [
+                "acceptance_rate",
+                "suggestion_approval_rate",
+                "amount_of_unique_documents_reviewed",
+                "issue_type_distribution",
+                {"name": "dismissed_per_type", "function": "eval.tests.test_system_monitor:dismissed_per_type",
+                 "columns": ["type", "status"]}
+            ]}, f)
+        self.issues_df = pd.DataFrame({
+            'doc_id': ['doc-1', 'doc-1', 'doc-2', 'doc-3', 'doc-3'],
+            'type': ['Grammar & Spelling', 'Definitive Language', 'Grammar & Spelling', 'Grammar & Spelling', None],
+            'status': ['accepted', 'dismissed', 'accepted', 'not_reviewed', 'dismissed'],
+            'modified_fields': [{'suggested_fix': 'fix'}, None, None, None, None]
+        })
+
+    def test_all_metrics_from_one_grouped_pass(self):
+        monitor = SystemMonitor(self.config_file)
+        monitor.calculate_metrics(self.issues_df)
+
+        self.assertEqual(monitor.get_acceptance_rate(), 50.0)
+        self.assertEqual(monitor.get_suggestion_approval_rate(), 50.0)
+        # Counted by doc_id, without the version columns issues no longer have
+        self.assertEqual(monitor.get_amount_of_reviewed_documents(), 3)
+        self.assertEqual(monitor.get_issue_type_distribution()['counts'],
+                         {'Grammar & Spelling': 3, 'Definitive Language': 1})
+        self.assertEqual(monitor.get_metric('dismissed_per_type'), {'Definitive Language': 1})
+
+    def test_categorical_columns_give_same_metrics(self):
+        monitor = SystemMonitor(self.config_file)
+        monitor.calculate_metrics(self.issues_df)
+        categorical = SystemMonitor(self.config_file)
+        categorical.calculate_metrics(self.issues_df.astype({'doc_id': 'category', 'type': 'category', 'status': 'category'}))
+
+        for metric_name in monitor.metric_names:
+            self.assertEqual(monitor.get_metric(metric_name), categorical.get_metric(metric_name))
+
+    def test_count_combinations_matches_groupby(self):
+        rng = np.random.default_rng(0)
+        # 3 categories per column are counted with bincount, 300 with sorting
+        for categories in (3, 300):
+            df = pd.DataFrame({
+                name: pd.Categorical(rng.choice([f"{name}-{i}" for i in range(categories)] + [None], 2000))
+                for name in ("a", "b", "c")
+            })
+            df["flag"] = rng.random(2000) < 0.5
+
+            counts = count_combinations([df[name] for name in df.columns])
+            expected = df.groupby(list(df.columns), observed=True, dropna=False).size()
+
+            self.assertEqual(counts["count"].sum(), 2000)
+            def without_nan(key):
+                return tuple(None if pd.isna(value) else value for value in key)
+
+            self.assertEqual(
+                {without_nan(row[:-1]): row[-1] for row in counts.itertuples(index=False, name=None)},
+                {without_nan(key): n for key, n in expected.items()}
+            )
+
+    def test_required_columns_include_plugin_columns(self):
+        monitor = SystemMonitor(self.config_file)
+        self.assertEqual(monitor.get_required_columns(), ['status', 'modified_fields', 'doc_id', 'type'])
+
+    def tearDown(self):
+        import os
+        os.remove(self.config_file)
+
 # Run the tests
 if __name__ == '__main__':
     unittest.main()
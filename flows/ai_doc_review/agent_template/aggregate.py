@@ -2,17 +2,20 @@ from promptflow import tool
 import string
 import random
 
-from common.models import AllSingleShotIssues
+from common.models import AllSingleShotIssues, SingleShotIssue
+
+def issue_key(issue: SingleShotIssue) -> tuple:
+    # Issues from different shots are duplicates when they have the same type and source sentence
+    return (issue.type, issue.location.source_sentence)
 
 def generate_random_string(length=6):  
     letters = string.ascii_letters  # Contains both lowercase and uppercase letters  
     return ''.join(random.choice(letters) for _ in range(length))  
 
-# Concat all singleshot reviewer output.  
-@tool  
-def aggregate_single_shots(unparsed_shots: list) -> str:  
-    shots = [AllSingleShotIssues.parse_raw(shot_json) for shot_json in unparsed_shots]
-
+def combine_single_shots(shots: list[AllSingleShotIssues]) -> AllSingleShotIssues:
+    """
+    Combines the issues of all single shots, removing duplicates and adding a comment ID to each issue.
+    """
     # Combine the "issues" arrays  
     combined_issues = []  
     seen = set()  
@@ -23,9 +26,9 @@ def aggregate_single_shots(unparsed_shots: list) -> str:
 
     for i, shot in enumerate(shots):
         for issue in shot.issues:  
-            issue_key = (issue.type, issue.location.source_sentence)  
-            if issue_key not in seen:  
-                seen.add(issue_key)  
+            key = issue_key(issue)
+            if key not in seen:  
+                seen.add(key)  
                 combined_issues.append(issue)  
 
     # Calculate the number of issues after removing duplicates  
@@ -36,8 +39,12 @@ def aggregate_single_shots(unparsed_shots: list) -> str:
     for issue in combined_issues:
         issue.comment_id = generate_random_string()
 
-    # Create a new JSON object with the combined "issues" array  
-    combined_issues = AllSingleShotIssues(issues=combined_issues)  
+    return AllSingleShotIssues(issues=combined_issues)
+
+# Concat all singleshot reviewer output.  
+@tool  
+def aggregate_single_shots(unparsed_shots: list) -> str:  
+    shots = [AllSingleShotIssues.model_validate_json(shot_json) for shot_json in unparsed_shots]
 
-    # Convert the dictionary back to a JSON string  
-    return combined_issues.model_dump_json() 
+    # Convert the combined issues back to a JSON string at the node boundary
+    return combine_single_shots(shots).model_dump_json() 
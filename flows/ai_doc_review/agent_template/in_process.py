@@ -0,0 +1,103 @@
+import copy
+from pathlib import Path
+from functools import lru_cache
+
+import yaml
+from promptflow.connections import AzureOpenAIConnection
+from promptflow.tools.common import render_jinja_template
+
+from common.models import AllSingleShotIssues, AllConsolidatorIssues
+from llm import typed_llm
+from aggregate import combine_single_shots
+from merge import merge_issues
+from usage import collect_llm_usage
+
+
+FLOW_PATH = Path(__file__).parent / "flow.dag.yaml"
+LLM_NODES = ("llm_multishot", "consolidator")
+# Node inputs bound to other nodes or to the flow inputs, which are passed explicitly when running in-process
+BOUND_INPUTS = ("connection", "system_prompt", "user_prompt", "use_cache", "priority")
+
+
+@lru_cache(maxsize=None)
+def _load_flow_nodes() -> dict:
+    with open(FLOW_PATH, encoding="utf-8") as f:
+        return {node["name"]: node for node in yaml.safe_load(f)["nodes"]}
+
+
+def _render_prompt(path: Path, **kwargs) -> str:
+    return render_jinja_template(Path(path).read_text(encoding="utf-8"), **kwargs)
+
+
+@lru_cache(maxsize=None)
+def render_agent_prompts(agent_prompt_path: str, consolidator_prompt_path: str, guidelines_prompt_path: str) -> tuple[str, str]:
+    """
+    Renders the agent and consolidator system prompts of an issue type, once per process.
+
+    The prompts do not depend on the text, so every chunk of every document reviewed by the process gets the same
+    strings, which keeps the static prefix of the LLM requests byte-identical for the prompt prefix cache.
+
+    Returns:
+        The agent prompt and the consolidator prompt.
+    """
+    guidelines = _render_prompt(guidelines_prompt_path)
+    return (
+        _render_prompt(agent_prompt_path, guidelines=guidelines),
+        _render_prompt(consolidator_prompt_path, guidelines=guidelines),
+    )
+
+
+class InProcessAgentFlow:
+    def __init__(self, connection: AzureOpenAIConnection, overrides: dict) -> None:
+        """
+        Runs the agent flow in-process, passing typed objects between the nodes.
+
+        The flow DAG remains the single definition of the node settings: the LLM node inputs are read from
+        flow.dag.yaml and the same overrides as for the promptflow execution are applied. Issues are only
+        serialised where the LLM needs them as a prompt, and the flow output is returned as an
+        `AllCombinedIssues` object instead of a JSON string.
+
+        Args:
+            connection: The Azure OpenAI connection used by the LLM nodes.
+            overrides: The flow overrides, e.g. `nodes.llm_multishot.inputs.number_of_requests`.
+        """
+        nodes = copy.deepcopy(_load_flow_nodes())
+        for key, value in overrides.items():
+            _, node_name, section, name = key.split(".")
+            nodes[node_name][section][name] = value
+
+        self.connection = connection
+        self.node_inputs = {
+            node_name: {name: value for name, value in nodes[node_name]["inputs"].items() if name not in BOUND_INPUTS}
+            for node_name in LLM_NODES
+        }
+
+        self.agent_prompt, self.consolidator_prompt = render_agent_prompts(*(
+            str(FLOW_PATH.parent / nodes[node_name]["source"]["path"])
+            for node_name in ("agent_prompt", "consolidator_prompt", "guidelines_prompt")
+        ))
+
+    def __call__(self, text: str, use_cache: bool = True, priority: int = 0) -> dict:
+        shots = typed_llm(
+            self.connection,
+            system_prompt=self.agent_prompt,
+            user_prompt=text,
+            use_cache=use_cache,
+            priority=priority,
+            **self.node_inputs["llm_multishot"])
+        single_shot_issues = combine_single_shots(
+            [AllSingleShotIssues.model_validate_json(response) for response in shots["responses"]])
+
+        consolidated = typed_llm(
+            self.connection,
+            system_prompt=self.consolidator_prompt,
+            user_prompt=single_shot_issues.model_dump_json(),
+            use_cache=use_cache,
+            priority=priority,
+            **self.node_inputs["consolidator"])
+        consolidator_issues = AllConsolidatorIssues.model_validate_json(consolidated["responses"][0])
+
+        return {
+            "agent_output": merge_issues(single_shot_issues, consolidator_issues),
+            "llm_usage": collect_llm_usage(shots["usage"], consolidated["usage"]),
+        }
@@ -0,0 +1,232 @@
+import os
+import sys
+import time
+import importlib.util
+from pathlib import Path
+from functools import lru_cache
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+
+from promptflow.core import tool
+from promptflow.connections import AzureOpenAIConnection
+from promptflow.contracts.types import FilePath
+from openai import AzureOpenAI
+
+from common.models import LLMUsage
+from llm_cache import cache_key, get_llm_cache
+from llm_scheduler import get_llm_scheduler
+from aggregate import issue_key
+
+
+# Has to be hardcoded because only the new API supports structured JSON API
+API_VERSION = "2024-08-01-preview"
+CHARS_PER_TOKEN = 4
+# Tokens reserved for the completion before the actual usage of a request is known
+LLM_EXPECTED_COMPLETION_TOKENS = int(os.environ.get("LLM_EXPECTED_COMPLETION_TOKENS", 2000))
+
+
+@lru_cache(maxsize=None)
+def _load_response_format(module_path: str, response_type: str) -> type:
+    module_name = Path(module_path).stem
+    spec = importlib.util.spec_from_file_location(module_name, module_path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+
+    if response_type not in module.__dict__:
+        raise ValueError(f"response_type {response_type} not found in {module_path}")
+    return module.__dict__[response_type]
+
+
+def _create_client(connection: AzureOpenAIConnection) -> AzureOpenAI:
+    # Retries are left to the LLM scheduler, which has to see every 429 response
+    if connection.api_key:
+        return AzureOpenAI(api_key=connection.api_key, azure_endpoint=connection.api_base, api_version=API_VERSION,
+                           max_retries=0)
+    return AzureOpenAI(azure_ad_token_provider=connection.get_token, azure_endpoint=connection.api_base,
+                       api_version=API_VERSION, max_retries=0)
+
+
+def _cached_prompt_tokens(usage) -> int:
+    """
+    Returns the prompt tokens served from the prompt prefix cache of Azure OpenAI.
+
+    The pinned SDK does not declare `prompt_tokens_details` yet, so it is read from the extra fields of the usage.
+    """
+    details = getattr(usage, "prompt_tokens_details", None)
+    if isinstance(details, dict):
+        return details.get("cached_tokens") or 0
+    return getattr(details, "cached_tokens", None) or 0
+
+
+def _estimate_tokens(messages: list[dict[str, str]]) -> int:
+    prompt_chars = sum(len(message["content"]) for message in messages)
+    return prompt_chars // CHARS_PER_TOKEN + LLM_EXPECTED_COMPLETION_TOKENS
+
+
+def _do_openai_request(
+    client: AzureOpenAI,
+    deployment_name: str,
+    temperature: float,
+    messages: list[dict[str, str]],
+    response_format: type,
+    priority: int = 0) -> tuple[str, dict]:
+
+    # All requests to the deployment go through the process-wide scheduler, which handles rate limiting and retries
+    scheduler = get_llm_scheduler(deployment_name)
+    estimated_tokens = _estimate_tokens(messages)
+    completion = scheduler.run(
+        lambda: client.beta.chat.completions.parse(
+            model=deployment_name,
+            response_format=response_format,
+            temperature=temperature,
+            messages=messages,
+        ),
+        estimated_tokens=estimated_tokens,
+        priority=priority
+    )
+
+    if completion.choices[0].message.refusal:
+        raise ValueError(f"Completion refused: {completion.choices[0].message.refusal}")
+
+    usage = {
+        "prompt_tokens": completion.usage.prompt_tokens if completion.usage else 0,
+        "completion_tokens": completion.usage.completion_tokens if completion.usage else 0,
+        "cached_prompt_tokens": _cached_prompt_tokens(completion.usage) if completion.usage else 0,
+    }
+    if completion.usage:
+        scheduler.correct_tokens(estimated_tokens, completion.usage.total_tokens)
+    return completion.choices[0].message.content, usage
+
+
+def _count_new_issues(response_format: type, responses: list[str], seen: set) -> tuple[int, int]:
+    """
+    Counts the issues in the responses that are not in the aggregated set yet, and adds them to it.
+
+    Returns:
+        The number of new issues and the total number of issues in the responses.
+    """
+    new_issues, total_issues = 0, 0
+    for response in responses:
+        for issue in response_format.model_validate_json(response).issues:
+            key = issue_key(issue)
+            total_issues += 1
+            if key not in seen:
+                seen.add(key)
+                new_issues += 1
+    return new_issues, total_issues
+
+
+@tool
+def typed_llm(
+    connection: AzureOpenAIConnection,
+    deployment_name: str,
+    module_path: FilePath,
+    response_type: str,
+    temperature: float = 1,
+    system_prompt: Optional[str] = None,
+    user_prompt: Optional[str] = None,
+    assistant_prompt: Optional[str] = None,
+    number_of_requests: int = 1,
+    use_cache: bool = True,
+    min_requests: int = 0,
+    wave_size: int = 1,
+    convergence_threshold: float = 0.1,
+    priority: int = 0,
+    **kwargs) -> dict:
+    """
+    Sends the same prompt to Azure OpenAI `number_of_requests` times and returns the structured JSON responses.
+
+    Responses are served from the persistent LLM cache when an identical request (same prompts, deployment,
+    temperature and shot index) was made before. Set `use_cache` to False to bypass the cache entirely.
+
+    When `min_requests` is set, the node samples adaptively: it sends `min_requests` shots first, then further
+    waves of `wave_size` shots up to `number_of_requests`. After each wave it measures the rate of issues not
+    seen in the previous shots, and stops early once that rate drops to `convergence_threshold` or below.
+
+    The messages are ordered system, user, assistant, so the static system prompt of the agent is a byte-identical
+    prefix of every request and can be served from the prompt prefix cache of Azure OpenAI. The prompt tokens
+    served from that cache are reported as `cached_prompt_tokens`.
+
+    Requests are sent through the process-wide LLM scheduler of the deployment, where lower `priority` values
+    (e.g. chunks near the start of the document) are sent first.
+
+    Returns:
+        A dictionary with the list of JSON `responses` and the `usage` of the node, including the calls and
+        tokens saved by the cache and the wall time of the node.
+    """
+    if not system_prompt and not user_prompt and not assistant_prompt:
+        raise ValueError("At least one of system_prompt, user_prompt, or assistant_prompt must be provided.")
+    start = time.perf_counter()
+    messages = []
+    if system_prompt:
+        messages.append({"role": "system", "content": system_prompt})
+    if user_prompt:
+        messages.append({"role": "user", "content": user_prompt})
+    if assistant_prompt:
+        messages.append({"role": "assistant", "content": assistant_prompt})
+
+    response_format = _load_response_format(str(module_path), response_type)
+
+    cache = get_llm_cache()
+    keys = [
+        cache_key(system_prompt, user_prompt, deployment_name, temperature, shot, response_type, assistant_prompt)
+        for shot in range(number_of_requests)
+    ]
+    usage = LLMUsage(requests=number_of_requests)
+    responses = [None] * number_of_requests
+
+    def request_shots(shots: list[int]) -> None:
+        if use_cache:
+            for shot in shots:
+                entry = cache.get(keys[shot])
+                if entry:
+                    responses[shot] = entry["content"]
+                    usage.cache_hits += 1
+                    usage.saved_prompt_tokens += entry["usage"]["prompt_tokens"]
+                    usage.saved_completion_tokens += entry["usage"]["completion_tokens"]
+
+        missing_shots = [shot for shot in shots if responses[shot] is None]
+        if missing_shots:
+            client = _create_client(connection)
+            # Concurrency is limited by the scheduler, so every shot gets its own thread
+            with ThreadPoolExecutor(max_workers=len(missing_shots)) as pool:
+                results = pool.map(
+                    lambda _: _do_openai_request(client, deployment_name, temperature, messages, response_format, priority),
+                    missing_shots)
+
+                for shot, (content, call_usage) in zip(missing_shots, results):
+                    responses[shot] = content
+                    usage.calls += 1
+                    usage.prompt_tokens += call_usage["prompt_tokens"]
+                    usage.completion_tokens += call_usage["completion_tokens"]
+                    usage.cached_prompt_tokens += call_usage["cached_prompt_tokens"]
+                    if use_cache:
+                        cache.set(keys[shot], content, call_usage)
+
+    if 0 < min_requests < number_of_requests:
+        seen = set()
+        next_shot, wave = 0, max(min_requests, 2)
+        while next_shot < number_of_requests:
+            shots = list(range(next_shot, min(next_shot + wave, number_of_requests)))
+            request_shots(shots)
+
+            if next_shot == 0:
+                # The first shot only seeds the aggregated set
+                _count_new_issues(response_format, responses[:1], seen)
+                shots = shots[1:]
+            new_issues, total_issues = _count_new_issues(response_format, [responses[shot] for shot in shots], seen)
+            next_shot += wave
+            wave = max(wave_size, 1)
+
+            new_issue_rate = new_issues / total_issues if total_issues else 0.0
+            if new_issue_rate <= convergence_threshold:
+                break
+
+        responses = responses[:next_shot]
+        usage.skipped_requests = number_of_requests - len(responses)
+    else:
+        request_shots(list(range(number_of_requests)))
+
+    usage.seconds = time.perf_counter() - start
+    return {"responses": responses, "usage": usage.model_dump()}
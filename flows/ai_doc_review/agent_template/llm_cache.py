@@ -0,0 +1,148 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+
+LLM_CACHE_DIR = os.environ.get("LLM_CACHE_DIR", os.path.join(tempfile.gettempdir(), "ai_doc_review_llm_cache"))
+LLM_CACHE_TTL_SECONDS = int(os.environ.get("LLM_CACHE_TTL_SECONDS", 7 * 24 * 60 * 60))
+LLM_CACHE_MAX_BYTES = int(os.environ.get("LLM_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+
+
+def _sha256(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def cache_key(
+    system_prompt: Optional[str],
+    user_prompt: Optional[str],
+    deployment_name: str,
+    temperature: float,
+    shot_index: int,
+    response_type: str = "",
+    assistant_prompt: Optional[str] = None
+) -> str:
+    """
+    Builds the cache key of a single LLM request.
+
+    The prompts are hashed individually so that the key does not grow with the prompt size. The shot
+    index is part of the key, so the N sampled responses of a multishot request are cached separately.
+    """
+    parts = [
+        _sha256(system_prompt or ""),
+        _sha256(user_prompt or ""),
+        deployment_name,
+        repr(float(temperature)),
+        str(shot_index),
+        response_type,
+        _sha256(assistant_prompt or ""),
+    ]
+    return _sha256("|".join(parts))
+
+
+class DiskLLMCache:
+    def __init__(self, directory: str, ttl_seconds: int = LLM_CACHE_TTL_SECONDS, max_bytes: int = LLM_CACHE_MAX_BYTES) -> None:
+        """
+        A persistent LLM response cache storing one JSON file per cached response.
+
+        Args:
+            directory: The directory holding the cache entries.
+            ttl_seconds: Entries older than this are treated as missing and removed.
+            max_bytes: When the cache grows beyond this size, the least recently used entries are evicted.
+        """
+        self.directory = Path(directory)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size = None
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _entries(self) -> list[Path]:
+        return list(self.directory.glob("*/*.json"))
+
+    def _current_size(self) -> int:
+        if self._size is None:
+            self._size = sum(path.stat().st_size for path in self._entries())
+        return self._size
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Returns the cached entry for the key, or None if it is missing or expired.
+        """
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return None
+
+        if time.time() - entry["created_at"] > self.ttl_seconds:
+            self._remove(path)
+            return None
+
+        # Refresh the modification time so that eviction drops the least recently used entries first
+        os.utime(path)
+        return entry
+
+    def set(self, key: str, content: str, usage: dict) -> None:
+        """
+        Stores an LLM response and the token usage it took to produce it.
+        """
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps({"created_at": time.time(), "content": content, "usage": usage}).encode("utf-8")
+
+        # Write to a temporary file first so that concurrent readers never see a partial entry
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._size = self._current_size() + len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _remove(self, path: Path) -> None:
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except FileNotFoundError:
+            return
+
+        if self._size is not None:
+            self._size -= size
+
+    def _evict(self) -> None:
+        """
+        Removes expired entries, then the least recently used ones until the cache is back to 90% of its size limit.
+        """
+        entries = []
+        for path in self._entries():
+            try:
+                entries.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                continue
+
+        expired_before = time.time() - self.ttl_seconds
+        entries.sort()
+        removed = 0
+        for mtime, path in entries:
+            if mtime >= expired_before and self._size <= self.max_bytes * 0.9:
+                break
+            self._remove(path)
+            removed += 1
+
+        logging.info(f"Evicted {removed} entries from the LLM cache at {self.directory}.")
+
+
+@lru_cache(maxsize=None)
+def get_llm_cache(directory: str = LLM_CACHE_DIR) -> DiskLLMCache:
+    """Returns the process-wide LLM cache for the given directory."""
+    return DiskLLMCache(directory)
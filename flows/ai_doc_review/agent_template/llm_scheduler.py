@@ -0,0 +1,220 @@
+import os
+import time
+import heapq
+import random
+import logging
+import itertools
+import threading
+from typing import Callable, Optional, TypeVar
+
+from openai import APIConnectionError, InternalServerError, RateLimitError
+
+
+LLM_TOKENS_PER_MINUTE = int(os.environ.get("LLM_TOKENS_PER_MINUTE", 150_000))
+LLM_REQUESTS_PER_MINUTE = int(os.environ.get("LLM_REQUESTS_PER_MINUTE", 900))
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", 32))
+LLM_INITIAL_CONCURRENCY = int(os.environ.get("LLM_INITIAL_CONCURRENCY", 8))
+LLM_MAX_RATE_LIMIT_RETRIES = int(os.environ.get("LLM_MAX_RATE_LIMIT_RETRIES", 10))
+LLM_MAX_TRANSIENT_RETRIES = int(os.environ.get("LLM_MAX_TRANSIENT_RETRIES", 3))
+# Azure OpenAI enforces the per-minute limits over short windows, so bursts are limited to this many seconds' worth
+BURST_SECONDS = 10
+
+T = TypeVar("T")
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        A token bucket refilled continuously at `per_minute` units per minute, holding `BURST_SECONDS` worth.
+
+        A non-positive rate disables the bucket.
+        """
+        self.rate = per_minute / 60
+        self.capacity = self.rate * BURST_SECONDS
+        self.level = self.capacity
+        self.clock = clock
+        self.updated_at = clock()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Returns the seconds to wait until `amount` can be consumed (a request larger than the bucket waits for a full bucket)."""
+        if self.rate <= 0:
+            return 0.0
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def consume(self, amount: float, now: float) -> None:
+        """Consumes `amount` units. The level may go negative when correcting an estimate after the fact."""
+        if self.rate <= 0:
+            return
+        self._refill(now)
+        self.level -= amount
+
+
+def get_retry_after(error: RateLimitError) -> Optional[float]:
+    """
+    Returns the delay requested by a 429 response in seconds, preferring the millisecond precision
+    `retry-after-ms` header sent by Azure OpenAI over the whole-second `retry-after` header.
+    """
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+
+    for header, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = response.headers.get(header)
+        if value:
+            try:
+                return float(value) * scale
+            except ValueError:
+                continue
+    return None
+
+
+class LLMScheduler:
+    def __init__(
+        self,
+        tokens_per_minute: int = LLM_TOKENS_PER_MINUTE,
+        requests_per_minute: int = LLM_REQUESTS_PER_MINUTE,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        initial_concurrency: int = LLM_INITIAL_CONCURRENCY,
+        max_retries: int = LLM_MAX_RATE_LIMIT_RETRIES,
+        max_transient_retries: int = LLM_MAX_TRANSIENT_RETRIES,
+        clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        """
+        Schedules the LLM calls of the whole process against one Azure OpenAI deployment.
+
+        Each call waits for a free concurrency slot and for room in the token-per-minute and request-per-minute
+        buckets, in order of priority. A 429 response pauses all calls for the `retry-after` delay and halves the
+        concurrency limit, which then grows back by one slot per limit's worth of successful calls (AIMD).
+
+        The scheduler is the only place calls are retried, so the clients must be created with `max_retries=0`:
+        retries inside a call would hide 429 responses from it.
+
+        Args:
+            tokens_per_minute: The token budget of the deployment, or 0 for no token limit.
+            requests_per_minute: The request budget of the deployment, or 0 for no request limit.
+            max_concurrency: The upper bound of the concurrency limit.
+            initial_concurrency: The concurrency limit to start from.
+            max_retries: The number of times a rate-limited call is retried before the error is raised.
+            max_transient_retries: The number of times a call failing with a connection error, a timeout or a 5xx
+                response is retried, with exponential backoff, before the error is raised.
+        """
+        self.tokens = TokenBucket(tokens_per_minute, clock)
+        self.requests = TokenBucket(requests_per_minute, clock)
+        self.max_concurrency = max_concurrency
+        self.limit = float(max(1, min(initial_concurrency, max_concurrency)))
+        self.max_retries = max_retries
+        self.max_transient_retries = max_transient_retries
+        self.clock = clock
+
+        self.active = 0
+        self.paused_until = 0.0
+        self.decreased_at = float("-inf")
+        self.rate_limited = 0
+        self.completed = 0
+
+        self._condition = threading.Condition()
+        self._waiting: list[tuple[int, int]] = []
+        self._sequence = itertools.count()
+
+    def _acquire(self, estimated_tokens: int, priority: int) -> float:
+        with self._condition:
+            ticket = (priority, next(self._sequence))
+            heapq.heappush(self._waiting, ticket)
+            while True:
+                timeout = None
+                if self._waiting[0] == ticket and self.active < int(self.limit):
+                    now = self.clock()
+                    timeout = max(
+                        self.paused_until - now,
+                        self.requests.wait_time(1, now),
+                        self.tokens.wait_time(estimated_tokens, now)
+                    )
+                    if timeout <= 0:
+                        heapq.heappop(self._waiting)
+                        self.requests.consume(1, now)
+                        self.tokens.consume(estimated_tokens, now)
+                        self.active += 1
+                        # The next ticket in line may be able to start as well
+                        self._condition.notify_all()
+                        return now
+                self._condition.wait(timeout)
+
+    def _release(self, started_at: float, outcome: str, retry_after: Optional[float] = None, attempt: int = 0) -> None:
+        with self._condition:
+            self.active -= 1
+            now = self.clock()
+            if outcome == "rate_limited":
+                self.rate_limited += 1
+                if retry_after is None:
+                    retry_after = min(60.0, 2 ** attempt) * random.uniform(0.5, 1.0)
+                self.paused_until = max(self.paused_until, now + retry_after)
+
+                # Calls started before the last decrease were sent at the old rate, so they do not decrease it again
+                if started_at >= self.decreased_at:
+                    self.limit = max(1.0, self.limit / 2)
+                    self.decreased_at = now
+                    logging.info(f"LLM rate limited, concurrency limit decreased to {int(self.limit)} "
+                                 f"and calls paused for {retry_after:.2f}s.")
+            elif outcome == "completed":
+                self.completed += 1
+                self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    def correct_tokens(self, estimated_tokens: int, used_tokens: int) -> None:
+        """Charges the token bucket with the difference between the estimated and the actual usage of a call."""
+        with self._condition:
+            self.tokens.consume(used_tokens - estimated_tokens, self.clock())
+            self._condition.notify_all()
+
+    def run(self, call: Callable[[], T], estimated_tokens: int, priority: int = 0) -> T:
+        """
+        Runs an LLM call once the rate limits allow it, retrying it when it is rate limited or fails transiently.
+
+        Args:
+            call: The function sending the request.
+            estimated_tokens: The estimated prompt and completion tokens of the request.
+            priority: Lower values run first, e.g. the index of the chunk in the document.
+        """
+        transient_failures = 0
+        for attempt in itertools.count():
+            started_at = self._acquire(estimated_tokens, priority)
+            try:
+                result = call()
+            except RateLimitError as e:
+                self._release(started_at, "rate_limited", get_retry_after(e), attempt)
+                # An exhausted quota does not recover by waiting
+                if getattr(e, "type", None) == "insufficient_quota" or attempt >= self.max_retries:
+                    raise
+                continue
+            except (APIConnectionError, InternalServerError):
+                # Not a sign of the rate limits, so only this call backs off
+                self._release(started_at, "failed")
+                if transient_failures >= self.max_transient_retries:
+                    raise
+                time.sleep(min(60.0, 2 ** transient_failures) * random.uniform(0.5, 1.0))
+                transient_failures += 1
+                continue
+            except BaseException:
+                self._release(started_at, "failed")
+                raise
+
+            self._release(started_at, "completed")
+            return result
+
+
+_schedulers: dict[str, LLMScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_llm_scheduler(deployment_name: str) -> LLMScheduler:
+    """Returns the process-wide LLM scheduler of the deployment."""
+    with _schedulers_lock:
+        if deployment_name not in _schedulers:
+            _schedulers[deployment_name] = LLMScheduler()
+        return _schedulers[deployment_name]
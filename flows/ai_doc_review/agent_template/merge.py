@@ -1,26 +1,36 @@
 from promptflow import tool  
 
 from common.models import AllSingleShotIssues, AllConsolidatorIssues, CombinedIssue, AllCombinedIssues, IssueType
-  
-# The inputs section will change based on the arguments of the tool function, after you save the code  
-# Adding type to arguments and return value will help the system show the types properly  
-# Please update the function name/signature per need  
+
+
+def merge_issues(single_shot_issues: AllSingleShotIssues, consolidator_issues: AllConsolidatorIssues) -> AllCombinedIssues:
+    """
+    Merges the single shot issues with the consolidator fields based on the comment_id.
+
+    The single shot issues are indexed by comment_id, so merging takes linear time in the number of issues.
+    """
+    issues_by_comment_id = {}
+    for issue in single_shot_issues.issues:
+        issues_by_comment_id.setdefault(issue.comment_id, []).append(issue)
+
+    combined_issues = []
+    for consolidator_issue in consolidator_issues.issues:
+        for single_shot_issue in issues_by_comment_id.get(consolidator_issue.comment_id, []):
+            # Both sides have been validated already, so the combined issue is constructed without validating again
+            combined_issue = CombinedIssue.model_construct(**{**dict(consolidator_issue), **dict(single_shot_issue)})
+            # Drop the combined issue if suggested_action from consolidator agent is "REMOVE"
+            # Usually consolidator agent will suggest "REMOVE" action for issues with low score
+            if combined_issue.suggested_action != "REMOVE":
+                combined_issues.append(combined_issue)
+
+    return AllCombinedIssues(issues=combined_issues)
+
+
 @tool  
 def merge_singleshot_fields_with_consolidator(agg_outputs: str, consolidator_outputs: list) -> str:
-    # Validate and load the JSON strings into Python dictionaries  
+    # Validate and load the JSON strings into Python objects
     assert len(consolidator_outputs) == 1
-    left_data = AllConsolidatorIssues.parse_raw(consolidator_outputs[0])
-    right_data = AllSingleShotIssues.parse_raw(agg_outputs)
-    
-    combined_issues = []
-    # Merge the data based on the comment_id  
-    for left_issue in left_data.issues:  
-        for right_issue in right_data.issues:  
-            if left_issue.comment_id == right_issue.comment_id:
-                combined_issue = CombinedIssue(**dict(left_issue, **dict(right_issue)))
-                # Drop the combined issue if suggested_action from consolidator agent is "REMOVE"
-                # Usually consolidator agent will suggest "REMOVE" action for issues with low score
-                if combined_issue.suggested_action != "REMOVE":
-                    combined_issues.append(combined_issue)
-
-    return AllCombinedIssues(issues=combined_issues).model_dump_json()
\ No newline at end of file
+    consolidator_issues = AllConsolidatorIssues.model_validate_json(consolidator_outputs[0])
+    single_shot_issues = AllSingleShotIssues.model_validate_json(agg_outputs)
+
+    return merge_issues(single_shot_issues, consolidator_issues).model_dump_json()
@@ -0,0 +1,12 @@
+from promptflow import tool
+
+from common.models import LLMUsage
+
+
+# Collect the LLM usage of the agent nodes so the main flow can report it per document
+@tool
+def collect_llm_usage(llm_multishot_usage: dict, consolidator_usage: dict) -> dict:
+    return {
+        "llm_multishot": LLMUsage(**llm_multishot_usage).model_dump(),
+        "consolidator": LLMUsage(**consolidator_usage).model_dump(),
+    }
@@ -0,0 +1,237 @@
+import os
+import time
+import queue
+import asyncio
+import logging
+import itertools
+import threading
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Generator, Iterable, Optional, TypeVar
+
+from common.models import AllCombinedIssues, LLMUsage, ReviewTimings
+from layout import DocumentLayout
+from text import TextChunk, analyze_document, analyze_document_in_ranges, get_text_chunks, order_chunks_by_focus
+from flows import setup_flows
+from process import run_flow, add_llm_usage, log_llm_usage, log_review_timings, prepare_incremental_review
+from post_processing import PostProcessor
+
+
+# Maximum number of agent flow runs in flight at once; the LLM calls they make are paced by the LLM scheduler
+MAX_CONCURRENT_FLOW_RUNS = int(os.environ.get("MAX_CONCURRENT_FLOW_RUNS", 8))
+
+T = TypeVar("T")
+
+
+async def stream_issues(
+    pdf_name: str,
+    pagination: int,
+    tokens_per_chunk: int = 0,
+    use_llm_cache: bool = True,
+    llm_usage: Optional[dict[str, LLMUsage]] = None,
+    previous_pdf_name: str = "",
+    previous_issues: str = "",
+    adaptive_multishot: bool = False,
+    in_process_agents: bool = False,
+    focus_page: int = 0,
+    di_pages_per_range: int = 0,
+    start_chunk: int = 0,
+    timings: Optional[ReviewTimings] = None,
+    completed_chunks: Optional[Iterable[int]] = None
+) -> AsyncIterator[AllCombinedIssues]:
+    """
+    Reviews the document and yields the issues of each (chunk, issue type) pair as soon as they are ready.
+
+    Document Intelligence, the agent flows and the bounding box resolution run as asyncio tasks on a thread
+    pool, so a slow agent does not hold back the results of the other agents or of later chunks. Flow runs
+    are started in chunk order, or starting from the chunks overlapping `focus_page` and spreading outwards
+    when it is set. Each result is tagged with the page range of its chunk. When the iteration is stopped,
+    the pending tasks are cancelled.
+
+    When `di_pages_per_range` is set, the document is analysed in page ranges of that many pages concurrently,
+    and the chunks of each page range are reviewed as soon as it is analysed, in page range order.
+
+    Each result carries the index of its chunk in the document, and the last result of a chunk is marked as
+    completing it. An interrupted review resumes by passing the first chunk it did not complete as `start_chunk`
+    and the later chunks it completed as `completed_chunks`: those chunks, and the issues carried over in
+    incremental mode unless `start_chunk` is 0, are not reviewed or returned again.
+
+    The LLM usage of each agent node is added to `llm_usage`, and the time spent in Document Intelligence and in
+    post-processing to `timings`, which has the total time of the review once the iteration completes.
+    """
+    start = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_FLOW_RUNS + 4)
+    post_processor = PostProcessor()
+    llm_usage = llm_usage if llm_usage is not None else {}
+    timings = timings if timings is not None else ReviewTimings()
+    # Completed review tasks (or futures), in order of completion
+    results: asyncio.Queue[asyncio.Future] = asyncio.Queue()
+    changed_indices = None
+    completed_chunks = set(completed_chunks or [])
+
+    def run(function: Callable[..., T], *args, **kwargs) -> "asyncio.Future[T]":
+        return loop.run_in_executor(executor, partial(function, *args, **kwargs))
+
+    async def analyses() -> AsyncIterator[tuple[DocumentLayout, Optional[Iterable[int]]]]:
+        """Yields the analysis result and the indices of the paragraphs to review, once or per page range."""
+        nonlocal changed_indices
+        if previous_pdf_name:
+            # Incremental mode: only review the paragraphs that changed since the previous version
+            analysis_start = time.perf_counter()
+            previous_layout, layout = await asyncio.gather(
+                run(analyze_document, previous_pdf_name), run(analyze_document, pdf_name))
+            timings.document_intelligence += time.perf_counter() - analysis_start
+            paragraph_indices, changed_indices, carried_over_issues = await run(
+                prepare_incremental_review, previous_layout, layout, previous_issues)
+            if carried_over_issues and start_chunk == 0:
+                carried_over = loop.create_future()
+                carried_over.set_result(AllCombinedIssues(issues=carried_over_issues))
+                results.put_nowait(carried_over)
+            yield layout, paragraph_indices
+        elif di_pages_per_range > 0:
+            page_ranges = analyze_document_in_ranges(pdf_name, di_pages_per_range)
+            try:
+                while True:
+                    analysis_start = time.perf_counter()
+                    page_range = await run(next, page_ranges, None)
+                    timings.document_intelligence += time.perf_counter() - analysis_start
+                    if page_range is None:
+                        break
+                    yield page_range
+            finally:
+                try:
+                    page_ranges.close()
+                except ValueError:
+                    # Cancelled while the next page range is awaited; the thread pool stops with the generator
+                    pass
+        else:
+            analysis_start = time.perf_counter()
+            layout = await run(analyze_document, pdf_name)
+            timings.document_intelligence += time.perf_counter() - analysis_start
+            yield layout, None
+
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_FLOW_RUNS)
+
+    # Number of agents still reviewing each chunk, by chunk index
+    pending_reviews: dict[int, int] = {}
+
+    async def review(
+        layout: DocumentLayout,
+        text_chunk: TextChunk,
+        chunk_index: int,
+        priority: int,
+        flow: tuple
+    ) -> AllCombinedIssues:
+        # The semaphore wakes up waiting tasks in order, so the chunks are started in processing order
+        async with semaphore:
+            issue_type, agent_results = await run(
+                run_flow, flow, text=text_chunk.text, use_cache=use_llm_cache, priority=priority)
+        add_llm_usage(llm_usage, agent_results["llm_usage"])
+        post_processing_start = time.perf_counter()
+        issues = await run(post_processor, issue_type, agent_results["agent_output"], layout, changed_indices)
+        timings.post_processing += time.perf_counter() - post_processing_start
+        pending_reviews[chunk_index] -= 1
+        return AllCombinedIssues(issues=issues, first_page=text_chunk.first_page, last_page=text_chunk.last_page,
+                                 chunk_index=chunk_index, chunk_complete=pending_reviews[chunk_index] == 0)
+
+    tasks = []
+
+    async def schedule() -> None:
+        flows = await flows_future
+        # The position in the processing order is the priority in the LLM scheduler
+        priorities = itertools.count()
+        # The chunks of each page range follow the chunks of the previous ranges in the document
+        first_chunk_index = 0
+        async for layout, paragraph_indices in analyses():
+            text_chunks = list(get_text_chunks(layout, paragraphs_per_chunk=pagination,
+                                               tokens_per_chunk=tokens_per_chunk, paragraph_indices=paragraph_indices))
+            chunk_offset, first_chunk_index = first_chunk_index, first_chunk_index + len(text_chunks)
+            text_chunks = [
+                chunk for chunk in text_chunks
+                if chunk_offset + chunk.index >= start_chunk and chunk_offset + chunk.index not in completed_chunks
+            ]
+            if focus_page > 0:
+                text_chunks = order_chunks_by_focus(text_chunks, focus_page)
+
+            for text_chunk in text_chunks:
+                priority = next(priorities)
+                chunk_index = chunk_offset + text_chunk.index
+                pending_reviews[chunk_index] = len(flows)
+                for flow in flows.items():
+                    task = asyncio.create_task(review(layout, text_chunk, chunk_index, priority, flow))
+                    task.add_done_callback(results.put_nowait)
+                    tasks.append(task)
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    flows_future = run(setup_flows, adaptive_multishot, in_process_agents)
+    scheduler = asyncio.create_task(schedule())
+    # The scheduler completes after all the reviews, so it marks the end of the results
+    scheduler.add_done_callback(results.put_nowait)
+    try:
+        while (result := await results.get()) is not scheduler:
+            yield result.result()
+        scheduler.result()
+
+        timings.total = time.perf_counter() - start
+        log_llm_usage(pdf_name, llm_usage)
+        log_review_timings(pdf_name, timings, llm_usage)
+    finally:
+        scheduler.cancel()
+        for task in tasks:
+            task.cancel()
+        # Flow runs already started finish in the background, but their results are dropped
+        executor.shutdown(wait=False, cancel_futures=True)
+        post_processor.close()
+
+
+def iterate_in_background(async_iterable: AsyncIterator[T]) -> Generator[T, None, None]:
+    """
+    Consumes an async iterator on an event loop in a background thread, and yields its items synchronously.
+
+    When the generator is closed before the end (e.g. the client stops consuming the stream), the async
+    iterator is cancelled.
+    """
+    items = queue.Queue()
+    done = object()
+    loop = asyncio.new_event_loop()
+
+    async def produce() -> None:
+        try:
+            async for item in async_iterable:
+                items.put((item, None))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            items.put((None, e))
+        finally:
+            items.put((done, None))
+
+    task = loop.create_task(produce())
+
+    def run_loop() -> None:
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            logging.info("Review cancelled because the stream was closed.")
+        finally:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
+
+    thread = threading.Thread(target=run_loop, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = items.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        try:
+            loop.call_soon_threadsafe(task.cancel)
+        except RuntimeError:
+            # The loop has finished already
+            pass
+        thread.join()
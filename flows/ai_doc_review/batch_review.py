@@ -0,0 +1,204 @@
+"""
+Reviews many documents in one process, e.g. for a nightly job, instead of sending them one by one to the endpoint.
+
+The documents share the budgets of the process: Document Intelligence requests are limited by
+`DOCUMENT_INTELLIGENCE_MAX_CONCURRENCY` and LLM calls are paced by the LLM scheduler of each deployment, while up
+to `--concurrent-documents` documents are reviewed at once.
+
+The issues of each document are written to `<output-dir>/<pdf name>.ndjson`, one issue per line. A document's file
+is only put in place once the document is fully reviewed, and each finished document is recorded in
+`<output-dir>/checkpoint.ndjson`, so an interrupted batch resumes with the documents that were not completed.
+At the end, a throughput report is written to `<output-dir>/report.json`.
+
+Usage:
+    python flows/ai_doc_review/batch_review.py --documents documents.txt --output-dir batch_results
+"""
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+from pathlib import Path
+from statistics import median
+from urllib.parse import quote
+from typing import Any, Iterable, Optional
+
+if __name__ == "__main__":
+    # The flow modules use flat imports, as they do when promptflow runs the flow
+    sys.path[:0] = [str(Path(__file__).parent), str(Path(__file__).parents[2])]
+
+from common.models import LLMUsage, ReviewTimings
+from async_engine import stream_issues
+from process import add_llm_usage
+
+if __name__ == "__main__":
+    import flows
+
+    # The models module is an additional include of the flow when it is deployed
+    flows.MODELS_MODULE_PATH = Path(__file__).parents[2] / "common" / "models.py"
+
+
+CHECKPOINT_FILE = "checkpoint.ndjson"
+REPORT_FILE = "report.json"
+
+
+class BatchCheckpoint:
+    def __init__(self, path: Path) -> None:
+        """
+        The record of the documents finished by a batch, appended to as each document finishes.
+
+        Only completed documents are skipped when the batch is resumed; failed documents are retried.
+        """
+        self.path = path
+        self.completed: dict[str, dict] = {}
+        if path.exists():
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        if entry["status"] == "completed":
+                            self.completed[entry["pdf_name"]] = entry
+
+    def record(self, entry: dict) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+        if entry["status"] == "completed":
+            self.completed[entry["pdf_name"]] = entry
+
+
+def get_output_path(output_dir: Path, pdf_name: str) -> Path:
+    return output_dir / f"{quote(pdf_name, safe='')}.ndjson"
+
+
+async def review_document(pdf_name: str, output_dir: Path, options: dict) -> dict:
+    """Reviews one document, writing its issues to its NDJSON file, and returns its checkpoint entry."""
+    output_path = get_output_path(output_dir, pdf_name)
+    partial_path = output_path.with_suffix(".ndjson.partial")
+    llm_usage: dict[str, LLMUsage] = {}
+    timings = ReviewTimings()
+    start = time.perf_counter()
+    issues = 0
+
+    try:
+        with open(partial_path, "w", encoding="utf-8") as f:
+            async for output in stream_issues(pdf_name, llm_usage=llm_usage, timings=timings, **options):
+                for issue in output.issues:
+                    f.write(issue.model_dump_json() + "\n")
+                issues += len(output.issues)
+        partial_path.replace(output_path)
+    except Exception as e:
+        logging.exception(f"Review of {pdf_name} failed.")
+        partial_path.unlink(missing_ok=True)
+        return {"pdf_name": pdf_name, "status": "failed", "error": str(e), "seconds": round(time.perf_counter() - start, 1)}
+
+    return {
+        "pdf_name": pdf_name,
+        "status": "completed",
+        "issues": issues,
+        "seconds": round(time.perf_counter() - start, 1),
+        "llm_usage": {node: usage.model_dump() for node, usage in llm_usage.items()},
+        "timings": timings.model_dump(),
+    }
+
+
+def create_report(entries: list[dict], skipped: int, wall_seconds: float) -> dict:
+    completed = [entry for entry in entries if entry["status"] == "completed"]
+    llm_usage: dict[str, LLMUsage] = {}
+    for entry in completed:
+        add_llm_usage(llm_usage, entry["llm_usage"])
+
+    document_seconds = [entry["seconds"] for entry in completed]
+    return {
+        "documents": len(entries) + skipped,
+        "completed": len(completed),
+        "failed": len(entries) - len(completed),
+        "skipped": skipped,
+        "issues": sum(entry["issues"] for entry in completed),
+        "wall_seconds": round(wall_seconds, 1),
+        "documents_per_hour": round(len(completed) / wall_seconds * 3600, 1) if wall_seconds > 0 else 0.0,
+        "median_document_seconds": median(document_seconds) if document_seconds else 0.0,
+        "max_document_seconds": max(document_seconds, default=0.0),
+        "llm_usage": {node: usage.model_dump() for node, usage in llm_usage.items()},
+    }
+
+
+async def review_documents(
+    pdf_names: Iterable[str],
+    output_dir: Path,
+    concurrent_documents: int = 4,
+    **options: Any
+) -> dict:
+    """
+    Reviews the documents not completed by a previous run of the batch, and returns the throughput report.
+
+    Args:
+        pdf_names: The names of the PDFs in storage.
+        output_dir: The directory of the NDJSON files, the checkpoint and the report.
+        concurrent_documents: The number of documents reviewed at once.
+        options: The review options passed to `stream_issues`, e.g. `pagination`.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    checkpoint = BatchCheckpoint(output_dir / CHECKPOINT_FILE)
+    pdf_names = list(dict.fromkeys(pdf_names))
+    pending = [pdf_name for pdf_name in pdf_names if pdf_name not in checkpoint.completed]
+    skipped = len(pdf_names) - len(pending)
+    logging.info(f"Reviewing {len(pending)} documents, {skipped} already completed.")
+
+    semaphore = asyncio.Semaphore(concurrent_documents)
+    entries = []
+
+    async def review(pdf_name: str) -> None:
+        async with semaphore:
+            entry = await review_document(pdf_name, output_dir, options)
+        checkpoint.record(entry)
+        entries.append(entry)
+        logging.info(f"{pdf_name}: {entry['status']} in {entry['seconds']}s ({len(entries)}/{len(pending)}).")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(review(pdf_name) for pdf_name in pending))
+    report = create_report(entries, skipped, time.perf_counter() - start)
+
+    (output_dir / REPORT_FILE).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return report
+
+
+def read_documents(path: Optional[str], names: list[str]) -> list[str]:
+    pdf_names = list(names)
+    if path:
+        with open(path, encoding="utf-8") as f:
+            pdf_names.extend(line.strip() for line in f if line.strip())
+    return pdf_names
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf_names", nargs="*", help="Names of the PDFs in storage")
+    parser.add_argument("--documents", help="File with the name of a PDF in storage per line")
+    parser.add_argument("--output-dir", required=True)
+    parser.add_argument("--concurrent-documents", type=int, default=4)
+    parser.add_argument("--pagination", type=int, default=16)
+    parser.add_argument("--tokens-per-chunk", type=int, default=0)
+    parser.add_argument("--di-pages-per-range", type=int, default=0)
+    parser.add_argument("--adaptive-multishot", action="store_true")
+    parser.add_argument("--in-process-agents", action="store_true")
+    parser.add_argument("--no-llm-cache", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    report = asyncio.run(review_documents(
+        read_documents(args.documents, args.pdf_names),
+        Path(args.output_dir),
+        concurrent_documents=args.concurrent_documents,
+        pagination=args.pagination,
+        tokens_per_chunk=args.tokens_per_chunk,
+        di_pages_per_range=args.di_pages_per_range,
+        adaptive_multishot=args.adaptive_multishot,
+        in_process_agents=args.in_process_agents,
+        use_llm_cache=not args.no_llm_cache,
+    ))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import os
+import sys
 from pathlib import Path
 
 from promptflow.client import load_flow
@@ -25,26 +26,55 @@ AGENT_PROMPTS = {
     }
 }
 
+# Adaptive multishot settings: the agent samples at least `min_requests` and at most `number_of_requests`
+# shots, and stops once the rate of new issues per wave drops to `convergence_threshold`
+AGENT_SAMPLING = {
+    IssueType.GrammarSpelling: {
+        "min_requests": 2,
+        "number_of_requests": 5,
+        "wave_size": 1,
+        "convergence_threshold": 0.1,
+    },
+    IssueType.DefinitiveLanguage: {
+        "min_requests": 2,
+        "number_of_requests": 5,
+        "wave_size": 1,
+        "convergence_threshold": 0.1,
+    }
+}
+
+
+def create_flow(agent_prompt_path, consolidator_prompt_path, guidelines_prompt_path, connection, sampling=None, in_process=False):
+    overrides = {
+        "nodes.agent_prompt.source.path": str(agent_prompt_path),
+        "nodes.consolidator_prompt.source.path": str(consolidator_prompt_path),
+        "nodes.guidelines_prompt.source.path": str(guidelines_prompt_path),
+        "nodes.llm_multishot.inputs.module_path": str(MODELS_MODULE_PATH),
+        "nodes.consolidator.inputs.module_path": str(MODELS_MODULE_PATH),
+    }
+    for name, value in (sampling or {}).items():
+        overrides[f"nodes.llm_multishot.inputs.{name}"] = value
+
+    if in_process:
+        # The agent template modules use flat imports, as they do when promptflow runs the template flow
+        if str(TEMPLATE_FLOW_PATH) not in sys.path:
+            sys.path.append(str(TEMPLATE_FLOW_PATH))
+        from in_process import InProcessAgentFlow
+
+        return InProcessAgentFlow(connection, overrides)
 
-def create_flow(agent_prompt_path, consolidator_prompt_path, guidelines_prompt_path, connection):
     flow = load_flow(TEMPLATE_FLOW_PATH)
     flow.context = FlowContext(
         connections={
             "llm_multishot": {"connection": connection},
             "consolidator": {"connection": connection},
         },
-        overrides={
-            "nodes.agent_prompt.source.path": str(agent_prompt_path),
-            "nodes.consolidator_prompt.source.path": str(consolidator_prompt_path),
-            "nodes.guidelines_prompt.source.path": str(guidelines_prompt_path),
-            "nodes.llm_multishot.inputs.module_path": str(MODELS_MODULE_PATH),
-            "nodes.consolidator.inputs.module_path": str(MODELS_MODULE_PATH),
-        }
+        overrides=overrides
     )
     return flow
 
 
-def setup_flows():
+def setup_flows(adaptive_multishot: bool = False, in_process: bool = False):
     connection = AzureOpenAIConnection(
         name="connection",
         auth_mode="meid_token",  # use Entra
@@ -57,6 +87,8 @@ def setup_flows():
             consolidator_prompt_path=AGENT_PROMPTS[issue_type]["consolidator"],
             guidelines_prompt_path=AGENT_PROMPTS[issue_type]["guidelines"],
             connection=connection,
+            sampling=AGENT_SAMPLING.get(issue_type) if adaptive_multishot else None,
+            in_process=in_process,
         )
         for issue_type in AGENT_PROMPTS
     }
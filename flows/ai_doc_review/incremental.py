@@ -0,0 +1,122 @@
+import json
+import logging
+from difflib import SequenceMatcher
+
+from bounding_box import add_bounding_box
+from layout import DocumentLayout
+from common.models import CombinedIssue
+
+
+# Number of unchanged paragraphs sent on each side of a changed paragraph, so the agents see it in context
+CONTEXT_PARAGRAPHS = 1
+
+# Issues stored by the API do not keep the consolidator fields, so carried over issues fall back to these
+CARRIED_OVER_DEFAULTS = {
+    "comment_id": "",
+    "score": 0,
+    "suggested_action": "KEEP",
+    "reason_for_suggested_action": "Carried over from the previous document version.",
+}
+
+
+class IncrementalReviewPlan:
+    def __init__(self, paragraph_map: dict[int, int], changed_indices: list[int], review_indices: list[int]) -> None:
+        """
+        The result of diffing a new document version against the previous one.
+
+        Args:
+            paragraph_map: Maps the index of each unchanged paragraph in the previous version to its index in the new one.
+            changed_indices: Indices of the new or changed paragraphs in the new version.
+            review_indices: Indices of the paragraphs to send to the agents (changed paragraphs plus their context).
+        """
+        self.paragraph_map = paragraph_map
+        self.changed_indices = changed_indices
+        self.review_indices = review_indices
+
+
+def _normalize(content: str) -> str:
+    return " ".join(content.split())
+
+
+def map_unchanged_paragraphs(previous_paragraphs: list[str], paragraphs: list[str]) -> dict[int, int]:
+    """
+    Diffs two lists of paragraph contents and maps each unchanged previous paragraph to its new index.
+    """
+    matcher = SequenceMatcher(
+        None,
+        [_normalize(paragraph) for paragraph in previous_paragraphs],
+        [_normalize(paragraph) for paragraph in paragraphs],
+        autojunk=False
+    )
+
+    paragraph_map = {}
+    for tag, i1, i2, j1, _ in matcher.get_opcodes():
+        if tag == "equal":
+            for offset in range(i2 - i1):
+                paragraph_map[i1 + offset] = j1 + offset
+    return paragraph_map
+
+
+def plan_incremental_review(previous_layout: DocumentLayout, layout: DocumentLayout, context: int = CONTEXT_PARAGRAPHS) -> IncrementalReviewPlan:
+    """
+    Works out which paragraphs of the new document version have to be reviewed again.
+
+    Args:
+        previous_layout: The layout of the previous document version.
+        layout: The layout of the new document version.
+        context: The number of unchanged paragraphs to include around each changed paragraph.
+    """
+    paragraph_map = map_unchanged_paragraphs(
+        [paragraph.content for paragraph in previous_layout.paragraphs],
+        [paragraph.content for paragraph in layout.paragraphs]
+    )
+
+    paragraph_count = len(layout.paragraphs)
+    unchanged = set(paragraph_map.values())
+    changed_indices = [i for i in range(paragraph_count) if i not in unchanged]
+    review_indices = sorted({
+        j
+        for i in changed_indices
+        for j in range(max(0, i - context), min(paragraph_count, i + context + 1))
+    })
+
+    logging.info(f"Incremental review: {len(changed_indices)} of {paragraph_count} paragraphs changed, "
+                 f"reviewing {len(review_indices)} paragraphs including context.")
+    return IncrementalReviewPlan(paragraph_map, changed_indices, review_indices)
+
+
+def carry_over_issues(previous_issues: str, plan: IncrementalReviewPlan, layout: DocumentLayout) -> list[CombinedIssue]:
+    """
+    Carries over the issues of the previous document version whose paragraph is unchanged.
+
+    The paragraph index is remapped to the new version, and the page number and bounding box are
+    recalculated against the layout of the new version.
+
+    Args:
+        previous_issues: JSON object with the list of `issues` of the previous version, either from a
+            previous flow run or as stored by the API.
+        plan: The incremental review plan.
+        layout: The layout of the new document version.
+    """
+    carried_over = []
+    for item in json.loads(previous_issues)["issues"]:
+        if not item.get("location"):
+            continue
+
+        new_index = plan.paragraph_map.get(item["location"]["para_index"])
+        if new_index is None:
+            # The paragraph has changed, so its issues are found again by the agents
+            continue
+
+        issue = CombinedIssue.model_validate({**CARRIED_OVER_DEFAULTS, **item})
+        issue.location.para_index = new_index
+        issue.location.bounding_box = []
+        try:
+            issue = add_bounding_box(layout, issue)
+        except Exception as e:
+            logging.exception(e)
+            logging.error(f"Unable to add bounding box to carried over issue. Unexpected error occurred: {issue}")
+        carried_over.append(issue)
+
+    logging.info(f"Carried over {len(carried_over)} issues from the previous document version.")
+    return carried_over
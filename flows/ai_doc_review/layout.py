@@ -0,0 +1,160 @@
+import io
+import json
+from typing import Optional
+
+import numpy as np
+from azure.ai.formrecognizer import AnalyzeResult
+
+
+class LayoutParagraph:
+    __slots__ = ("content", "page_number", "offset")
+
+    def __init__(self, content: str, page_number: int, offset: int) -> None:
+        """
+        A paragraph of the document layout.
+
+        Args:
+            content: The paragraph text.
+            page_number: The number of the page the paragraph starts on, or 0 if unknown.
+            offset: The offset of the paragraph in the document content.
+        """
+        self.content = content
+        self.page_number = page_number
+        self.offset = offset
+
+
+class LayoutPage:
+    __slots__ = ("page_number", "height", "word_offsets", "word_polygons")
+
+    def __init__(self, page_number: int, height: float, word_offsets: np.ndarray, word_polygons: np.ndarray) -> None:
+        """
+        A page of the document layout.
+
+        Args:
+            page_number: The page number, starting at 1.
+            height: The page height in inches.
+            word_offsets: The offsets of the words in the document content, in reading order.
+            word_polygons: The word polygons in inches, as an array of shape (words, 4, 2).
+        """
+        self.page_number = page_number
+        self.height = height
+        self.word_offsets = word_offsets
+        self.word_polygons = word_polygons
+
+
+class DocumentLayout:
+    def __init__(
+        self,
+        paragraphs: Optional[list[LayoutParagraph]] = None,
+        pages: Optional[list[LayoutPage]] = None,
+        content_length: int = 0
+    ) -> None:
+        """
+        The parts of the Document Intelligence analysis result used by the review.
+
+        The flow only needs the paragraph contents, pages and offsets to chunk the text, and the word offsets and
+        polygons and the page heights to add bounding boxes. Keeping these in slotted records and NumPy arrays
+        instead of the `AnalyzeResult` object graph (tables, key-value pairs, styles and a `DocumentWord` with
+        `Point` objects per word) keeps the memory use of large documents low.
+
+        Args:
+            paragraphs: The paragraphs, in document order.
+            pages: The pages, in page order.
+            content_length: The length of the document content the offsets refer to.
+        """
+        self.paragraphs = paragraphs if paragraphs is not None else []
+        self.pages = pages if pages is not None else []
+        self.content_length = content_length
+
+    @classmethod
+    def from_analyze_result(cls, di_result: AnalyzeResult) -> "DocumentLayout":
+        paragraphs = [
+            LayoutParagraph(
+                paragraph.content,
+                paragraph.bounding_regions[0].page_number if paragraph.bounding_regions else 0,
+                paragraph.spans[0].offset if paragraph.spans else -1
+            )
+            for paragraph in di_result.paragraphs or []
+        ]
+
+        pages = []
+        for page in di_result.pages or []:
+            words = page.words or []
+            word_polygons = np.array(
+                [[(point.x, point.y) for point in word.polygon[:4]] for word in words], dtype=np.float64
+            ).reshape(len(words), 4, 2)
+            word_offsets = np.array([word.span.offset for word in words], dtype=np.int64)
+            pages.append(LayoutPage(page.page_number, page.height, word_offsets, word_polygons))
+
+        return cls(paragraphs, pages, len(di_result.content or ""))
+
+    def page(self, page_number: int) -> LayoutPage:
+        # Paragraphs without a bounding region have page number 0, which must not wrap around to the last page
+        if not 1 <= page_number <= len(self.pages):
+            raise IndexError(f"Page {page_number} is not in the layout.")
+        return self.pages[page_number - 1]
+
+    def extend(self, part: "DocumentLayout", first_page: int) -> range:
+        """
+        Appends the layout of the following page range, analysed separately.
+
+        The page numbers of the part are shifted to start at `first_page`, and its offsets are shifted past the
+        content of this layout, so page numbers, paragraph indices and offsets stay continuous.
+
+        Returns:
+            The indices of the paragraphs added to this layout.
+        """
+        offset = self.content_length + 1 if self.content_length else 0
+        page_shift = first_page - part.pages[0].page_number if part.pages else 0
+
+        for page in part.pages:
+            page.page_number += page_shift
+            page.word_offsets += offset
+        for paragraph in part.paragraphs:
+            if paragraph.page_number:
+                paragraph.page_number += page_shift
+            paragraph.offset += offset
+
+        self.content_length = offset + part.content_length
+        self.pages.extend(part.pages)
+        first_paragraph = len(self.paragraphs)
+        self.paragraphs.extend(part.paragraphs)
+        return range(first_paragraph, len(self.paragraphs))
+
+    def to_bytes(self) -> bytes:
+        """Serialises the layout, e.g. to cache it alongside the document."""
+        counts = np.array([len(page.word_offsets) for page in self.pages], dtype=np.int64)
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            paragraph_contents=np.frombuffer(
+                json.dumps([paragraph.content for paragraph in self.paragraphs]).encode("utf-8"), dtype=np.uint8),
+            paragraph_pages=np.array([paragraph.page_number for paragraph in self.paragraphs], dtype=np.int64),
+            paragraph_offsets=np.array([paragraph.offset for paragraph in self.paragraphs], dtype=np.int64),
+            page_numbers=np.array([page.page_number for page in self.pages], dtype=np.int64),
+            page_heights=np.array([page.height for page in self.pages], dtype=np.float64),
+            word_counts=counts,
+            content_length=np.array(self.content_length, dtype=np.int64),
+            word_offsets=np.concatenate([page.word_offsets for page in self.pages] or [np.empty(0, np.int64)]),
+            word_polygons=np.concatenate([page.word_polygons for page in self.pages] or [np.empty((0, 4, 2))]),
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "DocumentLayout":
+        arrays = np.load(io.BytesIO(data))
+        contents = json.loads(arrays["paragraph_contents"].tobytes().decode("utf-8"))
+        paragraphs = [
+            LayoutParagraph(content, int(page_number), int(offset))
+            for content, page_number, offset in zip(contents, arrays["paragraph_pages"], arrays["paragraph_offsets"])
+        ]
+
+        # Pages keep views of the concatenated word arrays
+        bounds = np.cumsum(arrays["word_counts"])[:-1]
+        pages = [
+            LayoutPage(int(page_number), float(height), word_offsets, word_polygons)
+            for page_number, height, word_offsets, word_polygons in zip(
+                arrays["page_numbers"], arrays["page_heights"],
+                np.split(arrays["word_offsets"], bounds), np.split(arrays["word_polygons"], bounds))
+        ]
+        return cls(paragraphs, pages, int(arrays["content_length"]))
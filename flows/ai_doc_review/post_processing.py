@@ -0,0 +1,170 @@
+import os
+import atexit
+import logging
+import tempfile
+import threading
+import multiprocessing
+from pathlib import Path
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Optional
+
+from bounding_box import add_bounding_box
+from common.models import AllCombinedIssues, CombinedIssue, IssueType
+from layout import DocumentLayout
+
+
+# Number of worker processes for the post-processing of the agent outputs, or 0 to post-process on the calling thread
+POST_PROCESSING_PROCESSES = int(os.environ.get("POST_PROCESSING_PROCESSES", 0))
+# Number of document layouts kept in memory by each worker process
+WORKER_LAYOUT_CACHE_SIZE = 4
+
+
+def process_agent_output(
+    issue_type: IssueType,
+    agent_output: Any,
+    layout: DocumentLayout,
+    changed_indices: Optional[set[int]] = None
+) -> list[CombinedIssue]:
+    """
+    Parses the output of an agent flow run, and adds the issue type and bounding box to each issue.
+
+    Args:
+        issue_type: The issue type of the agent.
+        agent_output: The agent output, either as JSON or as an `AllCombinedIssues` object.
+        layout: The layout of the document.
+        changed_indices: In incremental mode, only the issues in these paragraphs are kept.
+    """
+    output = agent_output
+    if isinstance(output, str):
+        output = AllCombinedIssues.model_validate_json(output)
+
+    if changed_indices is not None:
+        # Issues in the unchanged context paragraphs have been carried over already
+        output.issues = [issue for issue in output.issues if issue.location.para_index in changed_indices]
+
+    # Add type and bounding box to each issue
+    for issue in output.issues:
+        issue.type = issue_type
+        try:
+            issue = add_bounding_box(layout, issue)
+        except Exception as e:
+            logging.exception(e)
+            logging.error(f"Unable to add bounding box to issue. Unexpected error occurred: {issue}")
+
+    return output.issues
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_post_processing_pool(processes: int) -> ProcessPoolExecutor:
+    """Returns the process-wide post-processing pool, shared by the documents reviewed by the endpoint."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Forking a process with running threads can deadlock the child, so the workers are spawned
+            _pool = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn"))
+            atexit.register(shutdown_post_processing_pool)
+        return _pool
+
+
+def shutdown_post_processing_pool() -> None:
+    """Stops the worker processes, e.g. before a child process exits, where exit handlers do not run."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+
+_worker_layouts: "OrderedDict[str, DocumentLayout]" = OrderedDict()
+
+
+def _load_layout(path: str) -> DocumentLayout:
+    if path not in _worker_layouts:
+        if len(_worker_layouts) >= WORKER_LAYOUT_CACHE_SIZE:
+            _worker_layouts.popitem(last=False)
+        _worker_layouts[path] = DocumentLayout.from_bytes(Path(path).read_bytes())
+    _worker_layouts.move_to_end(path)
+    return _worker_layouts[path]
+
+
+def _process_agent_output_in_worker(
+    layout_path: str,
+    issue_type: IssueType,
+    agent_output: Any,
+    changed_indices: Optional[set[int]]
+) -> list[CombinedIssue]:
+    return process_agent_output(issue_type, agent_output, _load_layout(layout_path), changed_indices)
+
+
+class PostProcessor:
+    def __init__(self, processes: int = POST_PROCESSING_PROCESSES) -> None:
+        """
+        Post-processes the agent outputs of one document: parsing, filtering and adding bounding boxes.
+
+        This work is CPU bound, so when `processes` is positive it runs in a pool of worker processes instead of
+        competing for the GIL with the threads waiting on the LLM. The layout is not sent with every task: it is
+        written to a temporary file once per document (and again when it grows, e.g. as page ranges are
+        analysed), and each worker loads it once.
+        """
+        self.pool = get_post_processing_pool(processes) if processes > 0 else None
+        self._lock = threading.Lock()
+        self._layout_paths: list[str] = []
+        self._layout_version: Optional[tuple[int, int]] = None
+
+    def _layout_path(self, layout: DocumentLayout) -> str:
+        version = (id(layout), len(layout.paragraphs))
+        with self._lock:
+            if version != self._layout_version:
+                fd, path = tempfile.mkstemp(prefix="layout_", suffix=".npz")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(layout.to_bytes())
+                # Earlier versions are kept until the document is done, as tasks may still be reading them
+                self._layout_paths.append(path)
+                self._layout_version = version
+            return self._layout_paths[-1]
+
+    def submit(
+        self,
+        issue_type: IssueType,
+        agent_output: Any,
+        layout: DocumentLayout,
+        changed_indices: Optional[set[int]] = None
+    ) -> "Future[list[CombinedIssue]]":
+        if self.pool is not None:
+            return self.pool.submit(
+                _process_agent_output_in_worker, self._layout_path(layout), issue_type, agent_output, changed_indices)
+
+        future = Future()
+        try:
+            future.set_result(process_agent_output(issue_type, agent_output, layout, changed_indices))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def __call__(
+        self,
+        issue_type: IssueType,
+        agent_output: Any,
+        layout: DocumentLayout,
+        changed_indices: Optional[set[int]] = None
+    ) -> list[CombinedIssue]:
+        return self.submit(issue_type, agent_output, layout, changed_indices).result()
+
+    def close(self) -> None:
+        for path in self._layout_paths:
+            try:
+                os.remove(path)
+            except OSError:
+                logging.warning(f"Unable to remove the layout file {path}.")
+        self._layout_paths = []
+        self._layout_version = None
+
+    def __enter__(self) -> "PostProcessor":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
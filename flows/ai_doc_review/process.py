@@ -1,49 +1,151 @@
 from promptflow.core import tool
 from concurrent.futures import ThreadPoolExecutor as Pool
-from typing import Callable, Generator, Any
+from typing import Callable, Generator, Any, Optional
 from functools import partial
 from typing import Tuple
 import logging
+import time
 
-from bounding_box import add_bounding_box
-from common.models import AllCombinedIssues, IssueType
+from layout import DocumentLayout
+from common.models import AllCombinedIssues, CombinedIssue, IssueType, LLMUsage, ReviewTimings
+from post_processing import PostProcessor
 from text import analyze_document, get_text_chunks
 from flows import setup_flows
+from incremental import plan_incremental_review, carry_over_issues
 
 
-def run_flow(flow: Tuple[IssueType, Callable], text: str) -> Tuple[IssueType, Any]:
+def run_flow(flow: Tuple[IssueType, Callable], text: str, use_cache: bool = True, priority: int = 0) -> Tuple[IssueType, Any]:
     issue_type, flow_function = flow
-    return issue_type, flow_function(text=text)
+    return issue_type, flow_function(text=text, use_cache=use_cache, priority=priority)
 
 
-def get_issues_from_text_chunks(pdf_name: str, pagination: int) -> Generator[Any, Any, Any]:
-    flows = setup_flows()
-    di_result = analyze_document(pdf_name)
-    with Pool() as pool:
-        for text_chunk in get_text_chunks(di_result, paragraphs_per_chunk=pagination):
-            agent_flow_results = pool.map(partial(run_flow, text=text_chunk), flows.items())
+def add_llm_usage(total_usage: dict[str, LLMUsage], usage: dict) -> None:
+    """
+    Adds the LLM usage reported by an agent flow run to the per-node totals.
+    """
+    for node, node_usage in usage.items():
+        node_total = total_usage.setdefault(node, LLMUsage())
+        for field, value in node_usage.items():
+            setattr(node_total, field, getattr(node_total, field) + value)
+
+
+def log_llm_usage(pdf_name: str, total_usage: dict[str, LLMUsage]) -> None:
+    calls = sum(usage.calls for usage in total_usage.values())
+    cache_hits = sum(usage.cache_hits for usage in total_usage.values())
+    skipped_requests = sum(usage.skipped_requests for usage in total_usage.values())
+    saved_tokens = sum(usage.saved_prompt_tokens + usage.saved_completion_tokens for usage in total_usage.values())
+    prompt_tokens = sum(usage.prompt_tokens for usage in total_usage.values())
+    cached_prompt_tokens = sum(usage.cached_prompt_tokens for usage in total_usage.values())
+    logging.info(f"LLM usage for {pdf_name}: {calls} calls made, {cache_hits} calls and {saved_tokens} tokens saved by the cache, "
+                 f"{skipped_requests} calls skipped by early stopping, {cached_prompt_tokens} of {prompt_tokens} prompt tokens "
+                 f"served from the prompt prefix cache.")
+
+
+def log_review_timings(pdf_name: str, timings: ReviewTimings, total_usage: dict[str, LLMUsage]) -> None:
+    llm_seconds = ", ".join(f"{node} {usage.seconds:.1f}s" for node, usage in total_usage.items())
+    logging.info(f"Review timings for {pdf_name}: {timings.total:.1f}s in total, Document Intelligence "
+                 f"{timings.document_intelligence:.1f}s, post-processing {timings.post_processing:.1f}s, "
+                 f"LLM nodes {llm_seconds or 'none'}.")
+
+
+def prepare_incremental_review(
+    previous_layout: DocumentLayout,
+    layout: DocumentLayout,
+    previous_issues: str = ""
+) -> Tuple[list[int], set[int], list[CombinedIssue]]:
+    """
+    Plans the review of a new document version against the previous one.
+
+    Returns:
+        The indices of the paragraphs to review, the indices of the changed paragraphs, and the issues
+        carried over from the previous version.
+    """
+    plan = plan_incremental_review(previous_layout, layout)
+    carried_over_issues = carry_over_issues(previous_issues, plan, layout) if previous_issues else []
+    return plan.review_indices, set(plan.changed_indices), carried_over_issues
+
+
+def get_issues_from_text_chunks(
+    pdf_name: str,
+    pagination: int,
+    tokens_per_chunk: int = 0,
+    use_llm_cache: bool = True,
+    llm_usage: Optional[dict[str, LLMUsage]] = None,
+    previous_pdf_name: str = "",
+    previous_issues: str = "",
+    adaptive_multishot: bool = False,
+    in_process_agents: bool = False,
+    timings: Optional[ReviewTimings] = None
+) -> Generator[Any, Any, Any]:
+    start = time.perf_counter()
+    flows = setup_flows(adaptive_multishot, in_process_agents)
+    llm_usage = llm_usage if llm_usage is not None else {}
+    timings = timings if timings is not None else ReviewTimings()
+    with Pool() as pool, PostProcessor() as post_processor:
+        paragraph_indices = None
+        changed_indices = None
+        analysis_start = time.perf_counter()
+        if previous_pdf_name:
+            # Incremental mode: only review the paragraphs that changed since the previous version
+            previous_layout = pool.submit(analyze_document, previous_pdf_name)
+            layout = analyze_document(pdf_name)
+            previous_layout = previous_layout.result()
+            timings.document_intelligence += time.perf_counter() - analysis_start
+            paragraph_indices, changed_indices, carried_over_issues = prepare_incremental_review(
+                previous_layout, layout, previous_issues)
+            if carried_over_issues:
+                yield carried_over_issues
+        else:
+            layout = analyze_document(pdf_name)
+            timings.document_intelligence += time.perf_counter() - analysis_start
+
+        text_chunks = get_text_chunks(layout, paragraphs_per_chunk=pagination, tokens_per_chunk=tokens_per_chunk,
+                                      paragraph_indices=paragraph_indices)
+        for text_chunk in text_chunks:
+            # Chunks near the head of the stream get priority in the LLM scheduler
+            agent_flow_results = pool.map(partial(run_flow, text=text_chunk.text, use_cache=use_llm_cache,
+                                                  priority=text_chunk.index),
+                                          flows.items())
 
             # Process batches of agent results
+            post_processed = []
             for issue_type, agent_results in agent_flow_results:
-                output = AllCombinedIssues.model_validate_json(agent_results["agent_output"])
-    
-                # Add type and bounding box to each issue
-                for issue in output.issues:
-                    issue.type = issue_type
-                    try:
-                        issue = add_bounding_box(di_result, issue)
-                    except Exception as e:
-                        logging.exception(e)
-                        logging.error(f"Unable to add bounding box to issue. Unexpected error occurred", str(issue))
+                add_llm_usage(llm_usage, agent_results["llm_usage"])
+                post_processing_start = time.perf_counter()
+                post_processed.append(post_processor.submit(
+                    issue_type, agent_results["agent_output"], layout, changed_indices))
+                timings.post_processing += time.perf_counter() - post_processing_start
+
+            for issues in post_processed:
+                post_processing_start = time.perf_counter()
+                issues = issues.result()
+                timings.post_processing += time.perf_counter() - post_processing_start
+                yield issues
 
-                yield output.issues
+    timings.total = time.perf_counter() - start
+    log_llm_usage(pdf_name, llm_usage)
+    log_review_timings(pdf_name, timings, llm_usage)
 
 
 @tool
-def process(pdf_name: str) -> str:
+def process(
+    pdf_name: str,
+    tokens_per_chunk: int = 0,
+    use_llm_cache: bool = True,
+    previous_pdf_name: str = "",
+    previous_issues: str = "",
+    adaptive_multishot: bool = False,
+    in_process_agents: bool = False
+) -> str:
     all_issues = []
-    for issues in get_issues_from_text_chunks(pdf_name, pagination=64):
+    llm_usage = {}
+    timings = ReviewTimings()
+    for issues in get_issues_from_text_chunks(pdf_name, pagination=64, tokens_per_chunk=tokens_per_chunk,
+                                              use_llm_cache=use_llm_cache, llm_usage=llm_usage,
+                                              previous_pdf_name=previous_pdf_name, previous_issues=previous_issues,
+                                              adaptive_multishot=adaptive_multishot, in_process_agents=in_process_agents,
+                                              timings=timings):
         all_issues.extend(issues) 
 
-    # Return all issues for this chunk of text
-    return AllCombinedIssues(issues=all_issues).model_dump_json()
\ No newline at end of file
+    # Return all issues for this chunk of text, with the LLM usage and timings the evaluation flow aggregates
+    return AllCombinedIssues(issues=all_issues, llm_usage=llm_usage, timings=timings).model_dump_json()
\ No newline at end of file
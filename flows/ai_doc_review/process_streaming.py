@@ -1,15 +1,30 @@
 from promptflow.core import tool
-from typing import Callable, Generator, Any
+from typing import Generator, Any, Optional
 
-from common.models import AllCombinedIssues
-from process import get_issues_from_text_chunks
-
-
-def run_flow(flow: Callable, text: str):
-    return flow(text=text)
+from async_engine import stream_issues, iterate_in_background
 
 
 @tool
-def process(pdf_name: str, pagination: int) -> Generator[Any, Any, Any]:
-    for issues in get_issues_from_text_chunks(pdf_name, pagination):
-        yield AllCombinedIssues(issues=issues).model_dump_json()
\ No newline at end of file
+def process(
+    pdf_name: str,
+    pagination: int,
+    tokens_per_chunk: int = 0,
+    use_llm_cache: bool = True,
+    previous_pdf_name: str = "",
+    previous_issues: str = "",
+    adaptive_multishot: bool = False,
+    in_process_agents: bool = False,
+    focus_page: int = 0,
+    di_pages_per_range: int = 0,
+    start_chunk: int = 0,
+    completed_chunks: Optional[list] = None
+) -> Generator[Any, Any, Any]:
+    # Issues are streamed per chunk and issue type in completion order, tagged with the index and page range of
+    # the chunk, so an interrupted review can be resumed from `start_chunk`, skipping the `completed_chunks`
+    issues_stream = stream_issues(pdf_name, pagination, tokens_per_chunk, use_llm_cache,
+                                  previous_pdf_name=previous_pdf_name, previous_issues=previous_issues,
+                                  adaptive_multishot=adaptive_multishot, in_process_agents=in_process_agents,
+                                  focus_page=focus_page, di_pages_per_range=di_pages_per_range,
+                                  start_chunk=start_chunk, completed_chunks=completed_chunks)
+    for output in iterate_in_background(issues_stream):
+        yield output.model_dump_json()
@@ -1,37 +1,272 @@
 import os
-from typing import Generator, Any
+import math
+import logging
+import threading
+from statistics import mean, median
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Generator, Any, Iterable, Optional, Tuple
 from more_itertools import batched
 
+import fitz
+import httpx
 from azure.identity import DefaultAzureCredential
-from azure.ai.formrecognizer import DocumentAnalysisClient, AnalyzeResult
+from azure.ai.formrecognizer import DocumentAnalysisClient
+
+from layout import DocumentLayout
 
 
 DOCUMENT_INTELLIGENCE_MODEL = "prebuilt-document"
 PARAGRAPHS_PER_CHUNK = 16
+CHARS_PER_TOKEN = 4
 DOCUMENT_INTELLIGENCE_ENDPOINT = os.environ.get("DOCUMENT_INTELLIGENCE_ENDPOINT")
 STORAGE_URL_PREFIX = os.environ.get("STORAGE_URL_PREFIX")
+# Maximum number of page ranges analysed by Document Intelligence at once
+MAX_CONCURRENT_PAGE_RANGES = int(os.environ.get("MAX_CONCURRENT_PAGE_RANGES", 4))
+# Maximum number of Document Intelligence requests in flight in the process, shared by all documents
+DOCUMENT_INTELLIGENCE_MAX_CONCURRENCY = int(os.environ.get("DOCUMENT_INTELLIGENCE_MAX_CONCURRENCY", 15))
+STORAGE_SCOPE = "https://storage.azure.com/.default"
+STORAGE_API_VERSION = "2021-08-06"
+
+TokenEstimator = Callable[[str], int]
+
+_document_intelligence_slots = threading.BoundedSemaphore(DOCUMENT_INTELLIGENCE_MAX_CONCURRENCY)
 
 
-def analyze_document(pdf_name: str) -> AnalyzeResult:
+def analyze_document(pdf_name: str) -> DocumentLayout:
     credential = DefaultAzureCredential()
     document_analysis_client = DocumentAnalysisClient(
         endpoint=DOCUMENT_INTELLIGENCE_ENDPOINT, credential=credential
     )
 
     pdf_url = f"{STORAGE_URL_PREFIX}/{pdf_name}"
-    poller = document_analysis_client.begin_analyze_document_from_url(
-        model_id=DOCUMENT_INTELLIGENCE_MODEL, 
-        document_url=pdf_url
+    with _document_intelligence_slots:
+        poller = document_analysis_client.begin_analyze_document_from_url(
+            model_id=DOCUMENT_INTELLIGENCE_MODEL,
+            document_url=pdf_url
+        )
+        di_result = poller.result()
+
+    # Only the compact layout is kept for the review
+    return DocumentLayout.from_analyze_result(di_result)
+
+
+def download_pdf(pdf_name: str) -> bytes:
+    credential = DefaultAzureCredential()
+    token = credential.get_token(STORAGE_SCOPE).token
+
+    response = httpx.get(
+        f"{STORAGE_URL_PREFIX}/{pdf_name}",
+        headers={"Authorization": f"Bearer {token}", "x-ms-version": STORAGE_API_VERSION}
     )
+    response.raise_for_status()
+    return response.content
+
+
+def split_pdf(pdf_bytes: bytes, pages_per_range: int) -> list[Tuple[int, bytes]]:
+    """
+    Splits a PDF into smaller PDFs of `pages_per_range` pages.
+
+    Returns:
+        The number of the first page and the PDF bytes of each page range.
+    """
+    document = fitz.open(stream=pdf_bytes, filetype="pdf")
+    page_ranges = []
+    for start in range(0, document.page_count, pages_per_range):
+        part = fitz.open()
+        part.insert_pdf(document, from_page=start, to_page=min(start + pages_per_range, document.page_count) - 1)
+        page_ranges.append((start + 1, part.tobytes()))
+    return page_ranges
+
+
+def analyze_document_in_ranges(
+    pdf_name: str,
+    pages_per_range: int,
+    client: Optional[DocumentAnalysisClient] = None,
+    pdf_bytes: Optional[bytes] = None
+) -> Generator[Tuple[DocumentLayout, range], Any, Any]:
+    """
+    Analyses the document in page ranges concurrently, and stitches their layouts together in page order.
+
+    Yields as soon as the next page range in order has been analysed, so the review can start before the
+    whole document is analysed.
+
+    Args:
+        pdf_name: The name of the PDF in storage.
+        pages_per_range: The number of pages analysed in one Document Intelligence request.
+        client: The Document Intelligence client, created from the environment when not provided.
+        pdf_bytes: The PDF, downloaded from storage when not provided.
+
+    Yields:
+        The stitched layout so far, and the indices of the paragraphs added by the latest page range.
+    """
+    if client is None:
+        client = DocumentAnalysisClient(endpoint=DOCUMENT_INTELLIGENCE_ENDPOINT, credential=DefaultAzureCredential())
+    if pdf_bytes is None:
+        pdf_bytes = download_pdf(pdf_name)
+
+    page_ranges = split_pdf(pdf_bytes, pages_per_range)
+    logging.info(f"Analysing {pdf_name} in {len(page_ranges)} page ranges of {pages_per_range} pages.")
+
+    def analyze(document: bytes) -> DocumentLayout:
+        with _document_intelligence_slots:
+            di_result = client.begin_analyze_document(model_id=DOCUMENT_INTELLIGENCE_MODEL, document=document).result()
+        return DocumentLayout.from_analyze_result(di_result)
+
+    layout = DocumentLayout()
+    pool = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_PAGE_RANGES)
+    try:
+        results = [pool.submit(analyze, document) for _, document in page_ranges]
+        for (first_page, _), result in zip(page_ranges, results):
+            yield layout, layout.extend(result.result(), first_page)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimates the number of tokens in the text without calling a tokenizer.
+
+    Uses the common rule of thumb of ~4 characters per token for English text, which is
+    accurate enough for sizing chunks and costs nothing to compute.
+    """
+    return max(1, math.ceil(len(text) / CHARS_PER_TOKEN))
 
-    return poller.result()
 
+class ChunkStats:
+    def __init__(self) -> None:
+        """Collects the size of each text chunk produced for a document."""
+        self.paragraph_counts: list[int] = []
+        self.token_counts: list[int] = []
 
-def get_text_chunks(di_result: AnalyzeResult, paragraphs_per_chunk: int = PARAGRAPHS_PER_CHUNK) -> Generator[Any, Any, Any]:
-    if paragraphs_per_chunk == -1:
-        yield "\n".join([paragraph.content for paragraph in di_result.paragraphs])
+    def add(self, paragraph_count: int, token_count: int) -> None:
+        """Records the size of a single chunk."""
+        self.paragraph_counts.append(paragraph_count)
+        self.token_counts.append(token_count)
+
+    def summary(self) -> dict:
+        """
+        Returns the chunk-size statistics for the document.
+
+        Returns:
+            A dictionary with the number of chunks and paragraphs, and the min/median/mean/max
+            estimated token count per chunk.
+        """
+        if not self.token_counts:
+            return {"chunks": 0, "paragraphs": 0}
+
+        return {
+            "chunks": len(self.token_counts),
+            "paragraphs": sum(self.paragraph_counts),
+            "min_tokens": min(self.token_counts),
+            "median_tokens": median(self.token_counts),
+            "mean_tokens": round(mean(self.token_counts), 1),
+            "max_tokens": max(self.token_counts),
+        }
+
+
+def _batch_by_token_budget(lines: list[str], tokens_per_chunk: int, estimate: TokenEstimator) -> Generator[list[str], Any, Any]:
+    """
+    Packs whole lines into batches whose estimated size stays within the token budget.
+
+    A line is never split, so a single line larger than the budget forms a batch of its own.
+    """
+    batch, batch_tokens = [], 0
+    for line in lines:
+        # +1 accounts for the newline joining the lines of a chunk
+        line_tokens = estimate(line) + 1
+        if batch and batch_tokens + line_tokens > tokens_per_chunk:
+            yield batch
+            batch, batch_tokens = [], 0
+
+        batch.append(line)
+        batch_tokens += line_tokens
+
+    if batch:
+        yield batch
+
+
+class TextChunk:
+    def __init__(self, text: str, index: int, first_page: int, last_page: int) -> None:
+        """
+        A chunk of document text sent to the agents.
+
+        Args:
+            text: The chunk text.
+            index: The position of the chunk in the document.
+            first_page: The page number of the first paragraph in the chunk.
+            last_page: The page number of the last paragraph in the chunk.
+        """
+        self.text = text
+        self.index = index
+        self.first_page = first_page
+        self.last_page = last_page
+
+    def page_distance(self, page: int) -> int:
+        """Returns the number of pages between the chunk and the given page, or 0 if the chunk overlaps the page."""
+        if page < self.first_page:
+            return self.first_page - page
+        return max(0, page - self.last_page)
+
+
+def get_text_chunks(
+    layout: DocumentLayout,
+    paragraphs_per_chunk: int = PARAGRAPHS_PER_CHUNK,
+    tokens_per_chunk: int = 0,
+    estimate: TokenEstimator = estimate_tokens,
+    stats: Optional[ChunkStats] = None,
+    paragraph_indices: Optional[Iterable[int]] = None
+) -> Generator[TextChunk, Any, Any]:
+    """
+    Splits the document paragraphs into text chunks for the agents.
+
+    Each paragraph is prefixed with its index in the document (`[i]`) so that issues can be traced
+    back to the source paragraph.
+
+    Args:
+        layout: The document layout.
+        paragraphs_per_chunk: The number of paragraphs per chunk, or -1 to process the whole document at once.
+        tokens_per_chunk: When positive, paragraphs are packed into chunks of up to this many estimated tokens
+            instead of a fixed number of paragraphs.
+        estimate: The token estimator used for sizing chunks.
+        stats: Optional collector for the chunk-size statistics.
+        paragraph_indices: Optional subset of paragraphs to chunk (e.g. the changed paragraphs of a new document
+            version). Paragraphs keep their index in the whole document.
+    """
+    stats = stats if stats is not None else ChunkStats()
+    if paragraph_indices is None:
+        paragraph_indices = range(len(layout.paragraphs))
+    paragraphs = [(i, layout.paragraphs[i]) for i in paragraph_indices]
+    if not paragraphs:
+        return
+
+    if paragraphs_per_chunk == -1 and tokens_per_chunk <= 0:
+        text = "\n".join([paragraph.content for _, paragraph in paragraphs])
+        stats.add(len(paragraphs), estimate(text))
+        pages = [paragraph.page_number for _, paragraph in paragraphs]
+        yield TextChunk(text, 0, min(pages), max(pages))
     else:
-        for item in map(
-            lambda batch: "\n".join(batch),
-            batched([f"[{i}]{paragraph.content}" for i, paragraph in enumerate(di_result.paragraphs)], paragraphs_per_chunk)):
-            yield item
\ No newline at end of file
+        lines = [f"[{i}]{paragraph.content}" for i, paragraph in paragraphs]
+        if tokens_per_chunk > 0:
+            batches = _batch_by_token_budget(lines, tokens_per_chunk, estimate)
+        else:
+            batches = batched(lines, paragraphs_per_chunk)
+
+        start = 0
+        for index, batch in enumerate(batches):
+            text = "\n".join(batch)
+            stats.add(len(batch), estimate(text))
+            pages = [paragraph.page_number for _, paragraph in paragraphs[start:start + len(batch)]]
+            start += len(batch)
+            yield TextChunk(text, index, min(pages), max(pages))
+
+    logging.info(f"Text chunk statistics: {stats.summary()}")
+
+
+def order_chunks_by_focus(chunks: Iterable[TextChunk], focus_page: int) -> list[TextChunk]:
+    """
+    Orders the chunks so that the ones overlapping the focus page come first, then spreads outwards.
+
+    At the same distance from the focus page, the chunk after the page comes before the chunk before it,
+    following the reading direction.
+    """
+    return sorted(chunks, key=lambda chunk: (chunk.page_distance(focus_page), chunk.last_page < focus_page, chunk.index))
@@ -13,5 +13,13 @@ def aggregate(processed_results: List[dict]) -> dict:
     """  
     # Initialize a dictionary to store aggregated results  
     aggregated_results = MetricsCalculator.calculate_metrics_from_multiple_results(processed_results)
+    # Bootstrap confidence intervals of precision and recall, to tell a prompt change from the noise of the golden set
+    aggregated_results.update(MetricsCalculator.calculate_confidence_intervals_from_multiple_results(processed_results))
+    # Record the LLM calls saved by the cache and adaptive multishot next to precision and recall
+    aggregated_results.update(MetricsCalculator.calculate_llm_usage_from_multiple_results(processed_results))
+    # Record the latency and cost percentiles of the documents, so they are compared across prompt changes too
+    aggregated_results.update(MetricsCalculator.calculate_performance_from_multiple_results(processed_results))
+    # Record how many documents reused their association from the evaluation cache
+    aggregated_results.update(MetricsCalculator.calculate_cache_usage_from_multiple_results(processed_results))
 
     return aggregated_results
\ No newline at end of file
@@ -1,30 +1,12 @@
 from promptflow import tool
-from eval.src.issue_associator import IssueAssociator
-from eval.src.metric_calculator import MetricsCalculator
+from eval.src.batch_evaluator import evaluate_document
+from eval.src.evaluation_cache import EVALUATION_CACHE_DIR, EvaluationCache
 
-@tool 
-def evaluate_issues(gt_json: dict, llm_output: dict) -> dict:
-    agent_issues = llm_output['issues']  
-    ground_truth_issues = gt_json['issues']   
-    
-    associator = IssueAssociator(detected_issues=agent_issues,
-                                 ground_truth_issues=ground_truth_issues,
-                                 threshold=0.8)
-    
-    associator.associate_issues()
-
-    calculator = MetricsCalculator(associator)
+# Reuses the associations of the documents whose output did not change since a previous evaluation run, when the
+# EVALUATION_CACHE_DIR environment variable is set
+cache = EvaluationCache(EVALUATION_CACHE_DIR) if EVALUATION_CACHE_DIR else None
 
-    tp = calculator.calculate_true_positives_per_type()
-    fn = calculator.calculate_false_negatives_per_type()
-    fp = calculator.calculate_false_positives_per_type()
-    
-    result = {
-            "tp": tp,
-            "fp": fp,
-            "fn": fn,
-            "true_positive_cases": associator.get_associations(),
-            "false_positive_cases": associator.get_unassociated_model_output(),
-            "false_negative_cases": associator.get_unassociated_ground_truth()
-        }
-    return result
+@tool
+def evaluate_issues(gt_json: dict, llm_output: dict) -> dict:
+    # Shared with the batch evaluator, which evaluates golden sets outside promptflow
+    return evaluate_document(gt_json, llm_output, threshold=0.8, cache=cache)
@@ -0,0 +1,129 @@
+"""
+Micro-benchmark of the hand-off between the agent template nodes.
+
+Compares, for a chunk with a given number of issues:
+- json: the promptflow node path, where aggregate and merge exchange JSON strings and the main flow parses
+  the agent output again
+- nested_loop_merge: the json path with the previous O(n*m) merge on comment_id
+- typed: the in-process path, where the nodes exchange typed objects and the consolidator prompt is the
+  only serialisation
+
+Usage:
+    python flows/benchmarks/agent_handoff.py --issues 500 --shots 5 --repeat 20
+"""
+import io
+import sys
+import json
+import random
+import argparse
+import statistics
+import contextlib
+from pathlib import Path
+from timeit import default_timer as timer
+
+ROOT_PATH = Path(__file__).parents[2]
+sys.path[:0] = [str(ROOT_PATH), str(ROOT_PATH / "flows" / "ai_doc_review" / "agent_template")]
+
+from common.models import AllSingleShotIssues, AllConsolidatorIssues, AllCombinedIssues, CombinedIssue  # noqa: E402
+from aggregate import aggregate_single_shots, combine_single_shots  # noqa: E402
+from merge import merge_issues, merge_singleshot_fields_with_consolidator  # noqa: E402
+
+
+def make_shots(issue_count: int, shot_count: int) -> list[str]:
+    """Creates the JSON responses of the single shots, each finding most of the chunk's issues."""
+    rng = random.Random(0)
+    issues = [
+        {
+            "type": "Grammar & Spelling",
+            "location": {"source_sentence": f"[{i}] Sentence number {i} with an error.", "page_num": 0,
+                         "bounding_box": [], "para_index": i},
+            "text": "error",
+            "explanation": "The word is misspelled.",
+            "suggested_fix": "Fix the spelling.",
+            "comment_id": "",
+        }
+        for i in range(issue_count)
+    ]
+    return [json.dumps({"issues": [issue for issue in issues if rng.random() < 0.9]}) for _ in range(shot_count)]
+
+
+def make_consolidator_response(aggregated: str) -> str:
+    """Creates the consolidator response scoring each aggregated issue."""
+    return json.dumps({"issues": [
+        {"comment_id": issue["comment_id"], "score": i % 5, "suggested_action": "REMOVE" if i % 5 == 0 else "KEEP",
+         "reason_for_suggested_action": "Scored by the benchmark."}
+        for i, issue in enumerate(json.loads(aggregated)["issues"])
+    ]})
+
+
+def nested_loop_merge(agg_outputs: str, consolidator_outputs: list) -> str:
+    left_data = AllConsolidatorIssues.model_validate_json(consolidator_outputs[0])
+    right_data = AllSingleShotIssues.model_validate_json(agg_outputs)
+
+    combined_issues = []
+    for left_issue in left_data.issues:
+        for right_issue in right_data.issues:
+            if left_issue.comment_id == right_issue.comment_id:
+                combined_issue = CombinedIssue(**dict(left_issue, **dict(right_issue)))
+                if combined_issue.suggested_action != "REMOVE":
+                    combined_issues.append(combined_issue)
+    return AllCombinedIssues(issues=combined_issues).model_dump_json()
+
+
+def run_json(shots: list[str], consolidate, merge=merge_singleshot_fields_with_consolidator) -> AllCombinedIssues:
+    aggregated = aggregate_single_shots(shots)
+    merged = merge(aggregated, [consolidate(aggregated)])
+    return AllCombinedIssues.model_validate_json(merged)
+
+
+def run_typed(shots: list[str], consolidate) -> AllCombinedIssues:
+    single_shot_issues = combine_single_shots([AllSingleShotIssues.model_validate_json(shot) for shot in shots])
+    consolidator_response = consolidate(single_shot_issues.model_dump_json())
+    return merge_issues(single_shot_issues, AllConsolidatorIssues.model_validate_json(consolidator_response))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--issues", type=int, default=500, help="Number of distinct issues in the chunk")
+    parser.add_argument("--shots", type=int, default=5, help="Number of single shots")
+    parser.add_argument("--repeat", type=int, default=20, help="Number of timed runs per mode")
+    args = parser.parse_args()
+
+    shots = make_shots(args.issues, args.shots)
+    # Comment IDs are random, so the random generator is seeded before each run to get the same IDs.
+    # The consolidator response stands for the LLM call and is prepared outside of the timed code.
+    random.seed(0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        consolidator_response = make_consolidator_response(aggregate_single_shots(shots))
+
+    def consolidate(_: str) -> str:
+        return consolidator_response
+
+    modes = {
+        "json": lambda: run_json(shots, consolidate),
+        "nested_loop_merge": lambda: run_json(shots, consolidate, merge=nested_loop_merge),
+        "typed": lambda: run_typed(shots, consolidate),
+    }
+
+    results = {}
+    outputs = {}
+    for mode, run in modes.items():
+        timings = []
+        for _ in range(args.repeat):
+            random.seed(0)
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = timer()
+                outputs[mode] = run()
+                timings.append(timer() - start)
+        results[mode] = {
+            "issues": len(outputs[mode].issues),
+            "median_ms": round(statistics.median(timings) * 1000, 2),
+            "min_ms": round(min(timings) * 1000, 2),
+        }
+
+    assert len({output.model_dump_json() for output in outputs.values()}) == 1, "The modes produced different issues"
+    print(json.dumps(results, indent=4))
+
+
+if __name__ == "__main__":
+    main()
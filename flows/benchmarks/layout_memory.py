@@ -0,0 +1,58 @@
+"""
+Benchmark of the memory used by the document layout, compared to the Document Intelligence result it is built from.
+
+A `--pages` page document is analysed with the local stand-in client, and the memory allocated by the
+`AnalyzeResult` and by the `DocumentLayout` built from it is measured with tracemalloc. The stand-in result only
+has paragraphs and words, so a real result, which also has lines, tables, key-value pairs and styles, is larger.
+
+Usage:
+    python flows/benchmarks/layout_memory.py --pages 1000
+"""
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+from pathlib import Path
+
+ROOT_PATH = Path(__file__).parents[2]
+sys.path[:0] = [str(ROOT_PATH), str(ROOT_PATH / "flows" / "ai_doc_review")]
+
+from layout import DocumentLayout  # noqa: E402
+from local_document_intelligence import analyze_pdf, create_pdf  # noqa: E402
+
+
+def measure(build) -> tuple[object, int]:
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--paragraphs-per-page", type=int, default=8)
+    args = parser.parse_args()
+
+    pdf_bytes = create_pdf(args.pages, args.paragraphs_per_page)
+    di_result, di_result_bytes = measure(lambda: analyze_pdf(pdf_bytes))
+
+    start = time.perf_counter()
+    layout, layout_bytes = measure(lambda: DocumentLayout.from_analyze_result(di_result))
+    build_seconds = time.perf_counter() - start
+
+    print(json.dumps({
+        "pages": args.pages,
+        "paragraphs": len(layout.paragraphs),
+        "words": sum(len(page.word_offsets) for page in layout.pages),
+        "analyze_result_mb": round(di_result_bytes / 2**20, 1),
+        "layout_mb": round(layout_bytes / 2**20, 1),
+        "layout_build_seconds": round(build_seconds, 2),
+        "serialised_layout_mb": round(len(layout.to_bytes()) / 2**20, 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+A local stand-in for the Document Intelligence client, used to run and benchmark the flow offline.
+
+It extracts the text blocks and words of the PDF with PyMuPDF and returns them as an `AnalyzeResult` with the
+same shape as the `prebuilt-document` model: the content is the paragraphs joined by newlines, span offsets
+index into the content, page numbers start at 1 for every request and coordinates are in inches. Each request
+takes `latency` seconds plus `latency_per_page` seconds per page, like the real service.
+"""
+import time
+
+import fitz
+from azure.ai.formrecognizer import (
+    AnalyzeResult, BoundingRegion, DocumentPage, DocumentParagraph, DocumentSpan, DocumentWord, Point
+)
+
+DPI = 72
+
+
+def _polygon(x0: float, y0: float, x1: float, y1: float) -> list[Point]:
+    return [Point(x0 / DPI, y0 / DPI), Point(x1 / DPI, y0 / DPI), Point(x1 / DPI, y1 / DPI), Point(x0 / DPI, y1 / DPI)]
+
+
+def analyze_pdf(pdf_bytes: bytes, model_id: str = "prebuilt-document") -> AnalyzeResult:
+    document = fitz.open(stream=pdf_bytes, filetype="pdf")
+    paragraphs, pages, lines = [], [], []
+    offset = 0
+
+    for page in document:
+        page_start, words, blocks = offset, [], {}
+        for x0, y0, x1, y1, text, block_number, _ in page.get_text("blocks"):
+            text = " ".join(text.split())
+            if not text:
+                continue
+            paragraphs.append(DocumentParagraph(
+                content=text,
+                bounding_regions=[BoundingRegion(page_number=page.number + 1, polygon=_polygon(x0, y0, x1, y1))],
+                spans=[DocumentSpan(offset=offset, length=len(text))]
+            ))
+            blocks[block_number] = [text, offset, 0]
+            lines.append(text)
+            offset += len(text) + 1
+
+        # Words are matched to the content of their block in reading order to get their offsets
+        for x0, y0, x1, y1, text, block_number, *_ in page.get_text("words"):
+            block = blocks[block_number]
+            position = block[0].index(text, block[2])
+            block[2] = position + len(text)
+            words.append(DocumentWord(content=text, polygon=_polygon(x0, y0, x1, y1), confidence=1.0,
+                                      span=DocumentSpan(offset=block[1] + position, length=len(text))))
+
+        pages.append(DocumentPage(
+            page_number=page.number + 1,
+            width=page.rect.width / DPI,
+            height=page.rect.height / DPI,
+            unit="inch",
+            words=words,
+            lines=[],
+            spans=[DocumentSpan(offset=page_start, length=max(0, offset - 1 - page_start))]
+        ))
+
+    return AnalyzeResult(model_id=model_id, content="\n".join(lines), pages=pages, paragraphs=paragraphs)
+
+
+class LocalPoller:
+    def __init__(self, result: AnalyzeResult) -> None:
+        self._result = result
+
+    def result(self) -> AnalyzeResult:
+        return self._result
+
+
+class LocalDocumentAnalysisClient:
+    def __init__(self, latency: float = 0.0, latency_per_page: float = 0.0) -> None:
+        self.latency = latency
+        self.latency_per_page = latency_per_page
+        self.requests = 0
+
+    def begin_analyze_document(self, model_id: str, document: bytes, **kwargs) -> LocalPoller:
+        self.requests += 1
+        result = analyze_pdf(document, model_id)
+        time.sleep(self.latency + self.latency_per_page * len(result.pages))
+        return LocalPoller(result)
+
+
+def create_pdf(pages: int, paragraphs_per_page: int = 8) -> bytes:
+    """Creates a PDF of `pages` pages of numbered paragraphs."""
+    document = fitz.open()
+    for page_number in range(1, pages + 1):
+        page = document.new_page()
+        for i in range(paragraphs_per_page):
+            text = f"Page {page_number} paragraph {i}: the bidder shall submit the documents listed in section {i + 1}."
+            page.insert_textbox(fitz.Rect(50, 60 + i * 80, 550, 130 + i * 80), text, fontsize=11)
+    return document.tobytes()
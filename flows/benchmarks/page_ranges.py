@@ -0,0 +1,79 @@
+"""
+Benchmark of the page range analysis of Document Intelligence, with the local stand-in client.
+
+The document is analysed once as a whole and once in page ranges of `--pages-per-range` pages. The stitched
+layout is checked against the layout of the whole document analysis (paragraph indices, page numbers, paragraph
+and word offsets), then the time until the first chunks can be reviewed and the total analysis time are
+compared:
+- whole: one request for the whole document, as `analyze_document` does
+- ranges: concurrent requests per page range, stitched in page order by `analyze_document_in_ranges`
+
+Usage:
+    python flows/benchmarks/page_ranges.py --pages 60 --pages-per-range 10 --latency 2 --latency-per-page 0.2
+"""
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+ROOT_PATH = Path(__file__).parents[2]
+sys.path[:0] = [str(ROOT_PATH), str(ROOT_PATH / "flows" / "ai_doc_review")]
+
+import numpy as np  # noqa: E402
+from text import DOCUMENT_INTELLIGENCE_MODEL, analyze_document_in_ranges  # noqa: E402
+from layout import DocumentLayout  # noqa: E402
+from local_document_intelligence import LocalDocumentAnalysisClient, create_pdf  # noqa: E402
+
+
+def check_stitched(whole, stitched) -> None:
+    assert stitched.content_length == whole.content_length, "content length differs"
+    assert len(stitched.paragraphs) == len(whole.paragraphs), "paragraph count differs"
+    for expected, actual in zip(whole.paragraphs, stitched.paragraphs):
+        assert actual.content == expected.content
+        assert actual.offset == expected.offset
+        assert actual.page_number == expected.page_number
+
+    assert [page.page_number for page in stitched.pages] == [page.page_number for page in whole.pages]
+    for expected, actual in zip(whole.pages, stitched.pages):
+        assert np.array_equal(actual.word_offsets, expected.word_offsets)
+        assert np.array_equal(actual.word_polygons, expected.word_polygons)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=60)
+    parser.add_argument("--pages-per-range", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=2.0, help="Seconds per request")
+    parser.add_argument("--latency-per-page", type=float, default=0.2, help="Seconds per analysed page")
+    args = parser.parse_args()
+
+    pdf_bytes = create_pdf(args.pages)
+    client = LocalDocumentAnalysisClient(args.latency, args.latency_per_page)
+
+    start = time.perf_counter()
+    whole = DocumentLayout.from_analyze_result(client.begin_analyze_document(DOCUMENT_INTELLIGENCE_MODEL, pdf_bytes).result())
+    whole_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    first_range_seconds = None
+    for stitched, _ in analyze_document_in_ranges("benchmark.pdf", args.pages_per_range, client, pdf_bytes):
+        if first_range_seconds is None:
+            first_range_seconds = time.perf_counter() - start
+    ranges_seconds = time.perf_counter() - start
+
+    check_stitched(whole, stitched)
+    print(json.dumps({
+        "pages": args.pages,
+        "paragraphs": len(whole.paragraphs),
+        "whole": {"first_chunk_seconds": round(whole_seconds, 2), "total_seconds": round(whole_seconds, 2)},
+        "ranges": {
+            "requests": client.requests - 1,
+            "first_chunk_seconds": round(first_range_seconds, 2),
+            "total_seconds": round(ranges_seconds, 2),
+        },
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
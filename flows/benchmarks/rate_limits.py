@@ -0,0 +1,128 @@
+"""
+Benchmark of the LLM scheduler against a simulated rate-limited Azure OpenAI deployment.
+
+The simulated deployment accepts `--rpm` requests per minute (enforced over ten second windows like Azure
+OpenAI) and answers the other requests with a 429 and a `retry-after` header. Like OpenAI, it counts
+rejected requests against the limit (up to one extra window), so resending rate limited requests straight
+away delays every request further.
+
+`--workers` threads send calls for `--duration` seconds, and the sustained rate is measured over the second
+half of the run, once the initial burst allowance is used up:
+- unscheduled: every thread sends its requests directly, retrying 429s with promptflow's `handle_openai_error`
+  like the agent flow did before the scheduler
+- scheduled: every request goes through a shared `LLMScheduler` given the quota of the deployment
+- scheduled_over_budget: the scheduler is given twice the quota, as when `LLM_REQUESTS_PER_MINUTE` is set too
+  high, so only the 429 responses (AIMD and `retry-after` pauses) keep it within the quota
+- scheduled_no_budget: the scheduler has no request budget, and relies on the 429 responses alone
+
+Usage:
+    python flows/benchmarks/rate_limits.py --duration 40 --workers 40 --rpm 1200 --latency 0.5
+"""
+import io
+import sys
+import json
+import math
+import time
+import argparse
+import threading
+import contextlib
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from openai import RateLimitError
+from promptflow.tools.common import handle_openai_error
+
+ROOT_PATH = Path(__file__).parents[2]
+sys.path[:0] = [str(ROOT_PATH), str(ROOT_PATH / "flows" / "ai_doc_review" / "agent_template")]
+
+from llm_scheduler import LLMScheduler, TokenBucket  # noqa: E402
+
+
+class SimulatedDeployment:
+    def __init__(self, requests_per_minute: int, latency: float, duration: float) -> None:
+        self.bucket = TokenBucket(requests_per_minute)
+        self.latency = latency
+        # After the run, requests still being retried are answered straight away so the threads finish quickly
+        self.closes_at = time.monotonic() + duration
+        self.lock = threading.Lock()
+        self.accepted = 0
+        self.rejected = 0
+
+    def complete(self) -> str:
+        with self.lock:
+            now = time.monotonic()
+            if now > self.closes_at:
+                return "{}"
+            wait = self.bucket.wait_time(1, now)
+            self.bucket.consume(1, now)
+            if wait > 0:
+                self.bucket.level = max(self.bucket.level, -self.bucket.capacity)
+                self.rejected += 1
+                response = httpx.Response(
+                    429,
+                    headers={"retry-after": str(math.ceil(wait)), "retry-after-ms": str(int(wait * 1000))},
+                    request=httpx.Request("POST", "https://simulated.openai.azure.com")
+                )
+                raise RateLimitError("Rate limit exceeded", response=response, body=None)
+            self.accepted += 1
+
+        time.sleep(self.latency)
+        return "{}"
+
+
+def run_workload(send, duration: float, workers: int) -> dict:
+    start = time.monotonic()
+    deadline = start + duration
+    completed_at = []
+
+    def worker() -> None:
+        while time.monotonic() < deadline:
+            try:
+                send()
+            except Exception:
+                continue
+            completed_at.append(time.monotonic())
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for _ in range(workers):
+            pool.submit(worker)
+
+    sustained = [t for t in completed_at if start + duration / 2 <= t <= deadline]
+    return {
+        "completed": len([t for t in completed_at if t <= deadline]),
+        "sustained_requests_per_second": round(len(sustained) / (duration / 2), 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=40, help="Seconds to send calls for in each mode")
+    parser.add_argument("--workers", type=int, default=40, help="Number of threads sending calls concurrently")
+    parser.add_argument("--rpm", type=int, default=1200, help="Requests per minute accepted by the deployment")
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds taken by an accepted call")
+    args = parser.parse_args()
+
+    results = {}
+
+    deployment = SimulatedDeployment(args.rpm, args.latency, args.duration)
+    unscheduled = handle_openai_error()(deployment.complete)
+    # handle_openai_error reports every retry on stderr
+    with contextlib.redirect_stderr(io.StringIO()):
+        results["unscheduled"] = run_workload(unscheduled, args.duration, args.workers)
+    results["unscheduled"]["rate_limited"] = deployment.rejected
+
+    for mode, budget in (("scheduled", args.rpm), ("scheduled_over_budget", args.rpm * 2), ("scheduled_no_budget", 0)):
+        deployment = SimulatedDeployment(args.rpm, args.latency, args.duration)
+        scheduler = LLMScheduler(tokens_per_minute=0, requests_per_minute=budget)
+        results[mode] = run_workload(
+            lambda: scheduler.run(deployment.complete, estimated_tokens=0), args.duration, args.workers)
+        results[mode]["rate_limited"] = deployment.rejected
+        results[mode]["final_concurrency_limit"] = int(scheduler.limit)
+
+    results["deployment_requests_per_second"] = round(args.rpm / 60, 2)
+    print(json.dumps(results, indent=4))
+
+
+if __name__ == "__main__":
+    main()
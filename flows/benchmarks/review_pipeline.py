@@ -0,0 +1,313 @@
+"""
+Offline end-to-end benchmark of the review flow, without Document Intelligence or Azure OpenAI.
+
+The document is a synthetic Document Intelligence result of `--pages` pages, returned after `--di-latency`
+seconds plus `--di-latency-per-page` seconds per page. The agents run in-process with their LLM calls answered
+by a stub client after a latency drawn from `--llm-latency`:
+- constant:SECONDS
+- uniform:LOW,HIGH
+- lognormal:MEDIAN,SIGMA
+The stub finds issues in `--issue-rate` of the paragraphs of each shot, and the consolidator keeps all of them.
+Like the prompt prefix cache of Azure OpenAI, it reports the system prompt tokens of a request as cached when
+the same system prompt was sent before and is at least 1024 tokens long, in increments of 128 tokens.
+Everything else (chunking, multishot sampling, the LLM scheduler, aggregation, merging and bounding boxes) is
+the code of the flow.
+
+Each mode runs in a fresh process:
+- batch: `process.get_issues_from_text_chunks`, as used by the non-streaming flow
+- streaming: `process_streaming.process`, as used by the streaming flow
+
+For each mode the time to the first chunk of issues, the total wall time, the busy time of each stage (summed
+over threads) and the peak memory growth of the main process are reported as JSON, with the commit and the settings,
+so runs can be compared across commits. The batch mode also reports the timings and LLM usage the flow measures
+itself, which the evaluation flow aggregates, to check them against the stages measured here.
+
+Usage:
+    python flows/benchmarks/review_pipeline.py --pages 50 --llm-latency lognormal:1.5,0.4 --output results.json
+"""
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import random
+import argparse
+import resource
+import threading
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+from collections import defaultdict
+from typing import Callable
+
+ROOT_PATH = Path(__file__).parents[2]
+FLOW_PATH = ROOT_PATH / "flows" / "ai_doc_review"
+PARAGRAPH_LINE = re.compile(r"^\[(\d+)\](.*)$")
+PROMPT_CACHE_MIN_TOKENS = 1024
+PROMPT_CACHE_INCREMENT_TOKENS = 128
+# The number of parameters of each latency distribution
+DISTRIBUTION_PARAMETERS = {"constant": 1, "uniform": 2, "lognormal": 2}
+
+
+def parse_distribution(spec: str, rnd: random.Random) -> Callable[[], float]:
+    name, _, values = spec.partition(":")
+    if name not in DISTRIBUTION_PARAMETERS:
+        raise ValueError(f"Unknown latency distribution: {spec}")
+    parameters = [float(value) for value in values.split(",") if value]
+    if len(parameters) != DISTRIBUTION_PARAMETERS[name]:
+        raise ValueError(f"The {name} latency distribution takes {DISTRIBUTION_PARAMETERS[name]} parameters: {spec}")
+    if name == "constant":
+        return lambda: parameters[0]
+    if name == "uniform":
+        return lambda: rnd.uniform(parameters[0], parameters[1])
+    median, sigma = parameters
+    return lambda: median * rnd.lognormvariate(0, sigma)
+
+
+class StageTimer:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.seconds = defaultdict(float)
+        self.counts = defaultdict(int)
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self.lock:
+            self.seconds[stage] += seconds
+            self.counts[stage] += 1
+
+    def wrap(self, stage: str, function: Callable) -> Callable:
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+        return timed
+
+    def summary(self) -> dict:
+        return {
+            stage: {"busy_seconds": round(self.seconds[stage], 3), "count": self.counts[stage]}
+            for stage in sorted(self.seconds)
+        }
+
+
+class StubCompletions:
+    def __init__(self, latency: Callable[[], float], issue_rate: float, timer: StageTimer, seed: int) -> None:
+        self.latency = latency
+        self.issue_rate = issue_rate
+        self.timer = timer
+        self.seed = seed
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.cached_prompt_tokens = 0
+        self.system_prompts = set()
+        # The issues of a shot depend on the prompt and on the number of calls made with it, not on the call order
+        self.prompt_calls = defaultdict(int)
+
+    def _single_shot(self, prompt: str, rnd: random.Random) -> dict:
+        issues = []
+        for line in prompt.split("\n"):
+            match = PARAGRAPH_LINE.match(line)
+            if not match or rnd.random() >= self.issue_rate:
+                continue
+            para_index, content = int(match.group(1)), match.group(2)
+            word = rnd.choice(content.split())
+            issues.append({
+                "type": "Grammar & Spelling",
+                "location": {"source_sentence": content, "page_num": 0, "bounding_box": [], "para_index": para_index},
+                "text": word,
+                "explanation": f"'{word}' is used incorrectly.",
+                "suggested_fix": word.upper(),
+                "comment_id": f"{para_index}-{word}",
+            })
+        return {"issues": issues}
+
+    def _consolidator(self, prompt: str) -> dict:
+        return {"issues": [
+            {"comment_id": issue["comment_id"], "score": 3, "suggested_action": "KEEP",
+             "reason_for_suggested_action": "Relevant issue."}
+            for issue in json.loads(prompt)["issues"]
+        ]}
+
+    def parse(self, model: str, response_format: type, temperature: float, messages: list[dict]) -> SimpleNamespace:
+        prompt_key = hashlib.sha256("|".join(message["content"] for message in messages).encode("utf-8")).hexdigest()
+        with self.lock:
+            self.calls += 1
+            self.prompt_calls[prompt_key] += 1
+            shot = self.prompt_calls[prompt_key]
+            latency = self.latency()
+            system_prompt = messages[0]["content"] if messages[0]["role"] == "system" else ""
+            system_tokens = len(system_prompt) // 4
+            cached_tokens = 0
+            if system_prompt in self.system_prompts and system_tokens >= PROMPT_CACHE_MIN_TOKENS:
+                cached_tokens = system_tokens // PROMPT_CACHE_INCREMENT_TOKENS * PROMPT_CACHE_INCREMENT_TOKENS
+            self.system_prompts.add(system_prompt)
+        start = time.perf_counter()
+        time.sleep(latency)
+
+        prompt = messages[-1]["content"]
+        if response_format.__name__ == "AllConsolidatorIssues":
+            response = self._consolidator(prompt)
+        else:
+            response = self._single_shot(prompt, random.Random(f"{self.seed}:{prompt_key}:{shot}"))
+        content = json.dumps(response)
+        self.timer.add("llm_calls", time.perf_counter() - start)
+
+        prompt_tokens = sum(len(message["content"]) for message in messages) // 4
+        completion_tokens = len(content) // 4
+        with self.lock:
+            self.prompt_tokens += prompt_tokens
+            self.cached_prompt_tokens += cached_tokens
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content, refusal=None))],
+            usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                  total_tokens=prompt_tokens + completion_tokens,
+                                  prompt_tokens_details={"cached_tokens": cached_tokens})
+        )
+
+
+def run_mode(mode: str, args: argparse.Namespace) -> dict:
+    """Runs the review of the synthetic document in one mode, in the current (fresh) process."""
+    sys.path[:0] = [str(ROOT_PATH), str(FLOW_PATH), str(Path(__file__).parent)]
+    os.environ["POST_PROCESSING_PROCESSES"] = str(args.post_processing_processes)
+
+    import flows
+    import post_processing
+    import process
+    import async_engine
+    import process_streaming
+    from layout import DocumentLayout
+    from synthetic_document import create_analyze_result
+    from common.models import ReviewTimings
+
+    # The models module is an additional include of the flow when it is deployed
+    flows.MODELS_MODULE_PATH = ROOT_PATH / "common" / "models.py"
+    sys.path.append(str(flows.TEMPLATE_FLOW_PATH))
+    import llm
+    from llm_scheduler import LLMScheduler
+
+    timer = StageTimer()
+    rnd = random.Random(args.seed)
+    completions = StubCompletions(parse_distribution(args.llm_latency, rnd), args.issue_rate, timer, args.seed)
+    client = SimpleNamespace(beta=SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+    llm._create_client = lambda connection: client
+    scheduler = LLMScheduler(tokens_per_minute=args.tokens_per_minute, requests_per_minute=args.requests_per_minute)
+    llm.get_llm_scheduler = lambda deployment_name: scheduler
+
+    di_result = create_analyze_result(args.pages, args.paragraphs_per_page, args.words_per_paragraph, args.seed)
+
+    def analyze_document(pdf_name: str) -> DocumentLayout:
+        time.sleep(args.di_latency + args.di_latency_per_page * args.pages)
+        return DocumentLayout.from_analyze_result(di_result)
+
+    def get_text_chunks(*chunk_args, **chunk_kwargs) -> list:
+        return list(original_get_text_chunks(*chunk_args, **chunk_kwargs))
+
+    original_get_text_chunks = process.get_text_chunks
+    for module in (process, async_engine):
+        module.analyze_document = timer.wrap("document_intelligence", analyze_document)
+        module.get_text_chunks = timer.wrap("chunking", get_text_chunks)
+        module.run_flow = timer.wrap("agent_flows", module.run_flow)
+
+    # Post-processing may run in worker processes, so it is timed from submission to completion
+    def submit(post_processor, *submit_args, **submit_kwargs):
+        start = time.perf_counter()
+        future = original_submit(post_processor, *submit_args, **submit_kwargs)
+        future.add_done_callback(lambda _: timer.add("post_processing", time.perf_counter() - start))
+        return future
+
+    original_submit = post_processing.PostProcessor.submit
+    post_processing.PostProcessor.submit = submit
+
+    reported_timings, reported_usage = ReviewTimings(), {}
+    if mode == "batch":
+        outputs = process.get_issues_from_text_chunks(
+            "benchmark.pdf", args.pagination, args.tokens_per_chunk, use_llm_cache=False,
+            adaptive_multishot=args.adaptive_multishot, in_process_agents=True,
+            llm_usage=reported_usage, timings=reported_timings)
+    else:
+        outputs = process_streaming.process(
+            "benchmark.pdf", args.pagination, args.tokens_per_chunk, use_llm_cache=False,
+            adaptive_multishot=args.adaptive_multishot, in_process_agents=True)
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    first_chunk_seconds, chunks, issues = None, 0, 0
+    for output in outputs:
+        if first_chunk_seconds is None:
+            first_chunk_seconds = time.perf_counter() - start
+        chunks += 1
+        issues += len(json.loads(output)["issues"]) if isinstance(output, str) else len(output)
+    wall_seconds = time.perf_counter() - start
+    post_processing.shutdown_post_processing_pool()
+
+    results = {
+        "time_to_first_chunk_seconds": round(first_chunk_seconds or 0.0, 3),
+        "wall_seconds": round(wall_seconds, 3),
+        "outputs": chunks,
+        "issues": issues,
+        "llm_calls": completions.calls,
+        "prompt_tokens": completions.prompt_tokens,
+        "cached_prompt_tokens": completions.cached_prompt_tokens,
+        "stages": timer.summary(),
+        # ru_maxrss is in kilobytes on Linux
+        "peak_memory_growth_mb": round((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024, 1),
+    }
+    if mode == "batch":
+        results["reported_timings"] = {stage: round(seconds, 3) for stage, seconds in reported_timings.model_dump().items()}
+        results["reported_llm_seconds"] = {node: round(usage.seconds, 3) for node, usage in reported_usage.items()}
+    return results
+
+
+def get_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_PATH, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default="batch,streaming")
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--paragraphs-per-page", type=int, default=8)
+    parser.add_argument("--words-per-paragraph", type=int, default=40)
+    parser.add_argument("--pagination", type=int, default=16)
+    parser.add_argument("--tokens-per-chunk", type=int, default=0)
+    parser.add_argument("--adaptive-multishot", action="store_true")
+    parser.add_argument("--di-latency", type=float, default=2.0, help="Seconds per Document Intelligence request")
+    parser.add_argument("--di-latency-per-page", type=float, default=0.05)
+    parser.add_argument("--llm-latency", default="lognormal:1.5,0.4")
+    parser.add_argument("--issue-rate", type=float, default=0.2, help="Share of paragraphs with an issue per shot")
+    parser.add_argument("--tokens-per-minute", type=int, default=0, help="LLM scheduler token budget, 0 for none")
+    parser.add_argument("--requests-per-minute", type=int, default=0, help="LLM scheduler request budget, 0 for none")
+    parser.add_argument("--post-processing-processes", type=int, default=0,
+                        help="Worker processes for the post-processing, 0 to post-process on the flow threads")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the results to this JSON file")
+    args = parser.parse_args()
+    try:
+        parse_distribution(args.llm_latency, random.Random())
+    except ValueError as e:
+        parser.error(f"--llm-latency: {e}")
+
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for mode in args.modes.split(","):
+        # The errors of the run are raised here, as well as the exit of its process
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            results[mode] = executor.submit(run_mode, mode, args).result()
+
+    report = json.dumps({"commit": get_commit(), "settings": vars(args), "results": results}, indent=2)
+    print(report)
+    if args.output:
+        Path(args.output).write_text(report, encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+A generator of synthetic Document Intelligence results, shaped like the `prebuilt-document` model output.
+
+Paragraphs are laid out top to bottom on each page in lines of `WORDS_PER_LINE` words, and every word has a
+span into the content and a polygon in inches, so the results can be chunked and bounding boxes can be added.
+"""
+import random
+
+from azure.ai.formrecognizer import (
+    AnalyzeResult, BoundingRegion, DocumentPage, DocumentParagraph, DocumentSpan, DocumentWord, Point
+)
+
+PAGE_WIDTH = 8.5
+PAGE_HEIGHT = 11.0
+WORDS_PER_LINE = 12
+LINE_HEIGHT = 0.2
+VOCABULARY = (
+    "the bidder shall must will submit provide all required documents before deadline tender contract "
+    "supplier agreement clause section schedule pricing delivery warranty liability compliance terms "
+    "conditions requirement specification evaluation criteria award notice period obligations services"
+).split()
+
+
+def _box(x: float, y: float, width: float, height: float) -> list[Point]:
+    return [Point(x, y), Point(x + width, y), Point(x + width, y + height), Point(x, y + height)]
+
+
+def create_analyze_result(
+    pages: int,
+    paragraphs_per_page: int = 8,
+    words_per_paragraph: int = 40,
+    seed: int = 0
+) -> AnalyzeResult:
+    """Creates the analysis result of a document of `pages` pages with `paragraphs_per_page` paragraphs each."""
+    rnd = random.Random(seed)
+    paragraphs, document_pages, contents = [], [], []
+    offset = 0
+
+    for page_number in range(1, pages + 1):
+        page_start, words, y = offset, [], 0.5
+        for i in range(paragraphs_per_page):
+            # Paragraph lengths vary around the average, like real documents
+            length = max(1, int(rnd.gauss(words_per_paragraph, words_per_paragraph / 3)))
+            paragraph_words = [rnd.choice(VOCABULARY) for _ in range(length)]
+            paragraph_words[0] = f"{page_number}.{i + 1}"
+            content = " ".join(paragraph_words)
+
+            lines = (length + WORDS_PER_LINE - 1) // WORDS_PER_LINE
+            paragraphs.append(DocumentParagraph(
+                content=content,
+                bounding_regions=[BoundingRegion(page_number=page_number, polygon=_box(0.5, y, 7.5, lines * LINE_HEIGHT))],
+                spans=[DocumentSpan(offset=offset, length=len(content))]
+            ))
+
+            word_offset = offset
+            for k, word in enumerate(paragraph_words):
+                x = 0.5 + (k % WORDS_PER_LINE) * 0.6
+                words.append(DocumentWord(
+                    content=word,
+                    polygon=_box(x, y + (k // WORDS_PER_LINE) * LINE_HEIGHT, 0.55, LINE_HEIGHT * 0.8),
+                    span=DocumentSpan(offset=word_offset, length=len(word)),
+                    confidence=1.0
+                ))
+                word_offset += len(word) + 1
+
+            contents.append(content)
+            offset += len(content) + 1
+            y += lines * LINE_HEIGHT + 0.1
+
+        document_pages.append(DocumentPage(
+            page_number=page_number,
+            width=PAGE_WIDTH,
+            height=PAGE_HEIGHT,
+            unit="inch",
+            words=words,
+            lines=[],
+            spans=[DocumentSpan(offset=page_start, length=offset - 1 - page_start)]
+        ))
+
+    return AnalyzeResult(
+        model_id="prebuilt-document", content="\n".join(contents), pages=document_pages, paragraphs=paragraphs
+    )
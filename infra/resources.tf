@@ -414,3 +414,23 @@ resource "azurerm_cosmosdb_sql_container" "issues" {
 
   partition_key_paths = ["/doc_id"]
 }
+
+resource "azurerm_cosmosdb_sql_container" "reviews" {
+  name                = "reviews"
+  resource_group_name = azurerm_cosmosdb_sql_database.state.resource_group_name
+
+  account_name  = azurerm_cosmosdb_account.main.name
+  database_name = azurerm_cosmosdb_sql_database.state.name
+
+  partition_key_paths = ["/doc_id"]
+}
+
+resource "azurerm_cosmosdb_sql_container" "metrics" {
+  name                = "metrics"
+  resource_group_name = azurerm_cosmosdb_sql_database.state.resource_group_name
+
+  account_name  = azurerm_cosmosdb_account.main.name
+  database_name = azurerm_cosmosdb_sql_database.state.name
+
+  partition_key_paths = ["/granularity"]
+}